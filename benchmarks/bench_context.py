@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015 Gluu
+#
+# All rights reserved.
+
+"""Measures per-call overhead of database context: the request context
+formerly pushed by the SQL backend, the lightweight context used now,
+and several calls sharing one unit of work.
+
+Usage::
+
+    python benchmarks/bench_context.py --calls 10000
+"""
+import os
+import tempfile
+import time
+
+import click
+from flask import Flask
+
+from gluuengine.database import db
+from gluuengine.model import WorkerNode
+
+
+def timeit(func, calls):
+    start = time.time()
+    func(calls)
+    return (time.time() - start) / calls * 1000000
+
+
+@click.command()
+@click.option("--uri", default="", help="SQL database URI (default to temporary SQLite file).")
+@click.option("--calls", default=10000, help="Number of calls per scenario.")
+def main(uri, calls):
+    if not uri:
+        uri = "sqlite:///{}".format(
+            os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+    app = Flask(__name__)
+    app.config["DATABASE_URI"] = uri
+    app.config["DATABASE_IDENTITY_MAP"] = False
+    db.init_app(app)
+
+    node = WorkerNode({"name": "worker-1"})
+    db.persist(node, "nodes")
+
+    def request_context(n):
+        for _ in range(n):
+            with app.test_request_context():
+                pass
+
+    def lean_context(n):
+        for _ in range(n):
+            with db.backend._get_context():
+                pass
+
+    def get_per_call(n):
+        for _ in range(n):
+            db.get(node.id, "nodes")
+
+    def get_request_context(n):
+        for _ in range(n):
+            with app.test_request_context():
+                db.get(node.id, "nodes")
+
+    def get_unit_of_work(n):
+        with db.unit_of_work():
+            for _ in range(n):
+                db.get(node.id, "nodes")
+
+    scenarios = [
+        ("empty test_request_context()", request_context),
+        ("empty lightweight context", lean_context),
+        ("get() in test_request_context()", get_request_context),
+        ("get() with lightweight context", get_per_call),
+        ("get() inside one unit_of_work()", get_unit_of_work),
+    ]
+
+    click.echo("{:<36} {:>14}".format("scenario", "per call (us)"))
+    for label, func in scenarios:
+        click.echo("{:<36} {:>14.1f}".format(label, timeit(func, calls)))
+
+
+if __name__ == "__main__":
+    main()
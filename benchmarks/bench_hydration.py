@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015 Gluu
+#
+# All rights reserved.
+
+"""Measures ``db.all("containers")`` with full schematics conversion and
+with ``DATABASE_TRUSTED_ROWS`` fast path, using a fresh SQLite file for
+each number of rows.
+
+Usage::
+
+    python benchmarks/bench_hydration.py --rows 1000 --rows 10000 --rows 50000
+"""
+import os
+import random
+import tempfile
+import time
+
+import click
+from flask import Flask
+
+from gluuengine.database import db
+from gluuengine.model import LdapContainer
+from gluuengine.model import NginxContainer
+from gluuengine.model import OxauthContainer
+from gluuengine.model import OxtrustContainer
+
+CONTAINER_CLASSES = (LdapContainer, NginxContainer,
+                     OxauthContainer, OxtrustContainer,)
+
+
+def load_containers(num_containers):
+    containers = []
+    for _ in range(num_containers):
+        container = random.choice(CONTAINER_CLASSES)({
+            "cluster_id": "cluster",
+            "node_id": "node",
+            "state": "SUCCESS",
+        })
+        container.name = "{}_{}".format(container.image, container.id)
+        containers.append(container)
+
+    for chunk in range(0, num_containers, 1000):
+        db.persist_many(containers[chunk:chunk + 1000], "containers")
+
+
+def measure(app, trusted, rounds):
+    app.config["DATABASE_TRUSTED_ROWS"] = trusted
+    timings = []
+    for _ in range(rounds):
+        start = time.time()
+        db.all("containers")
+        timings.append(time.time() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+@click.command()
+@click.option("--rows", multiple=True, type=int, help="Number of containers (may be repeated).")
+@click.option("--rounds", default=5, help="Number of runs per mode.")
+def main(rows, rounds):
+    click.echo("{:>8} {:>16} {:>16} {:>8}".format(
+        "rows", "full (ms)", "trusted (ms)", "speedup"))
+
+    for num_rows in rows or (1000, 10000, 50000):
+        app = Flask(__name__)
+        app.config["DATABASE_URI"] = "sqlite:///{}".format(
+            os.path.join(tempfile.mkdtemp(), "bench.db"))
+        app.config["DATABASE_IDENTITY_MAP"] = False
+        db.init_app(app)
+        db._backend = None
+
+        load_containers(num_rows)
+
+        full = measure(app, False, rounds)
+        trusted = measure(app, True, rounds)
+        click.echo("{:>8} {:>16.1f} {:>16.1f} {:>7.1f}x".format(
+            num_rows, full, trusted, full / trusted))
+
+
+if __name__ == "__main__":
+    main()
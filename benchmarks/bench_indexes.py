@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015 Gluu
+#
+# All rights reserved.
+
+"""Measures query latency of common lookups before and after creating
+indexes declared in ``gluuengine.model._schema``.
+
+Usage::
+
+    python benchmarks/bench_indexes.py --containers 10000
+    python benchmarks/bench_indexes.py --uri mongodb://localhost:27017/bench
+"""
+import os
+import random
+import tempfile
+import time
+
+import click
+from flask import Flask
+
+from gluuengine.database import db
+from gluuengine.model import SCHEMAS
+
+from synthetic import load_cluster
+
+
+def make_queries(nodes, containers):
+    node = random.choice(nodes)
+    container = random.choice(containers)
+    return [
+        ("containers by node_id+type+state", "containers",
+         {"node_id": node.id, "type": "oxauth", "state": "SUCCESS"}),
+        ("containers by type+state", "containers",
+         {"type": "nginx", "state": "SUCCESS"}),
+        ("containers by name", "containers", {"name": container.name}),
+        ("nodes by type", "nodes", {"type": "worker"}),
+        ("container_logs by container_name", "container_logs",
+         {"container_name": container.name}),
+    ]
+
+
+def measure(queries, rounds):
+    results = {}
+    for label, table_name, condition in queries:
+        timings = []
+        for _ in range(rounds):
+            start = time.time()
+            db.search_from_table(table_name, condition, fields=["id"])
+            timings.append(time.time() - start)
+        timings.sort()
+        results[label] = timings[len(timings) // 2] * 1000
+    return results
+
+
+@click.command()
+@click.option("--uri", default="", help="Database URI (default to temporary SQLite file).")
+@click.option("--nodes", "num_nodes", default=10, help="Number of nodes.")
+@click.option("--containers", "num_containers", default=10000, help="Number of containers.")
+@click.option("--rounds", default=50, help="Number of runs per query.")
+def main(uri, num_nodes, num_containers, rounds):
+    if not uri:
+        uri = "sqlite:///{}".format(
+            os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+    app = Flask(__name__)
+    app.config["DATABASE_URI"] = uri
+    db.init_app(app)
+
+    click.echo("loading {} nodes and {} containers into {}".format(
+        num_nodes, num_containers, uri))
+    _, nodes, containers = load_cluster(num_nodes, num_containers)
+    queries = make_queries(nodes, containers)
+
+    before = measure(queries, rounds)
+    for schema in SCHEMAS:
+        db.create_indexes(schema)
+    after = measure(queries, rounds)
+
+    click.echo("{:<36} {:>12} {:>12}".format(
+        "query (median)", "before (ms)", "after (ms)"))
+    for label, _, _ in queries:
+        click.echo("{:<36} {:>12.3f} {:>12.3f}".format(
+            label, before[label], after[label]))
+
+
+if __name__ == "__main__":
+    main()
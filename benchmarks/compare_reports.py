@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015 Gluu
+#
+# All rights reserved.
+
+"""Compares median timings of two ``bench_database.py`` reports.
+
+Usage::
+
+    python benchmarks/compare_reports.py old.json new.json
+"""
+import json
+
+import click
+
+
+@click.command()
+@click.argument("old", type=click.File())
+@click.argument("new", type=click.File())
+def main(old, new):
+    old = json.load(old)
+    new = json.load(new)
+    click.echo("{} -> {}".format(old["meta"]["version"],
+                                 new["meta"]["version"]))
+
+    for backend in sorted(set(old["results"]) & set(new["results"])):
+        click.echo("\n[{}]".format(backend))
+        click.echo("{:<36} {:>12} {:>12} {:>8}".format(
+            "method (median)", "old (ms)", "new (ms)", "change"))
+
+        old_results = old["results"][backend]
+        new_results = new["results"][backend]
+        for name in sorted(set(old_results) & set(new_results)):
+            before = old_results[name]["median_ms"]
+            after = new_results[name]["median_ms"]
+            change = (after - before) / before * 100 if before else 0
+            click.echo("{:<36} {:>12.3f} {:>12.3f} {:>+7.1f}%".format(
+                name, before, after, change))
+
+
+if __name__ == "__main__":
+    main()
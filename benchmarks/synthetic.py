@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2015 Gluu
+#
+# All rights reserved.
+
+"""Synthetic cluster data shared by benchmark scripts.
+"""
+import random
+
+from gluuengine.database import db
+from gluuengine.model import Cluster
+from gluuengine.model import ContainerLog
+from gluuengine.model import LdapContainer
+from gluuengine.model import NginxContainer
+from gluuengine.model import OxauthContainer
+from gluuengine.model import OxtrustContainer
+from gluuengine.model import WorkerNode
+
+CONTAINER_CLASSES = (LdapContainer, NginxContainer,
+                     OxauthContainer, OxtrustContainer,)
+STATES = ("SUCCESS", "FAILED", "IN_PROGRESS",)
+CHUNK_SIZE = 1000
+
+
+def make_nodes(num_nodes):
+    return [WorkerNode({"name": "worker-{}".format(i)})
+            for i in range(num_nodes)]
+
+
+def make_containers(num_containers, cluster_id, nodes):
+    containers = []
+    for _ in range(num_containers):
+        container = random.choice(CONTAINER_CLASSES)({
+            "cluster_id": cluster_id,
+            "node_id": random.choice(nodes).id,
+            "state": random.choice(STATES),
+        })
+        container.name = "{}_{}".format(container.image, container.id)
+        containers.append(container)
+    return containers
+
+
+def load_cluster(num_nodes, num_containers):
+    """Loads a cluster with ``num_nodes`` nodes, ``num_containers``
+    containers spread over the nodes and a log for each container.
+
+    :returns: A tuple of cluster, nodes and containers.
+    """
+    cluster = Cluster({"name": "bench", "ox_cluster_hostname": "bench.local"})
+    db.persist(cluster, "clusters")
+
+    nodes = make_nodes(num_nodes)
+    db.persist_many(nodes, "nodes")
+
+    containers = make_containers(num_containers, cluster.id, nodes)
+    for chunk in range(0, num_containers, CHUNK_SIZE):
+        batch = containers[chunk:chunk + CHUNK_SIZE]
+        db.persist_many(batch, "containers")
+        db.persist_many(
+            [ContainerLog.from_container(container) for container in batch],
+            "container_logs",
+        )
+    return cluster, nodes, containers
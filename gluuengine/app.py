@@ -32,7 +32,12 @@ from .resource import ContainerListResource
 from .resource import ContainerResource
 from .resource import NewContainerResource
 from .resource import ScaleContainerResource
+from .resource import ScaleJobResource
+from .resource import StatsResource
+from .resource import EventResource
 from .database import db
+from .machine import machine_status
+from .model import SCHEMAS
 from .setup.signals import connect_setup_signals
 from .setup.signals import connect_teardown_signals
 from .log import configure_global_logging
@@ -69,6 +74,8 @@ def create_app():
     register_resources()
     register_extensions(app)
 
+    machine_status.max_age = app.config["MACHINE_STATUS_MAX_AGE"]
+
     crochet_setup()
     connect_setup_signals()
     connect_teardown_signals()
@@ -80,6 +87,9 @@ def register_extensions(app):  # pragma: no cover
     db.init_app(app)
     ma.init_app(app)
 
+    if app.config.get("DATABASE_PREWARM_TABLES"):
+        db.prewarm_tables([schema["name"] for schema in SCHEMAS])
+
 
 def register_resources():  # pragma: no cover
     restapi.add_resource(CreateNodeResource,
@@ -150,3 +160,9 @@ def register_resources():  # pragma: no cover
                          "/scale-containers/<string:container_type>/<int:number>",
                          endpoint="scale_container",
                          )
+    restapi.add_resource(ScaleJobResource,
+                         "/scale-jobs/<string:job_id>",
+                         endpoint="scale_job",
+                         )
+    restapi.add_resource(StatsResource, "/stats", endpoint="stats")
+    restapi.add_resource(EventResource, "/events", endpoint="events")
@@ -13,12 +13,12 @@ from .database import db
 from .dockerclient import Docker
 from .errors import DockerExecError
 from .machine import Machine
-from .model import CLUSTER_SCHEMA
-from .model import CONTAINER_SCHEMA
-from .model import CONTAINER_LOG_SCHEMA
-from .model import NODE_SCHEMA
-from .model import PROVIDER_SCHEMA
-from .model import LICENSE_KEY_SCHEMA
+from .model import SCHEMAS
+from .model import STATE_DISABLED
+from .model import STATE_IN_PROGRESS
+from .model import STATE_SUCCESS
+from .model import Placement
+from .node import prepull_images
 
 
 # global context settings
@@ -51,35 +51,39 @@ def _distribute_ox_files(type_):
 
     click.echo("distributing custom {} files".format(ox["name"]))
 
-    mnodes = db.search_from_table("nodes", {"type": "master"})
-    wnodes = db.search_from_table("nodes", {"type": "worker"})
+    # only IDs and names are needed, hence no need to load full models
+    mnodes = db.search_from_table("nodes", {"type": "master"},
+                                  fields=["id", "name"])
+    wnodes = db.search_from_table("nodes", {"type": "worker"},
+                                  fields=["id", "name"])
     nodes = mnodes + wnodes
 
     src = app.config[ox["override_dir_config"]]
     dest = src.replace(app.config[ox["override_dir_config"]],
                        ox["override_remote_dir"])
 
-    for node in nodes:
+    for node_id, node_name in nodes:
         click.echo("copying {} to {}:{} recursively".format(
-            src, node.name, dest
+            src, node_name, dest
         ))
-        mc.scp(src, "{}:{}".format(node.name, os.path.dirname(dest)),
+        mc.scp(src, "{}:{}".format(node_name, os.path.dirname(dest)),
                recursive=True)
 
         containers = db.search_from_table(
             "containers",
-            {"node_id": node.id, "type": type_, "state": "SUCCESS"},
+            {"node_id": node_id, "type": type_, "state": "SUCCESS"},
+            fields=["cid"],
         )
 
-        for container in containers:
+        for cid, in containers:
             # we only need to restart tomcat process inside the container
             click.echo(
                 "restarting tomcat process inside {} container {} "
-                "in {} node".format(ox["name"], container.cid, node.name)
+                "in {} node".format(ox["name"], cid, node_name)
             )
             mc.ssh(
-                node.name,
-                "sudo docker exec {} supervisorctl restart tomcat".format(container.cid),
+                node_name,
+                "sudo docker exec {} supervisorctl restart tomcat".format(cid),
             )
 
 
@@ -188,10 +192,7 @@ def init_schema():
         return
 
     with app.test_request_context():
-        schema_list = [CLUSTER_SCHEMA, CONTAINER_SCHEMA, CONTAINER_LOG_SCHEMA,
-                       NODE_SCHEMA, PROVIDER_SCHEMA, LICENSE_KEY_SCHEMA]
-
-        for schema in schema_list:
+        for schema in SCHEMAS:
             table = db.backend._get_table(schema["name"])
 
             for column, type_ in schema["columns"].iteritems():
@@ -200,3 +201,66 @@ def init_schema():
                         column, table.table,
                     ))
                     table.create_column(column, type_)
+
+        # cached table handles may have stale columns
+        db.clear_table_cache()
+
+
+@main.command("init-indexes")
+def init_indexes():
+    """Initialize indexes declared in table schemas.
+    """
+    create_app()
+
+    for schema in SCHEMAS:
+        for name in db.create_indexes(schema):
+            click.echo("created index {} in {} table".format(
+                name, schema["name"],
+            ))
+    click.echo("indexes are initialized")
+
+
+@main.command("sync-placements")
+def sync_placements():
+    """Take placement slots of existing containers.
+
+    Required once after upgrading from versions without placement
+    slots, so new deployments honor containers created before.
+    """
+    create_app()
+
+    containers = []
+    for state in (STATE_IN_PROGRESS, STATE_SUCCESS, STATE_DISABLED):
+        containers.extend(
+            db.search_from_table("containers", {"state": state}),
+        )
+
+    for container in containers:
+        if not Placement.get_key(container):
+            continue
+
+        if not Placement.reserve(container):
+            placement = Placement.from_container(container)
+            if db.get(placement.id, "placements").container_id != container.id:
+                click.echo("slot {} is already taken; skipping {}".format(
+                    placement.key, container.name,
+                ))
+    click.echo("placement slots are synced")
+
+
+@main.command("prepull-images")
+def prepull_node_images():
+    """Pull gluu images of current ``GLUU_IMAGE_TAG`` into all nodes.
+    """
+    app = create_app()
+
+    nodes = db.search_from_table("nodes", {"type": "master"}) + \
+        db.search_from_table("nodes", {"type": "worker"})
+
+    for node in nodes:
+        click.echo("pulling gluu images in {} node".format(node.name))
+        try:
+            prepull_images(app, node, progress=click.echo)
+        except RuntimeError as exc:
+            click.echo(exc)
+    click.echo("images are pulled")
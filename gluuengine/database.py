@@ -3,24 +3,59 @@
 #
 # All rights reserved.
 
+import contextlib
 import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
 
 import dataset
 from flask import _app_ctx_stack
 from flask_pymongo import PyMongo
+from pymongo import ASCENDING
+from pymongo import DeleteMany
+from pymongo import DeleteOne
+from pymongo import InsertOne
+from pymongo import ReplaceOne
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from pymongo.errors import OperationFailure
+from sqlalchemy import Index
+from sqlalchemy import Integer
 from sqlalchemy import Unicode
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy import null
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import QueuePool
 from werkzeug.utils import import_string
 
 
-def _load_pyobject(data):
+#: Name of table which keeps version stamp of other tables
+TABLE_VERSIONS = "table_versions"
+
+# model classes resolved from ``_pyobject`` paths
+_pyobject_classes = {}
+
+
+def _load_pyobject(data, trusted=False):
     if "_pyobject" in data:
         imp_path = data["_pyobject"]
     else:
         imp_path = data["py/object"]
 
-    cls = import_string(imp_path)
-    obj = cls(data)
-    return obj
+    cls = _pyobject_classes.get(imp_path)
+    if cls is None:
+        cls = _pyobject_classes[imp_path] = import_string(imp_path)
+
+    if trusted and hasattr(cls, "from_trusted"):
+        return cls.from_trusted(data)
+    return cls(data)
+
+
+def get_index_name(table_name, columns):
+    return "ix_{}_{}".format(table_name, "_".join(columns))
 
 
 def get_model_path(model):
@@ -28,9 +63,76 @@ def get_model_path(model):
                      model.__class__.__name__])
 
 
+class InstrumentedQueuePool(QueuePool):
+    """A ``QueuePool`` which counts checkouts that had to wait for
+    a connection to be returned to the pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(InstrumentedQueuePool, self).__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_time = 0.0
+
+    def _do_get(self):
+        exhausted = (self._pool.empty() and
+                     self._max_overflow > -1 and
+                     self._overflow >= self._max_overflow)
+        if not exhausted:
+            return super(InstrumentedQueuePool, self)._do_get()
+
+        start = time.time()
+        try:
+            return super(InstrumentedQueuePool, self)._do_get()
+        finally:
+            self.wait_count += 1
+            self.wait_time += time.time() - start
+
+
+def get_engine_kwargs(config):
+    """Builds SQLAlchemy engine kwargs from ``DATABASE_POOL_*`` config,
+    unless ``DATASET_ENGINE_KWARGS`` is set explicitly.
+    """
+    if config.get("DATASET_ENGINE_KWARGS") is not None:
+        return config["DATASET_ENGINE_KWARGS"]
+
+    # dataset uses ``StaticPool`` for SQLite
+    if config.get("DATASET_DATABASE_URI", "").startswith("sqlite"):
+        return {}
+
+    kwargs = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config.get("DATABASE_POOL_SIZE", 5),
+        "max_overflow": config.get("DATABASE_POOL_MAX_OVERFLOW", 10),
+        "pool_timeout": config.get("DATABASE_POOL_TIMEOUT", 30),
+        "pool_recycle": config.get("DATABASE_POOL_RECYCLE", 3600),
+    }
+
+    # requires SQLAlchemy 1.2+
+    if config.get("DATABASE_POOL_PRE_PING"):
+        kwargs["pool_pre_ping"] = True
+    return kwargs
+
+
+class _NullContext(object):
+    """No-op context manager, used when a call doesn't need any context
+    to be pushed.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_null_context = _NullContext()
+
+
 class Dataset(object):
     def __init__(self, app=None):
         self._connection = None
+        self._connection_pid = None
+        self._connection_lock = threading.Lock()
         self.app = app
 
         if app:
@@ -55,14 +157,43 @@ class Dataset(object):
 
     @property
     def connection(self):
-        if not self._connection:
-            app = self._get_app()
-            self._connection = dataset.connect(
-                app.config["DATASET_DATABASE_URI"],
-                engine_kwargs=app.config["DATASET_ENGINE_KWARGS"],
-            )
+        # a forked worker must not reuse connections of its parent
+        pid = os.getpid()
+        if self._connection and self._connection_pid == pid:
+            return self._connection
+
+        with self._connection_lock:
+            if not self._connection or self._connection_pid != pid:
+                app = self._get_app()
+                self._connection = dataset.connect(
+                    app.config["DATASET_DATABASE_URI"],
+                    engine_kwargs=get_engine_kwargs(app.config),
+                )
+                self._connection_pid = pid
+                self._on_connect()
         return self._connection
 
+    def _on_connect(self):
+        """Callback executed after new connection has been made.
+        """
+
+    def pool_stats(self):
+        """Gets statistics of the connection pool.
+        """
+        pool = self.connection.engine.pool
+        stats = {"class": pool.__class__.__name__}
+
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "waits": getattr(pool, "wait_count", 0),
+                "wait_time": getattr(pool, "wait_time", 0.0),
+            })
+        return stats
+
     def _get_app(self):
         if self.app:
             return self.app
@@ -82,16 +213,161 @@ class Dataset(object):
         return getattr(self.connection, attr)
 
 
+class IdentityMap(object):
+    """Per-context cache of hydrated model instances.
+
+    Objects are keyed by ``(table_name, id)``, while query results are
+    keyed by ``(table_name, condition)``; a write to a table drops its
+    cached queries, since we can't tell which of them are affected.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.queries = {}
+
+    def get(self, table_name, identifier):
+        return self.objects.get((table_name, identifier))
+
+    def add(self, table_name, obj):
+        # keep the instance we already hand out, so callers within
+        # the same context always share one model per row
+        return self.objects.setdefault((table_name, obj.id), obj)
+
+    def get_query(self, table_name, condition):
+        return self.queries.get((table_name, _condition_key(condition)))
+
+    def add_query(self, table_name, condition, objs):
+        objs = [self.add(table_name, obj) for obj in objs]
+        self.queries[(table_name, _condition_key(condition))] = objs
+        return objs
+
+    def invalidate(self, table_name, identifier=None):
+        if identifier is None:
+            for key in self.objects.keys():
+                if key[0] == table_name:
+                    del self.objects[key]
+        else:
+            self.objects.pop((table_name, identifier), None)
+
+        for key in self.queries.keys():
+            if key[0] == table_name:
+                del self.queries[key]
+
+
+def _condition_key(condition):
+    return repr(sorted((condition or {}).items()))
+
+
+def _diff_snapshots(table_name, old, new):
+    """Compares two snapshots (mapping of ID to row) of a table and
+    yields change events (see :meth:`Database.watch`).
+    """
+    for identifier, data in new.iteritems():
+        if identifier not in old:
+            yield {"table": table_name, "type": "insert",
+                   "id": identifier, "data": data}
+        elif old[identifier] != data:
+            yield {"table": table_name, "type": "update",
+                   "id": identifier, "data": data}
+
+    for identifier in old:
+        if identifier not in new:
+            yield {"table": table_name, "type": "delete",
+                   "id": identifier, "data": None}
+
+
 class Database(object):
     def __init__(self, app=None):
         self._backend = None
         self.app = app
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
 
         if app is not None:
             self.init_app(app)
 
     def init_app(self, app):
         self.app = app
+        app.config.setdefault("DATABASE_IDENTITY_MAP", True)
+        app.config.setdefault("DATABASE_TRUSTED_ROWS", True)
+
+    @contextlib.contextmanager
+    def unit_of_work(self):
+        """Runs several calls within a single backend context.
+
+        SQL backend executes them in one transaction, which is committed
+        on exit or rolled back if an exception is raised::
+
+            with db.unit_of_work():
+                db.persist(container, "containers")
+                db.update(node.id, node, "nodes")
+        """
+        with self.backend.unit_of_work():
+            yield self
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Groups writes of a multi-step state change::
+
+            with db.transaction():
+                db.persist(container, "containers")
+                db.persist(container_log, "container_logs")
+
+        SQL backend runs them in a single transaction (see
+        :meth:`unit_of_work`), so they either all take effect or none
+        of them does.
+
+        MongoDB backend only batches them: writes are queued and sent
+        on exit as one ordered ``bulk_write`` per collection (the queue
+        is discarded if an exception is raised inside the block). This
+        is *not* atomic; if a collection fails, writes already sent to
+        other collections stay, so callers must tolerate (or clean up)
+        partial writes. Table versions are bumped before any other
+        write, hence a partial failure never leaves a stale ``ETag``.
+        Reads inside the block don't see queued writes. Nested blocks
+        join the outermost one.
+        """
+        with self.backend.transaction():
+            yield self
+
+    def _get_identity_map(self):
+        """Gets identity map bound to current app (or request) context.
+
+        Returns ``None`` when there's no context, for example in threads
+        running inside crochet reactor, so those calls always hit the
+        database.
+        """
+        if not self.app.config.get("DATABASE_IDENTITY_MAP"):
+            return
+
+        ctx = _app_ctx_stack.top
+        if ctx is None:
+            return
+
+        imap = getattr(ctx, "gluuengine_identity_map", None)
+        if imap is None:
+            imap = ctx.gluuengine_identity_map = IdentityMap()
+        return imap
+
+    def _invalidate(self, table_name, identifier=None):
+        imap = self._get_identity_map()
+        if imap is not None:
+            imap.invalidate(table_name, identifier)
+
+    def _record(self, hit):
+        with self._stats_lock:
+            self._stats["hits" if hit else "misses"] += 1
+
+    @property
+    def cache_stats(self):
+        """Hit/miss counters of identity map lookups.
+        """
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def reset_cache_stats(self):
+        with self._stats_lock:
+            self._stats = {"hits": 0, "misses": 0}
 
     @property
     def backend(self):
@@ -111,75 +387,472 @@ class Database(object):
         return self._backend
 
     def get(self, identifier, table_name):
+        imap = self._get_identity_map()
+        if imap is not None:
+            obj = imap.get(table_name, identifier)
+            self._record(obj is not None)
+            if obj is not None:
+                return obj
+
         with self.backend._get_context():
-            return self.backend.get(identifier, table_name)
+            obj = self.backend.get(identifier, table_name)
+
+        if imap is not None and obj is not None:
+            obj = imap.add(table_name, obj)
+        return obj
+
+    def get_many(self, identifiers, table_name, field="id"):
+        """Gets objects whose ``field`` value is in ``identifiers``
+        using a single query.
+
+        :param identifiers: A list of values to look up.
+        :param table_name: Name of the table.
+        :param field: Field to match against (``id`` by default).
+        :returns: A list of objects; missing ones are skipped.
+        """
+        if not identifiers:
+            return []
+
+        imap = self._get_identity_map()
+        cached = []
+        if imap is not None and field == "id":
+            missing = []
+            for identifier in identifiers:
+                obj = imap.get(table_name, identifier)
+                self._record(obj is not None)
+                if obj is None:
+                    missing.append(identifier)
+                else:
+                    cached.append(obj)
+            identifiers = missing
+
+        objs = []
+        if identifiers:
+            with self.backend._get_context():
+                objs = self.backend.get_many(identifiers, table_name, field)
+
+        if imap is not None:
+            objs = [imap.add(table_name, o) for o in objs]
+        return cached + objs
 
     def persist(self, obj, table_name):
+        self._invalidate(table_name, obj.id)
         with self.backend._get_context():
-            return self.backend.persist(obj, table_name)
+            result = self.backend.persist(obj, table_name)
+            self.backend.bump_table_version(table_name)
+        return result
+
+    def persist_unique(self, obj, table_name):
+        """Inserts object unless another object with the same ID exists.
 
-    def all(self, table_name):
+        The check relies on primary key constraint, hence it's atomic
+        across threads and processes. Don't call it inside
+        :meth:`transaction`, as a conflict may abort the whole
+        transaction (SQL) or can't be detected until it's committed
+        (MongoDB).
+
+        :returns: ``True`` if object is inserted, otherwise ``False``.
+        """
+        self._invalidate(table_name, obj.id)
+        with self.backend._get_context():
+            inserted = self.backend.persist_unique(obj, table_name)
+            if inserted:
+                self.backend.bump_table_version(table_name)
+        return inserted
+
+    def persist_many(self, objs, table_name):
+        """Inserts objects using a single round trip.
+        """
+        if not objs:
+            return
+        self._invalidate(table_name)
         with self.backend._get_context():
-            return self.backend.all(table_name)
+            result = self.backend.persist_many(objs, table_name)
+            self.backend.bump_table_version(table_name)
+        return result
+
+    def all(self, table_name, fields=None):
+        return self.search_from_table(table_name, {}, fields=fields)
 
     def delete(self, identifier, table_name):
+        self._invalidate(table_name, identifier)
         with self.backend._get_context():
-            return self.backend.delete(identifier, table_name)
+            result = self.backend.delete(identifier, table_name)
+            self.backend.bump_table_version(table_name)
+        return result
+
+    def delete_many(self, identifiers, table_name):
+        """Deletes objects by their IDs using a single query.
+        """
+        if not identifiers:
+            return
+        self._invalidate(table_name)
+        with self.backend._get_context():
+            result = self.backend.delete_many(identifiers, table_name)
+            self.backend.bump_table_version(table_name)
+        return result
 
     def update(self, identifier, obj, table_name):
+        self._invalidate(table_name, identifier)
+        with self.backend._get_context():
+            result = self.backend.update(identifier, obj, table_name)
+            self.backend.bump_table_version(table_name)
+        return result
+
+    def update_many(self, objs, table_name):
+        """Updates objects (matched by their IDs) using a single
+        round trip.
+        """
+        if not objs:
+            return
+        self._invalidate(table_name)
+        with self.backend._get_context():
+            result = self.backend.update_many(objs, table_name)
+            self.backend.bump_table_version(table_name)
+        return result
+
+    def search_from_table(self, table_name, condition, fields=None,
+                          limit=None, after=None):
+        """Searches objects matching ``condition``.
+
+        If ``fields`` is given, only those fields are fetched and each
+        row is returned as a tuple of their values (in ``fields`` order)
+        instead of a model instance.
+
+        If ``limit`` or ``after`` is given, objects are ordered by ``id``
+        and at most ``limit`` objects whose ``id`` is greater than
+        ``after`` are returned (keyset pagination).
+        """
+        if limit is not None or after is not None:
+            return list(self.iter_search_from_table(
+                table_name, condition, limit=limit, after=after,
+            ))
+
+        if fields:
+            with self.backend._get_context():
+                return self.backend.search_from_table(
+                    table_name, condition, fields=fields,
+                )
+
+        imap = self._get_identity_map()
+        if imap is not None:
+            objs = imap.get_query(table_name, condition)
+            self._record(objs is not None)
+            if objs is not None:
+                # callers may modify the list, but not our cached copy
+                return list(objs)
+
         with self.backend._get_context():
-            return self.backend.update(identifier, obj, table_name)
+            if condition:
+                objs = self.backend.search_from_table(table_name, condition)
+            else:
+                objs = self.backend.all(table_name)
+
+        if imap is not None:
+            objs = list(imap.add_query(table_name, condition, objs))
+        return objs
 
-    def search_from_table(self, table_name, condition):
+    def iter_all(self, table_name):
+        """Same as :meth:`all`, but lazily yields objects.
+        """
+        return self.iter_search_from_table(table_name, {})
+
+    def iter_search_from_table(self, table_name, condition,
+                               limit=None, after=None):
+        """Same as :meth:`search_from_table`, but lazily yields objects
+        as they are read from Mongo cursor or SQL result, so only one
+        row is held in memory at a time.
+
+        Objects bypass the identity map. Avoid issuing other queries
+        in the same thread until the iterator is exhausted, as some SQL
+        drivers can't run them while a streamed result is open.
+        """
         with self.backend._get_context():
-            return self.backend.search_from_table(table_name, condition)
+            for obj in self.backend.iter_search_from_table(
+                    table_name, condition, limit=limit, after=after):
+                yield obj
 
     def count_from_table(self, table_name, condition):
         with self.backend._get_context():
             return self.backend.count_from_table(table_name, condition)
 
+    def watch(self, fields, interval=1.0, timeout=None):
+        """Yields changes made to tables.
+
+        Each change is a dict with ``table``, ``type`` (``insert``,
+        ``update`` or ``delete``), ``id`` and ``data`` (values of watched
+        fields, ``None`` for deletes) keys. ``None`` is yielded whenever
+        there's no new change, so consumers get a chance to send
+        heartbeats or stop.
+
+        MongoDB change streams are used if available (replica set and
+        pymongo 3.7+ are required); otherwise table versions are polled
+        every ``interval`` seconds and, if changed, the watched fields
+        of the table are read and compared with previous snapshot.
+
+        :param fields: Mapping of table name to list of fields to watch.
+        :param interval: Polling interval (in seconds).
+        :param timeout: Stop after given seconds (runs forever if ``None``).
+        """
+        deadline = time.time() + timeout if timeout else None
+
+        with self.backend._get_context():
+            try:
+                changes = self.backend.watch(fields)
+            except NotImplementedError:
+                changes = self._poll_changes(fields, interval)
+
+            try:
+                for change in changes:
+                    yield change
+                    if deadline and time.time() >= deadline:
+                        break
+            finally:
+                changes.close()
+
+    def _snapshot(self, table_name, fields):
+        rows = self.search_from_table(table_name, {},
+                                      fields=["id"] + list(fields))
+        return {row[0]: dict(zip(fields, row[1:])) for row in rows}
+
+    def _poll_changes(self, fields, interval):
+        versions = {}
+        snapshots = {}
+        for table_name, table_fields in fields.iteritems():
+            versions[table_name] = self.table_version(table_name)
+            snapshots[table_name] = self._snapshot(table_name, table_fields)
+
+        while True:
+            time.sleep(interval)
+            changed = False
+
+            for table_name, table_fields in fields.iteritems():
+                version = self.table_version(table_name)
+                if version == versions[table_name]:
+                    continue
+
+                versions[table_name] = version
+                snapshot = self._snapshot(table_name, table_fields)
+                for change in _diff_snapshots(table_name,
+                                              snapshots[table_name],
+                                              snapshot):
+                    changed = True
+                    yield change
+                snapshots[table_name] = snapshot
+
+            if not changed:
+                yield None
+
+    def table_version(self, table_name):
+        """Gets version stamp of a table, which is bumped by every write
+        made through this object (in any process), hence it can be
+        used to tell whether table contents may have changed.
+        """
+        with self.backend._get_context():
+            return self.backend.get_table_version(table_name)
+
     def update_to_table(self, table_name, condition, obj):
+        self._invalidate(table_name)
         with self.backend._get_context():
-            return self.backend.update_to_table(table_name, condition, obj)
+            result = self.backend.update_to_table(table_name, condition, obj)
+            self.backend.bump_table_version(table_name)
+        return result
 
     def delete_from_table(self, table_name, condition):
+        self._invalidate(table_name)
         with self.backend._get_context():
-            return self.backend.delete_from_table(table_name, condition)
+            result = self.backend.delete_from_table(table_name, condition)
+            self.backend.bump_table_version(table_name)
+        return result
+
+    @property
+    def pool_stats(self):
+        """Connection pool statistics (``None`` if backend doesn't
+        support them).
+        """
+        return self.backend.pool_stats()
+
+    def prewarm_tables(self, table_names):
+        """Loads table metadata upfront, so first requests don't pay
+        the reflection cost.
+        """
+        with self.backend._get_context():
+            return self.backend.prewarm_tables(table_names)
+
+    def clear_table_cache(self, table_name=None):
+        with self.backend._get_context():
+            return self.backend.clear_table_cache(table_name)
+
+    def create_indexes(self, schema):
+        """Creates indexes declared in table schema (if not exist yet).
+
+        :param schema: Table schema, see ``gluuengine.model._schema``.
+        :returns: A list of newly-created index names.
+        """
+        with self.backend._get_context():
+            return self.backend.create_indexes(schema)
 
 
 class PyMongoBackend(PyMongo):
+    def __init__(self, *args, **kwargs):
+        # write requests queued by transaction of current thread
+        self._local = threading.local()
+        super(PyMongoBackend, self).__init__(*args, **kwargs)
+
+    @property
+    def _trusted_rows(self):
+        return self.app.config.get("DATABASE_TRUSTED_ROWS", False)
+
     def _get_context(self):
+        # reuse app context pushed by request or unit of work
+        ctx = _app_ctx_stack.top
+        if ctx is not None and ctx.app is self.app:
+            return _null_context
         return self.app.app_context()
 
+    def unit_of_work(self):
+        return self._get_context()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        if getattr(self._local, "requests", None) is not None:
+            yield
+            return
+
+        requests = self._local.requests = OrderedDict()
+        try:
+            with self._get_context():
+                yield
+                self._local.requests = None
+
+                # bump versions first, so readers revalidate their
+                # ETags even if a later collection fails
+                if TABLE_VERSIONS in requests:
+                    requests = OrderedDict(
+                        [(TABLE_VERSIONS, requests.pop(TABLE_VERSIONS))] +
+                        requests.items()
+                    )
+                for table_name, table_requests in requests.items():
+                    self.db[table_name].bulk_write(table_requests,
+                                                   ordered=True)
+        finally:
+            self._local.requests = None
+
+    def _queue(self, table_name, requests):
+        """Queues write requests if current thread is inside
+        a transaction.
+
+        :returns: ``True`` if requests are queued, otherwise ``False``.
+        """
+        queued = getattr(self._local, "requests", None)
+        if queued is None:
+            return False
+        queued.setdefault(table_name, []).extend(requests)
+        return True
+
+    def clear_table_cache(self, table_name=None):
+        """Collections don't need cached metadata, hence this is a no-op.
+        """
+
+    def prewarm_tables(self, table_names):
+        """Collections don't need cached metadata, hence this is a no-op.
+        """
+
+    def pool_stats(self):
+        """Pool statistics are not available for MongoDB.
+        """
+
+    def _to_document(self, obj):
+        data = obj.to_primitive()
+        data["_id"] = data["id"]
+        data["_pyobject"] = get_model_path(obj)
+        return data
+
     def get(self, identifier, table_name):
         data = self.db[table_name].find_one({"id": identifier})
 
         if not data:
             return
-        return _load_pyobject(data)
+        return _load_pyobject(data, self._trusted_rows)
+
+    def get_many(self, identifiers, table_name, field="id"):
+        data = self.db[table_name].find({field: {"$in": list(identifiers)}})
+        return [_load_pyobject(item, self._trusted_rows) for item in data]
 
     def persist(self, obj, table_name):
-        data = obj.to_primitive()
-        data["_id"] = data["id"]
-        data["_pyobject"] = get_model_path(obj)
+        data = self._to_document(obj)
+        if self._queue(table_name, [InsertOne(data)]):
+            return
         return self.db[table_name].insert_one(data)
 
-    def all(self, table_name):
-        data = self.db[table_name].find()
-        return [_load_pyobject(item) for item in data]
+    def persist_unique(self, obj, table_name):
+        try:
+            self.db[table_name].insert_one(self._to_document(obj))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    def persist_many(self, objs, table_name):
+        docs = [self._to_document(obj) for obj in objs]
+        if self._queue(table_name, [InsertOne(doc) for doc in docs]):
+            return
+        return self.db[table_name].insert_many(docs)
+
+    def all(self, table_name, fields=None):
+        return self.search_from_table(table_name, {}, fields=fields)
 
     def delete(self, identifier, table_name):
+        if self._queue(table_name, [DeleteOne({"id": identifier})]):
+            return
         return self.db[table_name].delete_one({"id": identifier})
 
+    def delete_many(self, identifiers, table_name):
+        condition = {"id": {"$in": list(identifiers)}}
+        if self._queue(table_name, [DeleteMany(condition)]):
+            return
+        return self.db[table_name].delete_many(condition)
+
     def update(self, identifier, obj, table_name):
-        data = obj.to_primitive()
-        data["_id"] = data["id"]
-        data["_pyobject"] = get_model_path(obj)
+        data = self._to_document(obj)
+        if self._queue(table_name,
+                       [ReplaceOne({"id": identifier}, data, upsert=True)]):
+            return
         return self.db[table_name].update({"id": identifier}, data, True)
 
-    def search_from_table(self, table_name, condition):
+    def update_many(self, objs, table_name):
+        requests = [
+            ReplaceOne({"id": obj.id}, self._to_document(obj), upsert=True)
+            for obj in objs
+        ]
+        if self._queue(table_name, requests):
+            return
+        return self.db[table_name].bulk_write(requests, ordered=False)
+
+    def search_from_table(self, table_name, condition, fields=None):
+        if fields:
+            projection = dict.fromkeys(fields, True)
+            projection.setdefault("_id", False)
+            data = self.db[table_name].find(condition, projection)
+            return [tuple(item.get(field) for field in fields)
+                    for item in data]
+
         data = self.db[table_name].find(condition)
-        return [_load_pyobject(item) for item in data]
+        return [_load_pyobject(item, self._trusted_rows) for item in data]
+
+    def iter_search_from_table(self, table_name, condition,
+                               limit=None, after=None):
+        if after is not None:
+            condition = dict(condition, id={"$gt": after})
+
+        cursor = self.db[table_name].find(condition)
+        if limit is not None or after is not None:
+            cursor = cursor.sort("id", ASCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+
+        trusted = self._trusted_rows
+        for item in cursor:
+            yield _load_pyobject(item, trusted)
 
     def count_from_table(self, table_name, condition):
         return self.db[table_name].count(condition)
@@ -187,60 +860,290 @@ class PyMongoBackend(PyMongo):
     def update_to_table(self, table_name, condition, obj):
         data = obj.to_primitive()
         data["_pyobject"] = get_model_path(obj)
+        if self._queue(table_name,
+                       [ReplaceOne(condition, data, upsert=True)]):
+            return
         return self.db[table_name].update(condition, data, True)
 
     def delete_from_table(self, table_name, condition):
+        if self._queue(table_name, [DeleteOne(condition)]):
+            return
         return self.db[table_name].delete_one(condition)
 
+    def watch(self, fields):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(fields)}}}]
+        try:
+            stream = self.db.watch(pipeline, full_document="updateLookup",
+                                   max_await_time_ms=1000)
+        except (TypeError, NotImplementedError, OperationFailure):
+            # requires pymongo 3.7+ and MongoDB replica set
+            raise NotImplementedError("change streams are not available")
+        return self._iter_change_stream(stream, fields)
+
+    def _iter_change_stream(self, stream, fields):
+        types = {"insert": "insert", "update": "update",
+                 "replace": "update", "delete": "delete"}
+
+        with stream:
+            while stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    yield None
+                    continue
+
+                change_type = types.get(change["operationType"])
+                if not change_type:
+                    continue
+
+                table_name = change["ns"]["coll"]
+                data = None
+                if change_type != "delete":
+                    doc = change.get("fullDocument") or {}
+                    data = {field: doc.get(field)
+                            for field in fields[table_name]}
+
+                yield {"table": table_name, "type": change_type,
+                       "id": change["documentKey"]["_id"], "data": data}
+
+    def get_table_version(self, table_name):
+        data = self.db[TABLE_VERSIONS].find_one({"_id": table_name})
+        return data["version"] if data else 0
+
+    def bump_table_version(self, table_name):
+        condition = {"_id": table_name}
+        changes = {"$inc": {"version": 1}}
+        if self._queue(TABLE_VERSIONS,
+                       [UpdateOne(condition, changes, upsert=True)]):
+            return
+        self.db[TABLE_VERSIONS].update_one(condition, changes, upsert=True)
+
+    def create_indexes(self, schema):
+        collection = self.db[schema["name"]]
+        existing = collection.index_information()
+        created = []
+
+        # lookups are made by ``id`` rather than ``_id``
+        indexes = [("id",)] + list(schema.get("indexes", []))
+
+        for columns in indexes:
+            name = get_index_name(schema["name"], columns)
+            if name in existing:
+                continue
+
+            collection.create_index(
+                [(column, ASCENDING) for column in columns],
+                name=name,
+                unique=(columns == ("id",)),
+            )
+            created.append(name)
+        return created
+
 
 class DatasetBackend(Dataset):
+    def __init__(self, app=None):
+        # table handles are shared by all threads in the process
+        self._tables = {}
+        self._tables_lock = threading.Lock()
+        super(DatasetBackend, self).__init__(app)
+
+    @property
+    def _trusted_rows(self):
+        return self.app.config.get("DATABASE_TRUSTED_ROWS", False)
+
     def _get_context(self):
-        return self.app.test_request_context()
+        # statements run on thread-local connection and either
+        # autocommit or join the unit of work of current thread,
+        # so there's no need to push app/request context here
+        return _null_context
+
+    @contextlib.contextmanager
+    def unit_of_work(self):
+        try:
+            with self.connection:
+                yield
+        except Exception:
+            # tables created inside rolled back transaction may be gone
+            self.clear_table_cache()
+            raise
+
+    def transaction(self):
+        return self.unit_of_work()
+
+    def _on_connect(self):
+        # cached handles are bound to previous connection
+        self._tables = {}
 
     def _get_table(self, table_name):
-        table = self.connection.get_table(
-            table_name, primary_id="id", primary_type="String(36)",
-        )
+        table = self._tables.get(table_name)
+        if table is not None:
+            return table
+
+        with self._tables_lock:
+            table = self._tables.get(table_name)
+            if table is None:
+                table = self.connection.get_table(
+                    table_name, primary_id="id", primary_type="String(36)",
+                )
 
-        # preload the ``_pyobject`` column
-        if not table._has_column("_pyobject"):
-            table.create_column("_pyobject", Unicode(255))
+                # preload the ``_pyobject`` column
+                if not table._has_column("_pyobject"):
+                    table.create_column("_pyobject", Unicode(255))
+                self._tables[table_name] = table
         return table
 
+    def clear_table_cache(self, table_name=None):
+        """Drops cached table handle(s), so table metadata will be
+        reflected again on next access.
+        """
+        with self._tables_lock:
+            if table_name is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(table_name, None)
+
+    def prewarm_tables(self, table_names):
+        for table_name in table_names:
+            self._get_table(table_name)
+
+    def _to_rows(self, table, objs):
+        rows = []
+        for obj in objs:
+            data = obj.to_primitive()
+            data["_pyobject"] = get_model_path(obj)
+
+            # schema changes can't be part of the transaction,
+            # hence missing columns are created upfront
+            if self.connection.ensure_schema:
+                table._ensure_columns(data, types=obj._schema["columns"])
+            rows.append(data)
+        return rows
+
     def get(self, identifier, table_name):
         data = self._get_table(table_name).find_one(id=identifier)
 
         if not data:
             return
-        return _load_pyobject(data)
+        return _load_pyobject(data, self._trusted_rows)
+
+    def _find(self, table, condition=None):
+        """Same as ``table.find(**condition)``, but rows are plain dicts
+        rather than ``OrderedDict`` built by dataset, which is costly
+        for large result sets.
+        """
+        query = table.table.select()
+        if condition:
+            query = query.where(
+                table._args_to_clause(condition, ensure=False),
+            )
+        return [dict(row.items())
+                for row in self.connection.executable.execute(query)]
+
+    def get_many(self, identifiers, table_name, field="id"):
+        table = self._get_table(table_name)
+        data = self._find(table, {field: list(identifiers)})
+        return [_load_pyobject(item, self._trusted_rows) for item in data]
 
     def persist(self, obj, table_name):
         data = obj.to_primitive()
         data["_pyobject"] = get_model_path(obj)
         return self._get_table(table_name).insert(
             data,
-            types=obj._schema,
+            types=obj._schema["columns"],
         )
 
-    def all(self, table_name):
+    def persist_unique(self, obj, table_name):
+        table = self._get_table(table_name)
+        row = self._to_rows(table, [obj])[0]
+        try:
+            self.connection.executable.execute(table.table.insert(), row)
+        except IntegrityError:
+            return False
+        return True
+
+    def persist_many(self, objs, table_name):
         table = self._get_table(table_name)
-        return [_load_pyobject(item) for item in table.all()]
+        rows = self._to_rows(table, objs)
+
+        with self.connection:
+            # a single executemany inside one transaction
+            self.connection.executable.execute(table.table.insert(), rows)
+
+    def all(self, table_name, fields=None):
+        if fields:
+            return self.search_from_table(table_name, {}, fields=fields)
+
+        table = self._get_table(table_name)
+        trusted = self._trusted_rows
+        return [_load_pyobject(item, trusted) for item in self._find(table)]
 
     def delete(self, identifier, table_name):
         return self._get_table(table_name).delete(id=identifier)
 
+    def delete_many(self, identifiers, table_name):
+        return self._get_table(table_name).delete(id=list(identifiers))
+
     def update(self, identifier, obj, table_name):
         data = obj.to_primitive()
         data["_pyobject"] = get_model_path(obj)
         return self._get_table(table_name).update(
             data,
             ["id"],
-            types=obj._schema,
+            types=obj._schema["columns"],
         )
 
-    def search_from_table(self, table_name, condition):
-        data = self._get_table(table_name).find(**condition)
-        return [_load_pyobject(item) for item in data]
+    def update_many(self, objs, table_name):
+        table = self._get_table(table_name)
+        rows = self._to_rows(table, objs)
+
+        with self.connection:
+            for row in rows:
+                stmt = table.table.update(
+                    table.table.c.id == row["id"],
+                    row,
+                )
+                self.connection.executable.execute(stmt)
+
+    def search_from_table(self, table_name, condition, fields=None):
+        table = self._get_table(table_name)
+
+        if fields:
+            # columns which haven't been created yet are selected as NULL
+            columns = [
+                table.table.c[field] if table._has_column(field)
+                else null().label(field)
+                for field in fields
+            ]
+            query = select(columns)
+            if condition:
+                query = query.where(
+                    table._args_to_clause(condition, ensure=False),
+                )
+            return [tuple(row) for row in self.connection.executable.execute(query)]
+
+        trusted = self._trusted_rows
+        return [_load_pyobject(item, trusted)
+                for item in self._find(table, condition)]
+
+    def iter_search_from_table(self, table_name, condition,
+                               limit=None, after=None):
+        table = self._get_table(table_name)
+        query = table.table.select().execution_options(stream_results=True)
+        if condition:
+            query = query.where(
+                table._args_to_clause(condition, ensure=False),
+            )
+        if after is not None:
+            query = query.where(table.table.c.id > after)
+        if limit is not None or after is not None:
+            query = query.order_by(table.table.c.id).limit(limit)
+
+        trusted = self._trusted_rows
+        result = self.connection.executable.execute(query)
+        try:
+            for row in result:
+                yield _load_pyobject(dict(row.items()), trusted)
+        finally:
+            result.close()
 
     def count_from_table(self, table_name, condition):
         return self._get_table(table_name).count(**condition)
@@ -252,12 +1155,64 @@ class DatasetBackend(Dataset):
         return self._get_table(table_name).update(
             data,
             condition.keys(),
-            types=obj._schema,
+            types=obj._schema["columns"],
         )
 
     def delete_from_table(self, table_name, condition):
         return self._get_table(table_name).delete(**condition)
 
+    def watch(self, fields):
+        raise NotImplementedError("change feed is not supported")
+
+    def _get_versions_table(self):
+        table = self._get_table(TABLE_VERSIONS)
+        if not table._has_column("version"):
+            table.create_column("version", Integer)
+        return table.table
+
+    def get_table_version(self, table_name):
+        versions = self._get_versions_table()
+        query = select([versions.c.version]).where(versions.c.id == table_name)
+        return self.connection.executable.execute(query).scalar() or 0
+
+    def bump_table_version(self, table_name):
+        versions = self._get_versions_table()
+        stmt = versions.update().where(versions.c.id == table_name).values(
+            version=versions.c.version + 1,
+        )
+        if self.connection.executable.execute(stmt).rowcount:
+            return
+
+        try:
+            self.connection.executable.execute(
+                versions.insert(), id=table_name, version=1,
+            )
+        except IntegrityError:
+            # inserted by another process in the meantime
+            self.connection.executable.execute(stmt)
+
+    def create_indexes(self, schema):
+        table = self._get_table(schema["name"])
+        existing = [
+            index["name"] for index in
+            sa_inspect(self.connection.engine).get_indexes(table.table.name)
+        ]
+        created = []
+
+        for columns in schema.get("indexes", []):
+            name = get_index_name(schema["name"], columns)
+            if name in existing:
+                continue
+
+            for column in columns:
+                if not table._has_column(column):
+                    table.create_column(column, schema["columns"][column])
+
+            index = Index(name, *[table.table.c[column] for column in columns])
+            index.create(self.connection.engine)
+            created.append(name)
+        return created
+
 
 # shortcut to database object
 db = Database()
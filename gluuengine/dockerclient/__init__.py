@@ -4,3 +4,6 @@
 # All rights reserved.
 
 from ._docker import Docker  # noqa
+from ._async import AsyncDocker  # noqa
+from ._docker import client_pool  # noqa
+from ._docker import image_inventory  # noqa
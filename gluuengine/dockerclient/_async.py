@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import json
+import os
+import shlex
+import struct
+import threading
+import urllib
+from io import BytesIO
+from urlparse import urlparse
+
+from docker.constants import DEFAULT_DOCKER_API_VERSION
+from docker.utils import create_container_config
+from docker.utils import create_host_config
+from twisted.internet.defer import Deferred
+from twisted.internet.defer import DeferredSemaphore
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import returnValue
+from twisted.internet.endpoints import UNIXClientEndpoint
+from twisted.internet.protocol import Protocol
+from twisted.web.client import Agent
+from twisted.web.client import FileBodyProducer
+from twisted.web.client import HTTPConnectionPool
+from twisted.web.client import ResponseDone
+from twisted.web.client import readBody
+from twisted.web.http import PotentialDataLoss
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import IAgentEndpointFactory
+from twisted.web.iweb import IPolicyForHTTPS
+from zope.interface import implementer
+
+from ..errors import DockerAPIError
+from ..errors import DockerExecError
+from ._docker import DockerExecResult
+from ._docker import PullProgress
+from ._docker import image_inventory
+from ._docker import _normalize_image
+
+
+@implementer(IPolicyForHTTPS)
+class _TLSPolicy(object):
+    """Client certificate and CA of docker-machine's TLS config.
+    """
+
+    def __init__(self, tls):
+        # requires pyOpenSSL
+        from twisted.internet import ssl
+
+        cert_fn, key_fn = tls.cert
+        with open(cert_fn) as cert, open(key_fn) as key:
+            client_cert = ssl.PrivateCertificate.loadPEM(cert.read() + key.read())
+
+        kwargs = {
+            "privateKey": client_cert.privateKey.original,
+            "certificate": client_cert.original,
+        }
+        if tls.ca_cert:
+            with open(tls.ca_cert) as ca:
+                kwargs["verify"] = True
+                kwargs["caCerts"] = [ssl.Certificate.loadPEM(ca.read()).original]
+        self.options = ssl.CertificateOptions(**kwargs)
+
+    def creatorForNetloc(self, hostname, port):
+        return self.options
+
+
+@implementer(IAgentEndpointFactory)
+class _UnixEndpointFactory(object):
+    def __init__(self, reactor, path):
+        self.reactor = reactor
+        self.path = path
+
+    def endpointForURI(self, uri):
+        return UNIXClientEndpoint(self.reactor, self.path)
+
+
+class _LineReceiver(Protocol):
+    """Passes each line of a streamed response body to ``callback``.
+    """
+
+    def __init__(self, finished, callback):
+        self.finished = finished
+        self.callback = callback
+        self.buffer = ""
+
+    def dataReceived(self, data):
+        lines = (self.buffer + data).split("\n")
+        self.buffer = lines.pop()
+        for line in lines:
+            self.callback(line)
+
+    def connectionLost(self, reason):
+        if self.buffer:
+            self.callback(self.buffer)
+        if reason.check(ResponseDone, PotentialDataLoss):
+            self.finished.callback(None)
+        else:
+            self.finished.errback(reason)
+
+
+def _demux(content):
+    """Joins stdout and stderr frames of non-TTY attach/exec stream.
+    """
+    output = []
+    while len(content) >= 8:
+        _, size = struct.unpack(">BxxxL", content[:8])
+        output.append(content[8:8 + size])
+        content = content[8 + size:]
+    return "".join(output)
+
+
+class AsyncDocker(object):
+    """Non-blocking counterpart of :class:`~gluuengine.dockerclient.Docker`
+    running on Twisted reactor.
+
+    Every method returns a ``Deferred`` and must be called from reactor
+    thread. Requests share persistent connections per daemon, and at most
+    ``max_concurrency`` requests about the same node (including the ones
+    routed through swarm master) are in flight; the rest wait without
+    occupying a thread.
+    """
+
+    #: Agents and base URLs per daemon, shared by all instances
+    _daemons = {}
+    #: Request limiters per node
+    _limiters = {}
+    _pid = None
+    _lock = threading.Lock()
+
+    def __init__(self, config, swarm_config, reactor=None, max_concurrency=10):
+        if reactor is None:
+            from twisted.internet import reactor
+        self.config = config
+        self.swarm_config = swarm_config
+        self.reactor = reactor
+        self.max_concurrency = max_concurrency
+        self.registry_base_url = "gluufederation"
+
+    @classmethod
+    def _check_fork(cls):
+        # connections and semaphores must not be shared with forked
+        # processes; must be called while holding ``_lock``
+        if cls._pid != os.getpid():
+            cls._daemons = {}
+            cls._limiters = {}
+            cls._pid = os.getpid()
+
+    def _get_daemon(self, use_swarm=True):
+        cfg = self.swarm_config if use_swarm else self.config
+        base_url = cfg.get("base_url")
+        key = (base_url, id(self.reactor))
+
+        with self._lock:
+            self._check_fork()
+            daemon = self._daemons.get(key)
+            if daemon is None:
+                daemon = self._make_daemon(base_url, cfg.get("tls"))
+                self._daemons[key] = daemon
+        return daemon
+
+    def _get_limiter(self):
+        key = (self.config.get("base_url"), id(self.reactor))
+
+        with self._lock:
+            self._check_fork()
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = DeferredSemaphore(self.max_concurrency)
+                self._limiters[key] = limiter
+        return limiter
+
+    def _make_daemon(self, base_url, tls):
+        pool = HTTPConnectionPool(self.reactor, persistent=True)
+        pool.maxPersistentPerHost = self.max_concurrency
+        url = urlparse(base_url)
+
+        if url.scheme in ("unix", "http+unix"):
+            agent = Agent.usingEndpointFactory(
+                self.reactor,
+                _UnixEndpointFactory(self.reactor, "/" + (url.netloc + url.path).lstrip("/")),
+                pool=pool,
+            )
+            base_url = "http://localhost"
+        elif tls and not isinstance(tls, bool):
+            agent = Agent(self.reactor, contextFactory=_TLSPolicy(tls), pool=pool)
+            base_url = base_url.replace("tcp://", "https://")
+        else:
+            agent = Agent(self.reactor, pool=pool)
+            base_url = base_url.replace("tcp://", "http://")
+        return agent, base_url
+
+    def _request(self, method, path, params=None, data=None, use_swarm=True,
+                 on_line=None):
+        """Sends a request to Docker API.
+
+        :param on_line: If given, response body is streamed to this
+                        callback line by line instead of being returned.
+        :raises: ``DockerAPIError`` if response status is 4xx/5xx.
+        """
+        agent, base_url = self._get_daemon(use_swarm)
+
+        url = "{}/v{}{}".format(base_url, DEFAULT_DOCKER_API_VERSION, path)
+        if params:
+            url = "{}?{}".format(url, urllib.urlencode(params))
+
+        body = None
+        if data is not None:
+            body = FileBodyProducer(BytesIO(json.dumps(data)))
+
+        @inlineCallbacks
+        def send():
+            resp = yield agent.request(
+                method, url,
+                Headers({"Content-Type": ["application/json"]}),
+                body,
+            )
+            if resp.code >= 400 or on_line is None:
+                content = yield readBody(resp)
+                if resp.code >= 400:
+                    raise DockerAPIError(resp.code, content.strip())
+                returnValue(content)
+
+            finished = Deferred()
+            resp.deliverBody(_LineReceiver(finished, on_line))
+            yield finished
+        return self._get_limiter().run(send)
+
+    @inlineCallbacks
+    def _request_json(self, method, path, params=None, data=None,
+                      use_swarm=True):
+        content = yield self._request(method, path, params, data, use_swarm)
+        returnValue(json.loads(content) if content else None)
+
+    @inlineCallbacks
+    def image_exists(self, name):
+        """Checks whether a docker image exists in the node; shares
+        ``image_inventory`` with :class:`Docker`.
+        """
+        base_url = self.config.get("base_url")
+        images = image_inventory.get(base_url)
+
+        if images is None:
+            resp = yield self._request_json("GET", "/images/json",
+                                            use_swarm=False)
+            images = set()
+            for image in resp:
+                images.update(image.get("RepoTags") or [])
+            image_inventory.set(base_url, images)
+        returnValue(_normalize_image(name) in images)
+
+    @inlineCallbacks
+    def pull_image(self, image, progress=None, interval=10):
+        """Pulls image into the node, streaming the progress.
+
+        :returns: ``True`` if image is pulled, otherwise ``False``.
+        """
+        repo, tag = image, "latest"
+        if ":" in image.rsplit("/", 1)[-1]:
+            repo, tag = image.rsplit(":", 1)
+
+        pull = PullProgress(image, progress, interval)
+        yield self._request(
+            "POST", "/images/create", params={"fromImage": repo, "tag": tag},
+            use_swarm=False, on_line=pull.feed,
+        )
+
+        if not pull.finish():
+            returnValue(False)
+        image_inventory.add(self.config.get("base_url"), _normalize_image(image))
+        returnValue(True)
+
+    def inspect_container(self, container_id):
+        return self._request_json(
+            "GET", "/containers/{}/json".format(container_id),
+        )
+
+    def stop_container(self, container_id):
+        return self._request(
+            "POST", "/containers/{}/stop".format(container_id),
+        )
+
+    def remove_container(self, container_id):
+        return self._request(
+            "DELETE", "/containers/{}".format(container_id),
+            params={"force": 1},
+        )
+
+    @inlineCallbacks
+    def run_container(self, name, image, env=None, port_bindings=None,
+                      volumes=None, dns=None, dns_search=None,
+                      ulimits=None, hostname=None):
+        """Creates and starts a container in detached mode.
+
+        :returns: A string of container ID in long format.
+        """
+        host_config = create_host_config(
+            version=DEFAULT_DOCKER_API_VERSION,
+            port_bindings=port_bindings or {},
+            binds=volumes or {},
+            dns=dns or [],
+            dns_search=dns_search or [],
+            ulimits=ulimits or [],
+            network_mode="weave",
+            restart_policy={
+                "Name": "unless-stopped",
+                "MaximumRetryCount": 10,
+            },
+        )
+        data = create_container_config(
+            DEFAULT_DOCKER_API_VERSION, image, None,
+            hostname=hostname,
+            detach=True,
+            environment=env or {},
+            host_config=host_config,
+        )
+        container = yield self._request_json(
+            "POST", "/containers/create", params={"name": name}, data=data,
+        )
+        container_id = container["Id"]
+
+        if container_id:
+            yield self._request(
+                "POST", "/containers/{}/start".format(container_id),
+            )
+        returnValue(container_id)
+
+    @inlineCallbacks
+    def setup_container(self, name, image, env=None, port_bindings=None,
+                        volumes=None, dns=None, dns_search=None, ulimits=None,
+                        hostname=None, progress=None):
+        """Pulls the image (if needed), then creates and starts
+        a container.
+
+        :returns: A string of container ID in long format.
+        """
+        image = "{}/{}".format(self.registry_base_url, image)
+
+        exists = yield self.image_exists(image)
+        if not exists:
+            yield self.pull_image(image, progress=progress)
+
+        run_kwargs = {
+            "name": name,
+            "image": image,
+            "env": env,
+            "port_bindings": port_bindings,
+            "volumes": volumes,
+            "dns": dns,
+            "dns_search": dns_search,
+            "ulimits": ulimits,
+            "hostname": hostname,
+        }
+        try:
+            container_id = yield self.run_container(**run_kwargs)
+        except DockerAPIError as exc:
+            if exc.status_code != 404 or \
+                    "no such image" not in exc.explanation.lower():
+                raise
+
+            # image is removed outside the engine (e.g. ``docker rmi``)
+            # while inventory still lists it; pull it again and retry once
+            image_inventory.invalidate(self.config.get("base_url"))
+            yield self.pull_image(image, progress=progress)
+            container_id = yield self.run_container(**run_kwargs)
+        returnValue(container_id)
+
+    @inlineCallbacks
+    def exec_cmd(self, container, cmd):
+        """Runs a command in container.
+
+        :returns: A ``DockerExecResult``.
+        :raises: ``DockerExecError`` if the command fails.
+        """
+        if isinstance(cmd, unicode):
+            cmd = cmd.encode("utf-8")
+
+        exec_ = yield self._request_json(
+            "POST", "/containers/{}/exec".format(container),
+            data={
+                "Cmd": shlex.split(cmd),
+                "AttachStdout": True,
+                "AttachStderr": True,
+            },
+        )
+        output = yield self._request(
+            "POST", "/exec/{}/start".format(exec_["Id"]),
+            data={"Detach": False, "Tty": False},
+        )
+        retval = _demux(output)
+        inspect = yield self._request_json(
+            "GET", "/exec/{}/json".format(exec_["Id"]),
+        )
+
+        if inspect["ExitCode"] != 0:
+            raise DockerExecError(
+                "error while running docker exec",
+                retval,
+                inspect["ExitCode"],
+            )
+        returnValue(DockerExecResult(cmd=cmd, exit_code=inspect["ExitCode"],
+                                     retval=retval.strip()))
@@ -5,22 +5,273 @@
 
 import json
 import os
-import shutil
-import tempfile
+import pipes
+import shlex
+import threading
+import time
+import uuid
 from collections import namedtuple
 from contextlib import contextmanager
 
 import docker
+import docker.errors
 
 from ..errors import DockerExecError
 from ..utils import make_tarfile
-from ..utils import extract_tarfile
+from ..utils import make_multi_tarfile
+from ..utils import extract_tarfile_member
 
 
 DockerExecResult = namedtuple("DockerExecResult",
                               ["cmd", "exit_code", "retval"])
 
 
+def _count_connections(client):
+    """Counts connections opened so far by connection pools of
+    given client.
+    """
+    count = 0
+    for adapter in client.adapters.values():
+        # ``UnixAdapter`` keeps the pools by itself
+        pools = getattr(getattr(adapter, "poolmanager", None), "pools",
+                        getattr(adapter, "pools", None))
+        if pools is None:
+            continue
+        for key in pools.keys():
+            pool = pools.get(key)
+            count += getattr(pool, "num_connections", 0)
+    return count
+
+
+class DockerMetrics(object):
+    """Request counters of pooled Docker clients.
+
+    Requests which had to open a new connection (hence paid TCP and
+    TLS handshake) are counted as ``cold``; the difference between
+    average time of cold and warm requests approximates handshake cost.
+    Attribution is approximate when threads share a client.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._data = {
+                "clients": 0,
+                "requests": 0,
+                "request_time": 0.0,
+                "cold_requests": 0,
+                "cold_request_time": 0.0,
+            }
+
+    def record_client(self):
+        with self._lock:
+            self._data["clients"] += 1
+
+    def record_request(self, elapsed, cold):
+        with self._lock:
+            self._data["requests"] += 1
+            self._data["request_time"] += elapsed
+            if cold:
+                self._data["cold_requests"] += 1
+                self._data["cold_request_time"] += elapsed
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._data)
+
+
+class _PooledClient(docker.Client):
+    def __init__(self, metrics, *args, **kwargs):
+        self._metrics = metrics
+        super(_PooledClient, self).__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        connections = _count_connections(self)
+        start = time.time()
+        try:
+            return super(_PooledClient, self).send(request, **kwargs)
+        finally:
+            self._metrics.record_request(
+                time.time() - start,
+                _count_connections(self) > connections,
+            )
+
+
+class ClientPool(object):
+    """Keeps a ``docker.Client`` per daemon URL and TLS settings, so its
+    keep-alive connections are reused by all ``Docker`` instances and
+    threads instead of opening (and TLS-handshaking) a new connection
+    for every call.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.metrics = DockerMetrics()
+
+    def _get_key(self, base_url, tls):
+        if not tls or isinstance(tls, bool):
+            return (base_url, tls)
+        return (base_url, tls.ca_cert, tuple(tls.cert or ()),
+                getattr(tls, "verify", None))
+
+    def get(self, base_url, tls):
+        key = self._get_key(base_url, tls)
+
+        with self._lock:
+            # connections must not be shared with forked processes
+            if self._pid != os.getpid():
+                self._clients = {}
+                self._pid = os.getpid()
+
+            client = self._clients.get(key)
+            if client is None:
+                client = _PooledClient(self.metrics, base_url=base_url,
+                                       tls=tls)
+                self._clients[key] = client
+                self.metrics.record_client()
+        return client
+
+    def clear(self):
+        """Closes and drops all pooled clients.
+        """
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+    def stats(self):
+        with self._lock:
+            clients = list(self._clients.values())
+        stats = self.metrics.as_dict()
+        stats["pooled_clients"] = len(clients)
+        stats["connections"] = sum(_count_connections(client)
+                                   for client in clients)
+        return stats
+
+
+#: Docker clients shared by all ``Docker`` instances in the process
+client_pool = ClientPool()
+
+
+def _normalize_image(name):
+    # image without tag refers to ``latest`` tag
+    if ":" not in name.rsplit("/", 1)[-1]:
+        name = "{}:latest".format(name)
+    return name
+
+
+class ImageInventory(object):
+    """Known images (``repo:tag``) of each docker daemon, so checking
+    image presence doesn't need an API call before every container.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url):
+        """Gets a set of images known in given daemon, or ``None``
+        if the inventory is missing or expired.
+        """
+        with self._lock:
+            entry = self._images.get(base_url)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def set(self, base_url, images):
+        with self._lock:
+            self._images[base_url] = (time.time() + self.ttl,
+                                      frozenset(images))
+
+    def add(self, base_url, image):
+        with self._lock:
+            entry = self._images.get(base_url)
+            if entry is not None:
+                self._images[base_url] = (entry[0], entry[1] | {image})
+
+    def invalidate(self, base_url=None):
+        with self._lock:
+            if base_url is None:
+                self._images.clear()
+            else:
+                self._images.pop(base_url, None)
+
+
+#: Image inventory shared by all ``Docker`` instances in the process
+image_inventory = ImageInventory()
+
+
+def _format_pull_stats(layers, elapsed):
+    current = sum(layer[0] for layer in layers.values())
+    total = sum(layer[1] for layer in layers.values())
+    done = len([layer for layer in layers.values() if layer[0] >= layer[1]])
+    rate = current / elapsed if elapsed else 0
+    return "{}/{} layers, {:.1f}/{:.1f} MB at {:.2f} MB/s".format(
+        done, len(layers), current / 1e6, total / 1e6, rate / 1e6,
+    )
+
+
+class PullProgress(object):
+    """Tracks JSON stream of image pull, reporting layers, downloaded
+    size and throughput to ``progress`` callback every ``interval``
+    seconds.
+    """
+
+    def __init__(self, image, progress=None, interval=10):
+        self.image = image
+        self.progress = progress
+        self.interval = interval
+        self.start = self.last_report = time.time()
+        # current and total bytes of each layer
+        self.layers = {}
+        self.result = {}
+
+    def feed(self, line):
+        if not line.strip():
+            return
+
+        self.result = result = json.loads(line)
+        detail = result.get("progressDetail") or {}
+        layer_id = result.get("id")
+
+        if result.get("status") == "Downloading" and detail.get("total"):
+            self.layers[layer_id] = (detail.get("current", 0),
+                                     detail["total"])
+        elif result.get("status") == "Download complete" \
+                and layer_id in self.layers:
+            self.layers[layer_id] = (self.layers[layer_id][1],
+                                     self.layers[layer_id][1])
+
+        if self.progress and time.time() - self.last_report >= self.interval:
+            self.last_report = time.time()
+            self.progress("pulling {}: {}".format(
+                self.image,
+                _format_pull_stats(self.layers, self.last_report - self.start),
+            ))
+
+    def finish(self):
+        """Reports the pull summary.
+
+        :returns: ``True`` if image is pulled, otherwise ``False``.
+        """
+        if "errorDetail" in self.result:
+            return False
+
+        if self.progress:
+            elapsed = time.time() - self.start
+            self.progress("pulled {} in {:.1f} seconds ({})".format(
+                self.image, elapsed, _format_pull_stats(self.layers, elapsed),
+            ))
+        return True
+
+
 class Docker(object):
     def __init__(self, config, swarm_config):
         self.config = config
@@ -30,33 +281,54 @@ class Docker(object):
     def image_exists(self, name):
         """Checks whether a docker image exists.
 
+        Images of the node are listed once and kept in
+        ``image_inventory``.
+
         :param name: Image name
         :returns: ``True`` if image exists, otherwise ``False``
         """
-        with self._get_client(use_swarm=False) as client:
-            images = client.images(name, quiet=True)
-            return True if images else False
+        base_url = self.config.get("base_url")
+        images = image_inventory.get(base_url)
+
+        if images is None:
+            with self._get_client(use_swarm=False) as client:
+                images = set()
+                for image in client.images():
+                    images.update(image.get("RepoTags") or [])
+            image_inventory.set(base_url, images)
+        return _normalize_image(name) in images
 
     def setup_container(self, name, image, env=None, port_bindings=None,
                         volumes=None, dns=None, dns_search=None, ulimits=None,
-                        hostname=None):
+                        hostname=None, progress=None):
         image = "{}/{}".format(self.registry_base_url, image)
 
         # pull the image first if not exist
         if not self.image_exists(image):
-            self.pull_image(image)
-
-        return self.run_container(
-            name=name,
-            image=image,
-            env=env,
-            port_bindings=port_bindings,
-            volumes=volumes,
-            dns=dns,
-            dns_search=dns_search,
-            ulimits=ulimits,
-            hostname=hostname,
-        )
+            self.pull_image(image, progress=progress)
+
+        run_kwargs = {
+            "name": name,
+            "image": image,
+            "env": env,
+            "port_bindings": port_bindings,
+            "volumes": volumes,
+            "dns": dns,
+            "dns_search": dns_search,
+            "ulimits": ulimits,
+            "hostname": hostname,
+        }
+        try:
+            return self.run_container(**run_kwargs)
+        except docker.errors.NotFound as exc:
+            if "no such image" not in (exc.explanation or "").lower():
+                raise
+
+            # image is removed outside the engine (e.g. ``docker rmi``)
+            # while inventory still lists it; pull it again and retry once
+            image_inventory.invalidate(self.config.get("base_url"))
+            self.pull_image(image, progress=progress)
+            return self.run_container(**run_kwargs)
 
     def get_container_ip(self, container_id):
         """Gets container IP.
@@ -90,21 +362,26 @@ class Docker(object):
         with self._get_client() as client:
             client.stop(container_id)
 
-    def pull_image(self, image):
-        with self._get_client(use_swarm=False) as client:
-            resp = client.pull(repository=image, stream=True)
-            output = ""
+    def pull_image(self, image, progress=None, interval=10):
+        """Pulls image into the node.
 
-            while True:
-                try:
-                    output = resp.next()
-                except StopIteration:
-                    break
+        :param image: Image name.
+        :param progress: A callback receiving progress messages (layers,
+                         downloaded size and throughput).
+        :param interval: Seconds between progress messages.
+        :returns: ``True`` if image is pulled, otherwise ``False``.
+        """
+        pull = PullProgress(image, progress, interval)
+
+        with self._get_client(use_swarm=False) as client:
+            for output in client.pull(repository=image, stream=True):
+                for line in output.splitlines():
+                    pull.feed(line)
 
-            result = json.loads(output)
-            if "errorDetail" in result:
-                return False
-            return True
+        if not pull.finish():
+            return False
+        image_inventory.add(self.config.get("base_url"), _normalize_image(image))
+        return True
 
     def run_container(self, name, image, env=None, port_bindings=None,
                       volumes=None, dns=None, dns_search=None,
@@ -161,6 +438,10 @@ class Docker(object):
             return container_id
 
     def copy_to_container(self, container, src, dest):
+        # a single file is put in place by one archive upload
+        if os.path.isfile(src):
+            return self.copy_many_to_container(container, {src: dest})
+
         res = self.exec_cmd(container, "mktemp -d")
         tmp_path = res.retval
 
@@ -178,22 +459,50 @@ class Docker(object):
         )
         self.exec_cmd(container, "rm -rf {}".format(tmp_path))
 
+    def copy_many_to_container(self, container, files=None, contents=None):
+        """Copies files into container using a single archive upload.
+
+        Missing parent directories are created and existing files are
+        overwritten. A directory is copied to exactly ``dest`` path.
+
+        :param container: ID or name of the container.
+        :param files: A ``dict`` of ``{local_path: dest_path}``.
+        :param contents: A ``dict`` of ``{dest_path: content}`` written
+                         from memory.
+        """
+        if not files and not contents:
+            return
+
+        with self._get_client() as client:
+            client.put_archive(container, "/",
+                               make_multi_tarfile(files, contents))
+
     def copy_from_container(self, container, src, dest):
-        with tempfile.NamedTemporaryFile() as fd:
-            with self._get_client() as client:
-                resp, _ = client.get_archive(container, src)
-                for stream in resp:
-                    fd.write(stream)
-                fd.seek(0)
+        """Copies file or directory from container.
 
-                # pull archive to temporary path
-                tmp_path = tempfile.mkdtemp()
-                extract_tarfile(fd, tmp_path)
+        The archive is streamed and only the requested path is extracted.
+        Like ``mv``, if ``dest`` is an existing directory, ``src`` is
+        copied into it.
 
-                if not os.path.exists(os.path.dirname(dest)):
-                    os.makedirs(os.path.dirname(dest))
-                shutil.move("{}/{}".format(tmp_path, os.path.basename(src)), dest)
-                shutil.rmtree(tmp_path)
+        :param container: ID or name of the container.
+        :param src: Path in container.
+        :param dest: Local path.
+        :raises: ``IOError`` if ``src`` is missing from the archive.
+        """
+        name = os.path.basename(src.rstrip("/"))
+        if os.path.isdir(dest):
+            dest = os.path.join(dest, name)
+
+        parent = os.path.dirname(dest)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent)
+
+        with self._get_client() as client:
+            resp, _ = client.get_archive(container, src)
+            if not extract_tarfile_member(resp, name, dest):
+                raise IOError(
+                    "unable to copy {} from container {}".format(src, container)
+                )
 
     def _swarm_conf_str(self):
         cfg_str = " ".join([
@@ -222,6 +531,80 @@ class Docker(object):
                                       retval=retval.strip())
             return result
 
+    def exec_script(self, container, cmds):
+        """Runs a batch of commands in a single docker exec.
+
+        Commands are parsed the same way as in :meth:`exec_cmd` and
+        written into one shell script, so the batch takes a single
+        exec round-trip instead of one per command. Execution stops at
+        the first failed command.
+
+        :param container: ID or name of the container.
+        :param cmds: A list of command strings.
+        :returns: A list of ``DockerExecResult`` (one per command).
+        :raises: ``DockerExecError`` if any command fails; its ``cmd``,
+                 ``index`` and ``results`` tell the failed command and
+                 results of the commands before it.
+        """
+        # unique marker written after each step to separate outputs
+        marker = "__step_{}__".format(uuid.uuid4().hex)
+
+        script = []
+        for idx, cmd in enumerate(cmds):
+            if isinstance(cmd, unicode):
+                cmd = cmd.encode("utf-8")
+            script.append(" ".join(pipes.quote(arg) for arg in shlex.split(cmd)))
+            script.append(
+                "rc=$?; printf '\\n{} {} %d\\n' $rc; "
+                "[ $rc -eq 0 ] || exit $rc".format(marker, idx)
+            )
+
+        with self._get_client() as client:
+            exec_cmd = client.exec_create(container, cmd=["sh", "-c", "\n".join(script)])
+            output = client.exec_start(exec_cmd)
+            inspect = client.exec_inspect(exec_cmd)
+
+        results = []
+        lines = []
+        for line in output.splitlines():
+            if not line.startswith(marker):
+                lines.append(line)
+                continue
+
+            _, idx, exit_code = line.split()
+            retval = "\n".join(lines).strip()
+            lines = []
+
+            idx = int(idx)
+            if int(exit_code) != 0:
+                raise DockerExecError(
+                    "error while running docker exec "
+                    "(step {}: {})".format(idx, cmds[idx]),
+                    retval,
+                    int(exit_code),
+                    cmd=cmds[idx],
+                    index=idx,
+                    results=results,
+                )
+            results.append(DockerExecResult(cmd=cmds[idx],
+                                            exit_code=0, retval=retval))
+
+        if inspect["ExitCode"] != 0 or len(results) != len(cmds):
+            # the script is cut short (e.g. killed) while running
+            # the step after the last reported one
+            idx = len(results)
+            cmd = cmds[idx] if idx < len(cmds) else None
+            raise DockerExecError(
+                "error while running docker exec "
+                "(step {}: {})".format(idx, cmd),
+                "\n".join(lines).strip(),
+                inspect["ExitCode"],
+                cmd=cmd,
+                index=idx,
+                results=results,
+            )
+        return results
+
     @contextmanager
     def _get_client(self, use_swarm=True):
         if use_swarm:
@@ -229,8 +612,5 @@ class Docker(object):
         else:
             cfg = self.config
 
-        client = docker.Client(base_url=cfg.get("base_url"), tls=cfg.get("tls"))
-        try:
-            yield client
-        finally:
-            client.close()
+        # pooled client is kept open for next calls
+        yield client_pool.get(cfg.get("base_url"), cfg.get("tls"))
@@ -15,10 +15,25 @@ class SaltEventError(Exception):
 
 
 class DockerExecError(Exception):
-    def __init__(self, msg, cmd_err="", exit_code=None):
+    def __init__(self, msg, cmd_err="", exit_code=None, cmd=None,
+                 index=None, results=None):
         self.msg = msg
         self.cmd_err = cmd_err
         self.exit_code = exit_code
+        # failed command (and its index in a batch) and results of
+        # the commands which succeeded before it
+        self.cmd = cmd
+        self.index = index
+        self.results = results or []
 
     def __str__(self):
         return repr("{}: {}".format(self.msg, self.cmd_err))
+
+
+class DockerAPIError(Exception):
+    def __init__(self, status_code, explanation=""):
+        self.status_code = status_code
+        self.explanation = explanation
+
+    def __str__(self):
+        return repr("{}: {}".format(self.status_code, self.explanation))
@@ -8,6 +8,7 @@ import os
 import time
 
 from .task import LicenseWatcherTask
+from .task import MachineStatusTask
 from .utils import as_boolean
 
 
@@ -36,6 +37,10 @@ def post_fork(server, worker):
     # inside crochet/twisted reactor, we cannot use `when_ready` nor `pre_fork`
     # hook because, somehow, reactor seems unitialized in those hooks
     app = server.app.load_wsgiapp()
+
+    # each worker keeps its own machine status table
+    MachineStatusTask(app).perform_job()
+
     runfile = os.path.join(app.config["DATA_DIR"], "lwatcher.run")
 
     if as_boolean(app.config["ENABLE_LICENSE"]):
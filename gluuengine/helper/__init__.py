@@ -12,3 +12,6 @@ from .container_helper import OxasimbaContainerHelper  # noqa
 
 from .prometheus_helper import PrometheusHelper  # noqa
 from .node_helper import distribute_cluster_data  # noqa
+from .pool import get_setup_pool  # noqa
+from .scheduler import ScaleScheduler  # noqa
+from .scheduler import get_scale_scheduler  # noqa
@@ -8,12 +8,15 @@ import os
 import logging
 import time
 
-import docker.errors
-from requests.exceptions import SSLError
-from requests.exceptions import ConnectionError
 from crochet import run_in_reactor
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.error import ConnectError
+from twisted.internet.threads import deferToThreadPool
+from twisted.web.client import ResponseNeverReceived
 
 from .node_helper import distribute_cluster_data
+from .pool import get_setup_pool
 # from .prometheus_helper import PrometheusHelper
 from ..database import db
 from ..model import STATE_SUCCESS
@@ -21,16 +24,18 @@ from ..model import STATE_FAILED
 from ..model import STATE_DISABLED
 from ..model import STATE_SETUP_FINISHED
 from ..model import STATE_TEARDOWN_FINISHED
+from ..model import Placement
 from ..setup import LdapSetup
 from ..setup import OxauthSetup
 from ..setup import OxtrustSetup
 from ..setup import OxidpSetup
 from ..setup import NginxSetup
 from ..setup import OxasimbaSetup
+from ..errors import DockerAPIError
 from ..log import create_file_logger
 from ..utils import exc_traceback
 from ..machine import Machine
-from ..dockerclient import Docker
+from ..dockerclient import AsyncDocker
 from ..weave import Weave
 
 
@@ -73,29 +78,42 @@ class BaseContainerHelper(object):
         except IndexError:
             master_node = self.node
 
-        self.docker = Docker(
+        self.docker = AsyncDocker(
             mc.config(self.node.name),
             mc.swarm_config(master_node.name),
+            max_concurrency=self.app.config["DOCKER_MAX_REQUESTS_PER_NODE"],
         )
 
         self.weave = Weave(self.node, self.app)
         # self.prometheus = PrometheusHelper(self.app, logger=self.logger)
 
+    def _defer_to_pool(self, func, *args, **kwargs):
+        # blocking steps (SSH, docker exec, database) run on the setup
+        # pool while Docker API calls are made from reactor thread
+        return deferToThreadPool(reactor, get_setup_pool(self.app),
+                                 func, *args, **kwargs)
+
     @run_in_reactor
     def setup(self):
-        self.mp_setup()
+        return self.async_setup()
+
+    @inlineCallbacks
+    def async_setup(self):
+        """Runs the container setup; must be called from reactor thread.
 
-    def mp_setup(self):
-        """Runs the container setup.
+        Container is created and started through the non-blocking Docker
+        API client, then configured on the setup pool.
         """
         try:
             self.logger.info("{} setup is started".format(self.container.name))
             start = time.time()
 
             # get docker bridge IP as it's where weavedns runs
-            bridge_ip, dns_search = self.weave.dns_args()
+            bridge_ip, dns_search = yield self._defer_to_pool(
+                self.weave.dns_args,
+            )
 
-            cid = self.docker.setup_container(
+            cid = yield self.docker.setup_container(
                 name=self.container.name,
                 image="{}:{}".format(self.container.image.replace("gluu", ""), self.app.config["GLUU_IMAGE_TAG"]),
                 env=[
@@ -107,13 +125,14 @@ class BaseContainerHelper(object):
                 dns_search=[dns_search],
                 ulimits=self.ulimits,
                 # hostname=self.container.hostname,
+                progress=self.logger.info,
             )
 
             # container is not running
             if not cid:
                 self.logger.error("Failed to start the "
                                   "{!r} container".format(self.container.name))
-                self.on_setup_error()
+                yield self.on_setup_error()
                 return
 
             # container.cid in short format
@@ -122,74 +141,103 @@ class BaseContainerHelper(object):
                 self.container.cid, self.container.type, dns_search.rstrip("."),
             )
 
-            db.update_to_table(
-                "containers",
-                {"name": self.container.name},
-                self.container,
-            )
+            yield self._defer_to_pool(self.configure, dns_search)
 
-            # add DNS record
-            self.weave.dns_add(self.container.cid, self.container.hostname)
+            elapsed = time.time() - start
+            self.logger.info("{} setup is finished ({} seconds)".format(
+                self.container.name, elapsed
+            ))
+        except Exception:
+            self.logger.error(exc_traceback())
+            yield self.on_setup_error()
+        finally:
+            yield self._defer_to_pool(self.finish_setup)
 
-            if self.container.type in ("ldap", "oxauth", "oxtrust",):
-                # useful for failover in ox apps
-                self.weave.dns_add(
-                    self.container.cid,
-                    "{}.{}".format(self.container.type, dns_search.rstrip(".")),
-                )
+    def configure(self, dns_search):
+        """Configures the running container; blocking.
+        """
+        db.update_to_table(
+            "containers",
+            {"name": self.container.name},
+            self.container,
+        )
 
-            if self.container.type == "nginx":
-                self.weave.dns_add(self.container.cid, self.cluster.ox_cluster_hostname)
+        # add DNS record
+        self.weave.dns_add(self.container.cid, self.container.hostname)
 
-            setup_obj = self.setup_class(self.container, self.cluster,
-                                         self.app, logger=self.logger)
-            setup_obj.setup()
+        if self.container.type in ("ldap", "oxauth", "oxtrust",):
+            # useful for failover in ox apps
+            self.weave.dns_add(
+                self.container.cid,
+                "{}.{}".format(self.container.type, dns_search.rstrip(".")),
+            )
 
-            # mark container as SUCCESS
-            self.container.state = STATE_SUCCESS
+        if self.container.type == "nginx":
+            self.weave.dns_add(self.container.cid, self.cluster.ox_cluster_hostname)
 
-            db.update_to_table(
-                "containers",
-                {"name": self.container.name},
-                self.container,
-            )
+        setup_obj = self.setup_class(self.container, self.cluster,
+                                     self.app, logger=self.logger)
+        setup_obj.setup()
 
-            # after_setup must be called after container has been marked
-            # as SUCCESS
-            setup_obj.after_setup()
-            setup_obj.remove_build_dir()
+        # mark container as SUCCESS
+        self.container.state = STATE_SUCCESS
 
-            # # updating prometheus
-            # self.prometheus.update()
+        db.update_to_table(
+            "containers",
+            {"name": self.container.name},
+            self.container,
+        )
 
-            elapsed = time.time() - start
-            self.logger.info("{} setup is finished ({} seconds)".format(
-                self.container.name, elapsed
-            ))
-        except Exception:
-            self.logger.error(exc_traceback())
-            self.on_setup_error()
+        # after_setup must be called after container has been marked
+        # as SUCCESS
+        setup_obj.after_setup()
+        setup_obj.remove_build_dir()
+
+        # # updating prometheus
+        # self.prometheus.update()
+
+    def finish_setup(self):
+        """Saves the setup outcome; blocking.
+        """
+        # mark containerLog as finished
+        try:
+            container_log = db.search_from_table(
+                "container_logs",
+                {"container_name": self.container.name},
+            )[0]
+        except IndexError:
+            container_log = None
+
+        # FAILED state (if any) is saved along with containerLog
+        try:
+            with db.transaction():
+                if self.container.state == STATE_FAILED:
+                    db.update_to_table(
+                        "containers",
+                        {"name": self.container.name},
+                        self.container,
+                    )
+
+                if container_log:
+                    container_log.state = STATE_SETUP_FINISHED
+                    db.update(container_log.id, container_log,
+                              "container_logs")
         finally:
-            # mark containerLog as finished
-            try:
-                container_log = db.search_from_table(
-                    "container_logs",
-                    {"container_name": self.container.name},
-                )[0]
-            except IndexError:
-                container_log = None
-
-            if container_log:
-                container_log.state = STATE_SETUP_FINISHED
-                db.update(container_log.id, container_log, "container_logs")
-
-            # distribute recovery data
-            distribute_cluster_data(self.app, self.node)
-
-            for handler in self.logger.handlers:
-                handler.close()
-                self.logger.removeHandler(handler)
+            # let another container take the slot; released on its
+            # own as the batch above isn't atomic on MongoDB
+            if self.container.state == STATE_FAILED:
+                Placement.release(self.container)
 
+        # distribute recovery data
+        distribute_cluster_data(self.app, self.node)
+        self.close_logger()
+
+    def close_logger(self):
+        for handler in self.logger.handlers:
+            handler.close()
+            self.logger.removeHandler(handler)
+
+    @inlineCallbacks
     def on_setup_error(self):
         """Callback that supposed to be called when error occurs in setup
         process.
@@ -197,33 +245,29 @@ class BaseContainerHelper(object):
         self.logger.info("stopping container {}".format(self.container.name))
 
         try:
-            self.docker.stop_container(self.container.name)
-        except SSLError:
-            self.logger.warn("unable to connect to docker API "
-                             "due to SSL connection errors")
-        except ConnectionError:
+            yield self.docker.stop_container(self.container.name)
+        except (ConnectError, ResponseNeverReceived):
             self.logger.warn("unable to connect to docker API "
                              "due to connection errors")
-        except docker.errors.NotFound:
+        except DockerAPIError as exc:
+            if exc.status_code != 404:
+                raise
             # in case docker.stop raises 404 error code
             # when docker failed to create container
             self.logger.warn("can't find container {}; likely it's not "
                              "created yet or missing".format(self.container.name))
 
-        # mark container as FAILED
+        # mark container as FAILED; the state is saved by ``finish_setup``
         self.container.state = STATE_FAILED
 
-        db.update_to_table(
-            "containers",
-            {"name": self.container.name},
-            self.container,
-        )
-
     @run_in_reactor
     def teardown(self):
-        self.mp_teardown()
+        return self.async_teardown()
 
-    def mp_teardown(self):
+    @inlineCallbacks
+    def async_teardown(self):
+        """Runs the container teardown; must be called from reactor thread.
+        """
         self.logger.info("{} teardown is started".format(self.container.name))
         start = time.time()
 
@@ -232,22 +276,17 @@ class BaseContainerHelper(object):
         # removing LDAP replication, etc.) on non-deployed containers;
         # also, initiate the teardown only if node is exist in database
         # (node data may be deleted in other thread)
-        if (self.container.state in (STATE_SUCCESS, STATE_DISABLED,)
-                and self.node):
-            setup_obj = self.setup_class(
-                self.container, self.cluster, self.app, logger=self.logger,
-            )
-            setup_obj.teardown()
-            setup_obj.remove_build_dir()
+        if (self.container.state in (STATE_SUCCESS, STATE_DISABLED,) and
+                self.node):
+            yield self._defer_to_pool(self.unconfigure)
 
         try:
-            self.docker.remove_container(self.container.name)
-        except SSLError:  # pragma: no cover
+            yield self.docker.remove_container(self.container.name)
+        except (ConnectError, ResponseNeverReceived):  # pragma: no cover
             self.logger.warn("unable to connect to docker API "
-                             "due to SSL connection errors")
-        except docker.errors.APIError as exc:
-            err_code = exc.response.status_code
-            if err_code == 404:
+                             "due to connection errors")
+        except DockerAPIError as exc:
+            if exc.status_code == 404:
                 self.logger.warn(
                     "container {!r} does not exist".format(self.container.name)
                 )
@@ -259,7 +298,20 @@ class BaseContainerHelper(object):
         self.logger.info("{} teardown is finished ({} seconds)".format(
             self.container.name, elapsed
         ))
+        yield self._defer_to_pool(self.finish_teardown)
 
+    def unconfigure(self):
+        """Reverts the container configuration; blocking.
+        """
+        setup_obj = self.setup_class(
+            self.container, self.cluster, self.app, logger=self.logger,
+        )
+        setup_obj.teardown()
+        setup_obj.remove_build_dir()
+
+    def finish_teardown(self):
+        """Saves the teardown outcome; blocking.
+        """
         # mark containerLog as finished
         try:
             container_log = db.search_from_table(
@@ -275,10 +327,7 @@ class BaseContainerHelper(object):
 
         # distribute recovery data
         distribute_cluster_data(self.app, self.node)
-
-        for handler in self.logger.handlers:
-            handler.close()
-            self.logger.removeHandler(handler)
+        self.close_logger()
 
 
 class LdapContainerHelper(BaseContainerHelper):
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import os
+import threading
+
+from twisted.python.threadpool import ThreadPool
+
+_setup_pool = None
+_setup_pool_pid = None
+_lock = threading.Lock()
+
+
+def get_setup_pool(app):
+    """Gets a bounded thread pool for blocking steps of container setup
+    and teardown jobs.
+
+    The pool is created once per process with ``SETUP_POOL_SIZE``
+    threads and stopped when reactor shuts down. Must be called from
+    reactor thread.
+    """
+    global _setup_pool, _setup_pool_pid
+
+    with _lock:
+        if _setup_pool is None or _setup_pool_pid != os.getpid():
+            from twisted.internet import reactor
+
+            pool = ThreadPool(
+                minthreads=0,
+                maxthreads=app.config["SETUP_POOL_SIZE"],
+                name="container-setup",
+            )
+            pool.start()
+            reactor.addSystemEventTrigger("before", "shutdown", pool.stop)
+            _setup_pool = pool
+            _setup_pool_pid = os.getpid()
+    return _setup_pool
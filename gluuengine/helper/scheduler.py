@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import os
+import threading
+import time
+from collections import Counter
+from collections import deque
+from collections import namedtuple
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import maybeDeferred
+
+from ..database import db
+from ..model import STATE_FAILED
+from ..model import STATE_IN_PROGRESS
+from ..model import STATE_SUCCESS
+
+_ScaleTask = namedtuple("_ScaleTask", ["job", "index", "helper"])
+
+
+class ScaleScheduler(object):
+    """Runs container setups/teardowns of scale jobs while limiting how
+    many of them run at once in total, per node and per container type.
+
+    Tasks which can't run yet wait in a FIFO queue; a task blocked by
+    a busy node doesn't hold back tasks for other nodes. Callers
+    reserve queue room with :meth:`try_reserve` before creating
+    containers, so a worker never accepts more than ``max_queue``
+    unfinished tasks.
+
+    :meth:`submit` must be called from reactor thread.
+    """
+
+    def __init__(self, app, max_workers=10, max_per_node=3, max_per_type=10,
+                 max_queue=200):
+        self.app = app
+        self.max_workers = max_workers
+        self.max_per_node = max_per_node
+        self.max_per_type = max_per_type
+        self.max_queue = max_queue
+
+        self._pending = deque()
+        self._running = 0
+        self._running_per_node = Counter()
+        self._running_per_type = Counter()
+
+        # queue room is reserved from request threads
+        self._backlog = 0
+        self._backlog_lock = threading.Lock()
+
+    def try_reserve(self, number):
+        """Reserves queue room for ``number`` tasks.
+
+        :returns: ``False`` if the queue is full, otherwise ``True``.
+        """
+        with self._backlog_lock:
+            if self._backlog + number > self.max_queue:
+                return False
+            self._backlog += number
+            return True
+
+    def release(self, number):
+        """Gives back reserved room of tasks which won't be submitted.
+        """
+        with self._backlog_lock:
+            self._backlog = max(self._backlog - number, 0)
+
+    def stats(self):
+        return {
+            "backlog": self._backlog,
+            "pending": len(self._pending),
+            "running": self._running,
+            "running_per_node": dict(self._running_per_node),
+            "running_per_type": dict(self._running_per_type),
+        }
+
+    def submit(self, job, helpers):
+        """Queues a task for each helper of the job; ``helpers`` are
+        ordered as ``job.items``.
+        """
+        for index, helper in enumerate(helpers):
+            self._pending.append(_ScaleTask(job, index, helper))
+        self._dispatch()
+
+    def _can_run(self, task):
+        container = task.helper.container
+        return (self._running_per_node[container.node_id] < self.max_per_node and
+                self._running_per_type[container.type] < self.max_per_type)
+
+    def _dispatch(self):
+        blocked = deque()
+        while self._pending and self._running < self.max_workers:
+            task = self._pending.popleft()
+            if not self._can_run(task):
+                blocked.append(task)
+                continue
+            self._start(task)
+
+        blocked.extend(self._pending)
+        self._pending = blocked
+
+    def _start(self, task):
+        container = task.helper.container
+        self._running += 1
+        self._running_per_node[container.node_id] += 1
+        self._running_per_type[container.type] += 1
+
+        d = maybeDeferred(self._run, task)
+        d.addBoth(self._finish, task)
+
+    def _finish(self, result, task):
+        container = task.helper.container
+        self._running -= 1
+        self._running_per_node[container.node_id] -= 1
+        self._running_per_type[container.type] -= 1
+        self.release(1)
+        self._dispatch()
+
+    def _update_item(self, task, **kwargs):
+        # called from reactor thread only, hence items of a job are
+        # never updated concurrently
+        task.job.update_item(task.index, **kwargs)
+        db.update(task.job.id, task.job, "scale_jobs")
+
+    @inlineCallbacks
+    def _run(self, task):
+        self._update_item(task, state=STATE_IN_PROGRESS,
+                          started_at=time.time())
+        error = None
+
+        try:
+            if task.job.action == "teardown":
+                yield task.helper.async_teardown()
+            else:
+                yield task.helper.async_setup()
+                if task.helper.container.state != STATE_SUCCESS:
+                    error = "container setup failed"
+        except Exception as exc:
+            self.app.logger.exception(exc)
+            error = str(exc)
+
+        self._update_item(
+            task,
+            state=STATE_FAILED if error else STATE_SUCCESS,
+            error=error,
+            finished_at=time.time(),
+        )
+
+
+_scheduler = None
+_scheduler_pid = None
+_lock = threading.Lock()
+
+
+def get_scale_scheduler(app):
+    """Gets the scale scheduler of current process, configured by
+    ``SCALE_MAX_*`` settings.
+    """
+    global _scheduler, _scheduler_pid
+
+    with _lock:
+        if _scheduler is None or _scheduler_pid != os.getpid():
+            _scheduler = ScaleScheduler(
+                app,
+                max_workers=app.config["SCALE_MAX_WORKERS"],
+                max_per_node=app.config["SCALE_MAX_PER_NODE"],
+                max_per_type=app.config["SCALE_MAX_PER_TYPE"],
+                max_queue=app.config["SCALE_MAX_QUEUE"],
+            )
+            _scheduler_pid = os.getpid()
+    return _scheduler
@@ -3,4 +3,7 @@
 #
 # All rights reserved.
 
-from .machine import Machine  # noqa
\ No newline at end of file
+from .machine import Machine  # noqa
+from .store import MachineStore  # noqa
+from .status import MachineStatus  # noqa
+from .status import machine_status  # noqa
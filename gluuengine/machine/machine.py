@@ -6,30 +6,91 @@
 import json
 import re
 import os
+import threading
+import time
 
 from docker.tls import TLSConfig
 
 from ..utils import po_run
+from .store import MachineStore
 from ..registry import REGISTRY_BASE_URL
 
 LS_FIELDS = ["Name", "Active", "ActiveHost", "ActiveSwarm", "DriverName",
              "State", "URL", "Swarm", "Error", "DockerVersion", "ResponseTime"]
 GLUU_GET_DOCKER = 'https://raw.githubusercontent.com/GluuFederation/cluster-tools/master/get_docker.sh'
 
+#: Seconds to keep parsed ``docker-machine config`` output
+CONFIG_CACHE_TTL = 300
+
+
+class ConfigCache(object):
+    """Parsed ``docker-machine config`` output shared by all ``Machine``
+    instances, keyed by machine name.
+    """
+
+    def __init__(self, ttl=CONFIG_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+
+    def invalidate(self, machine_name=None):
+        with self._lock:
+            if machine_name is None:
+                self._entries.clear()
+                return
+            for key in self._entries.keys():
+                if key[1] == machine_name:
+                    del self._entries[key]
+
+
+config_cache = ConfigCache()
+
+
+def _invalidate_caches(machine_name):
+    """Drops cached config and status of a machine whose state changed.
+    """
+    # status module imports this one, hence the late import
+    from .status import machine_status
+
+    config_cache.invalidate(machine_name)
+    machine_status.invalidate(machine_name)
+
+
 class Machine(object):
     def __init__(self, path='docker-machine'):
         self.path = path
+        self.store = MachineStore()
 
     def _run(self, cmd_str, raise_error=True):
         cmd = "{} {}".format(self.path, cmd_str)
         return po_run(cmd, raise_error)
 
-    def _config(self, cmd, machine_name, docker_friendly):
+    def _parse_config(self, cmd):
         stdout, _, _ = self._run(cmd)
         config = stdout.strip()
         regexp = """(--tlsverify\n)?--tlscacert="(.+)"\n--tlscert="(.+)"\n--tlskey="(.+)"\n-H=(.+)"""
         match = re.match(regexp, config)
-        tlsverify, tlscacert, tlscert, tlskey, host = match.group(1, 2, 3, 4, 5)
+        return match.group(1, 2, 3, 4, 5)
+
+    def _config(self, cmd, machine_name, docker_friendly):
+        key = (self.path, machine_name, cmd)
+        parsed = config_cache.get(key)
+        if parsed is None:
+            parsed = self._parse_config(cmd)
+            config_cache.set(key, parsed)
+
+        tlsverify, tlscacert, tlscert, tlskey, host = parsed
         tlsverify = bool(tlsverify)
         if docker_friendly:
             params = {
@@ -136,6 +197,7 @@ class Machine(object):
 
         cmd = " ".join(cmd)
         self._run(cmd)
+        _invalidate_caches(node.name)
         return True
 
     def inspect(self, machine_name):
@@ -144,6 +206,11 @@ class Machine(object):
         return json.loads(stdout.strip())
 
     def ip(self, machine_name):
+        # the address is recorded in machine's config; no need to fork
+        ip = self.store.ip(machine_name)
+        if ip:
+            return ip
+
         cmd = 'ip {}'.format(machine_name)
         stdout, _, _ = self._run(cmd)
         return stdout.strip()
@@ -173,22 +240,26 @@ class Machine(object):
     def provision(self, machine_name):
         cmd = 'provision {}'.format(machine_name)
         self._run(cmd)
+        _invalidate_caches(machine_name)
         return True
 
     def regenerate_certs(self, machine_name):
         cmd = 'regenerate-certs -f {}'.format(machine_name)
         self._run(cmd)
+        _invalidate_caches(machine_name)
         return True
 
     def restart(self, machine_name):
         cmd = 'restart {}'.format(machine_name)
         self._run(cmd)
+        _invalidate_caches(machine_name)
         return True
 
     def rm(self, machine_name, force=False):
         f = '-f' if force else ''
         cmd = 'rm -y {} {}'.format(f, machine_name)
         self._run(cmd)
+        _invalidate_caches(machine_name)
         return True
 
     def ssh(self, machine_name, cmd=""):
@@ -224,11 +295,13 @@ class Machine(object):
     def start(self, machine_name):
         cmd = 'start {}'.format(machine_name)
         self._run(cmd)
+        _invalidate_caches(machine_name)
         return True
 
     def stop(self, machine_name):
         cmd = 'stop {}'.format(machine_name)
         self._run(cmd)
+        _invalidate_caches(machine_name)
         return True
 
     def upgrade(self, machine_name):
@@ -237,6 +310,10 @@ class Machine(object):
         return True
 
     def url(self, machine_name):
+        url = self.store.url(machine_name)
+        if url:
+            return url
+
         cmd = 'url {}'.format(machine_name)
         stdout, _, _ = self._run(cmd)
         return stdout.strip()
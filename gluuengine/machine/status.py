@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import threading
+import time
+
+import concurrent.futures
+
+from .machine import Machine
+from .store import MachineStore
+
+
+class MachineStatus(object):
+    """Cached health state of machines.
+
+    The table is refreshed in background by
+    :class:`~gluuengine.task.MachineStatusTask`, probing all machines
+    concurrently; entries older than ``max_age`` seconds (or unknown
+    machines) are probed on demand. Machines missing from the store
+    fall back to ``docker-machine status``.
+    """
+
+    def __init__(self, store=None, max_age=60, timeout=2, workers=10):
+        self.store = store or MachineStore()
+        self.max_age = max_age
+        self.timeout = timeout
+        self.workers = workers
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _check(self, machine_name):
+        start = time.time()
+        running = self.store.probe(machine_name, self.timeout)
+        if running is None:
+            try:
+                running = Machine().status(machine_name)
+            except RuntimeError:
+                running = False
+
+        checked_at = time.time()
+        state = {
+            "running": running,
+            "latency": checked_at - start,
+            "checked_at": checked_at,
+        }
+        with self._lock:
+            self._states[machine_name] = state
+        return state
+
+    def _check_many(self, names):
+        if len(names) < 2:
+            return [self._check(name) for name in names]
+
+        workers = min(len(names), self.workers)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._check, names))
+
+    def _is_stale(self, state):
+        return state is None or \
+            time.time() - state["checked_at"] > self.max_age
+
+    def refresh(self):
+        """Probes all stored machines concurrently.
+        """
+        names = self.store.names()
+        self._check_many(names)
+
+        # forget removed machines
+        with self._lock:
+            for name in self._states.keys():
+                if name not in names:
+                    del self._states[name]
+
+    def get(self, machine_name):
+        """Gets health state of a machine.
+
+        :param machine_name: Name of the machine.
+        :returns: A ``dict`` of ``running``, ``latency`` (seconds taken by
+                  the probe) and ``checked_at`` timestamp.
+        """
+        with self._lock:
+            state = self._states.get(machine_name)
+
+        if self._is_stale(state):
+            state = self._check(machine_name)
+        return dict(state)
+
+    def is_running(self, machine_name):
+        return self.get(machine_name)["running"]
+
+    def running(self):
+        """Lists names of running machines.
+        """
+        names = self.store.names()
+        with self._lock:
+            stale = [name for name in names
+                     if self._is_stale(self._states.get(name))]
+        self._check_many(stale)
+        return [name for name in names if self.is_running(name)]
+
+    def snapshot(self):
+        """Gets health state of all known machines without probing them.
+        """
+        with self._lock:
+            return {name: dict(state)
+                    for name, state in self._states.iteritems()}
+
+    def invalidate(self, machine_name=None):
+        with self._lock:
+            if machine_name is None:
+                self._states.clear()
+            else:
+                self._states.pop(machine_name, None)
+
+
+#: Status table shared by all requests in the process
+machine_status = MachineStatus()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import json
+import os
+import socket
+
+#: Default port of docker engine provisioned by docker-machine
+DEFAULT_ENGINE_PORT = 2376
+
+
+class MachineStore(object):
+    """Reads machines from docker-machine storage directory
+    (``$MACHINE_STORAGE_PATH`` or ``~/.docker/machine``) without
+    spawning ``docker-machine`` process.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get(
+            "MACHINE_STORAGE_PATH",
+            os.path.expanduser("~/.docker/machine"),
+        )
+
+    def _get_config_path(self, machine_name):
+        return os.path.join(self.path, "machines", machine_name,
+                            "config.json")
+
+    def names(self):
+        """Lists names of stored machines.
+        """
+        try:
+            names = os.listdir(os.path.join(self.path, "machines"))
+        except OSError:
+            return []
+        return sorted(name for name in names
+                      if os.path.isfile(self._get_config_path(name)))
+
+    def load(self, machine_name):
+        """Loads machine's ``config.json``.
+
+        :param machine_name: Name of the machine.
+        :returns: A ``dict`` of machine config or ``None`` if machine
+                  is not stored (or its config is unreadable).
+        """
+        try:
+            with open(self._get_config_path(machine_name)) as fd:
+                return json.load(fd)
+        except (IOError, ValueError):
+            return None
+
+    def ip(self, machine_name):
+        data = self.load(machine_name) or {}
+        return data.get("Driver", {}).get("IPAddress") or ""
+
+    def url(self, machine_name):
+        data = self.load(machine_name) or {}
+        driver = data.get("Driver", {})
+        if not driver.get("IPAddress"):
+            return ""
+        return "tcp://{}:{}".format(
+            driver["IPAddress"],
+            driver.get("EnginePort") or DEFAULT_ENGINE_PORT,
+        )
+
+    def probe(self, machine_name, timeout=2):
+        """Checks whether docker engine of the machine accepts
+        connections.
+
+        :param machine_name: Name of the machine.
+        :param timeout: Connect timeout in seconds.
+        :returns: ``True`` if engine port is reachable, ``False`` if not,
+                  or ``None`` if machine is not stored.
+        """
+        url = self.url(machine_name)
+        if not url:
+            return None
+
+        host, port = url.replace("tcp://", "").rsplit(":", 1)
+        try:
+            sock = socket.create_connection((host, int(port)), timeout)
+        except (socket.error, socket.timeout):
+            return False
+        sock.close()
+        return True
@@ -25,8 +25,11 @@ from .base import STATE_IN_PROGRESS  # noqa
 from .base import STATE_FAILED  # noqa
 from .base import STATE_SUCCESS  # noqa
 from .base import STATE_DISABLED  # noqa
+from .base import STATE_QUEUED  # noqa
 
 from .log import ContainerLog  # noqa
+from .placement import Placement  # noqa
+from .scale_job import ScaleJob  # noqa
 
 from .base import STATE_SETUP_IN_PROGRESS  # noqa
 from .base import STATE_SETUP_FINISHED  # noqa
@@ -39,3 +42,6 @@ from ._schema import CONTAINER_LOG_SCHEMA  # noqa
 from ._schema import NODE_SCHEMA  # noqa
 from ._schema import PROVIDER_SCHEMA  # noqa
 from ._schema import LICENSE_KEY_SCHEMA  # noqa
+from ._schema import PLACEMENT_SCHEMA  # noqa
+from ._schema import SCALE_JOB_SCHEMA  # noqa
+from ._schema import SCHEMAS  # noqa
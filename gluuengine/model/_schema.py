@@ -5,6 +5,7 @@
 
 from sqlalchemy import BigInteger
 from sqlalchemy import Boolean
+from sqlalchemy import Float
 from sqlalchemy import Integer
 from sqlalchemy import JSON
 from sqlalchemy import Unicode
@@ -58,7 +59,8 @@ CLUSTER_SCHEMA = {
         "external_ldap_encoded_password": Unicode(255),
         "external_ldap_inum_appliance": Unicode(255),
         "external_encoded_salt": Unicode(255),
-    }
+    },
+    "indexes": [],
 }
 
 
@@ -75,7 +77,13 @@ CONTAINER_SCHEMA = {
         "type": Unicode(32),
         "hostname": Unicode(255),
         "cid": Unicode(128),
-    }
+    },
+    "indexes": [
+        ("node_id", "type", "state"),
+        ("cluster_id", "type", "state"),
+        ("type", "state"),
+        ("name",),
+    ],
 }
 
 
@@ -94,7 +102,8 @@ LICENSE_KEY_SCHEMA = {
         "valid": Boolean,
         "updated_at": BigInteger,
         "passkey": Unicode(255),
-    }
+    },
+    "indexes": [],
 }
 
 
@@ -107,7 +116,10 @@ CONTAINER_LOG_SCHEMA = {
         "state": Unicode(32),
         "setup_log": Unicode(255),
         "teardown_log": Unicode(255),
-    }
+    },
+    "indexes": [
+        ("container_name",),
+    ],
 }
 
 
@@ -120,7 +132,11 @@ NODE_SCHEMA = {
         "name": Unicode(255),
         "provider_id": Unicode(36),
         "type": Unicode(32),
-    }
+    },
+    "indexes": [
+        ("type",),
+        ("name",),
+    ],
 }
 
 
@@ -132,5 +148,52 @@ PROVIDER_SCHEMA = {
         "driver_attrs": JSON,
         "name": Unicode(255),
         "driver": Unicode(128),
-    }
+    },
+    "indexes": [
+        ("driver",),
+    ],
 }
+
+
+PLACEMENT_SCHEMA = {
+    "name": "placements",
+    "columns": {
+        "id": Unicode(36),
+        "_pyobject": Unicode(255),
+        "key": Unicode(255),
+        "container_id": Unicode(36),
+    },
+    "indexes": [
+        ("container_id",),
+    ],
+}
+
+
+SCALE_JOB_SCHEMA = {
+    "name": "scale_jobs",
+    "columns": {
+        "id": Unicode(36),
+        "_pyobject": Unicode(255),
+        "action": Unicode(32),
+        "container_type": Unicode(32),
+        "state": Unicode(32),
+        "created_at": Float,
+        "finished_at": Float,
+        "items": JSON,
+    },
+    "indexes": [],
+}
+
+
+#: All table schemas. Each ``indexes`` entry is a tuple of columns
+#: for a (non-unique) index, ordered to match common query conditions.
+SCHEMAS = (
+    CLUSTER_SCHEMA,
+    CONTAINER_SCHEMA,
+    CONTAINER_LOG_SCHEMA,
+    LICENSE_KEY_SCHEMA,
+    NODE_SCHEMA,
+    PLACEMENT_SCHEMA,
+    PROVIDER_SCHEMA,
+    SCALE_JOB_SCHEMA,
+)
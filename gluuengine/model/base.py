@@ -4,6 +4,42 @@
 # All rights reserved.
 
 from schematics.models import Model
+from schematics.types import BooleanType
+from schematics.types import FloatType
+from schematics.types import IntType
+from schematics.types import LongType
+from schematics.types import StringType
+
+# Python types which need no conversion for given field type
+_NATIVE_TYPES = (
+    (BooleanType, (bool,)),
+    (StringType, (unicode,)),
+    (IntType, (int, long,)),
+    (LongType, (int, long,)),
+    (FloatType, (float,)),
+)
+
+# fields plan of each model class, see ``BaseModel.from_trusted``
+_trusted_plans = {}
+
+
+def _get_trusted_plan(cls):
+    plan = _trusted_plans.get(cls)
+    if plan is not None:
+        return plan
+
+    plan = []
+    for name, field in cls._fields.iteritems():
+        keys = [key for key in (field.serialized_name, name) if key]
+        native_types = ()
+        for field_type, types in _NATIVE_TYPES:
+            if type(field) is field_type:
+                native_types = types
+                break
+        plan.append((name, keys, field, native_types))
+
+    _trusted_plans[cls] = plan
+    return plan
 
 
 class BaseModel(Model):
@@ -16,6 +52,35 @@ class BaseModel(Model):
             strict=False,
         )
 
+    @classmethod
+    def from_trusted(cls, raw_data):
+        """Creates model instance from data saved by the app itself,
+        e.g. a database row.
+
+        Unlike the constructor, it skips the generic import loop
+        (rogue fields check, mapping lookups, etc.) and only converts
+        values that aren't already native for their field type.
+        """
+        obj = cls.__new__(cls)
+        data = {}
+
+        for name, keys, field, native_types in _get_trusted_plan(cls):
+            value = None
+            for key in keys:
+                if key in raw_data:
+                    value = raw_data[key]
+            if value is None:
+                value = field.default
+
+            if value is None or type(value) in native_types:
+                data[name] = value
+            else:
+                data[name] = field.to_native(value)
+
+        obj._initial = raw_data
+        obj._data = data
+        return obj
+
     def as_dict(self):
         return self.resource_fields
 
@@ -39,6 +104,9 @@ STATE_FAILED = "FAILED"
 #: A flag to mark state as ``DISABLED``
 STATE_DISABLED = "DISABLED"
 
+#: A flag to mark state as ``QUEUED``
+STATE_QUEUED = "QUEUED"
+
 STATE_SETUP_IN_PROGRESS = "SETUP_IN_PROGRESS"
 STATE_SETUP_FINISHED = "SETUP_FINISHED"
 STATE_TEARDOWN_IN_PROGRESS = "TEARDOWN_IN_PROGRESS"
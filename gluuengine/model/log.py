@@ -32,6 +32,16 @@ class ContainerLog(BaseModel):
             "state": self.state,
         }
 
+    @staticmethod
+    def from_container(container):
+        """Creates (unsaved) container log for given container.
+        """
+        container_log = ContainerLog()
+        container_log.container_name = container.name
+        container_log.setup_log = "{}-setup.log".format(container_log.container_name)  # noqa
+        container_log.teardown_log = "{}-teardown.log".format(container_log.container_name)  # noqa
+        return container_log
+
     @staticmethod
     def create_or_get(container):
         try:
@@ -42,9 +52,6 @@ class ContainerLog(BaseModel):
         except IndexError:
             pass
 
-        container_log = ContainerLog()
-        container_log.container_name = container.name
-        container_log.setup_log = "{}-setup.log".format(container_log.container_name)  # noqa
-        container_log.teardown_log = "{}-teardown.log".format(container_log.container_name)  # noqa
+        container_log = ContainerLog.from_container(container)
         db.persist(container_log, "container_logs")
         return container_log
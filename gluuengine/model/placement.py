@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import uuid
+
+from schematics.types import StringType
+
+from ._schema import PLACEMENT_SCHEMA
+from .base import BaseModel
+from ..database import db
+
+#: Container types allowed to run only once per cluster or node
+PLACEMENT_RULES = {
+    "oxtrust": "cluster",
+    "nginx": "node",
+    "ldap": "node",
+}
+
+
+class Placement(BaseModel):
+    """A slot taken by container whose type is limited by
+    ``PLACEMENT_RULES``.
+
+    The ID is derived from the slot key, so two containers competing
+    for the same slot end up with the same primary key and only one
+    of them can be saved.
+    """
+
+    @property
+    def _schema(self):
+        return PLACEMENT_SCHEMA
+
+    id = StringType()
+    key = StringType()
+    container_id = StringType()
+    _pyobject = StringType()
+
+    @property
+    def resource_fields(self):
+        return {
+            "id": self.id,
+            "key": self.key,
+            "container_id": self.container_id,
+        }
+
+    @staticmethod
+    def get_key(container):
+        """Gets slot key of the container, e.g. ``node:<node_id>:ldap``,
+        or an empty string if its type isn't limited.
+        """
+        scope = PLACEMENT_RULES.get(container.type)
+        if scope == "cluster":
+            return "cluster:{}:{}".format(container.cluster_id, container.type)
+        if scope == "node":
+            return "node:{}:{}".format(container.node_id, container.type)
+        return ""
+
+    @staticmethod
+    def from_container(container):
+        """Creates (unsaved) placement for given container.
+        """
+        key = Placement.get_key(container)
+        if not key:
+            return
+        return Placement({
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, key)),
+            "key": key,
+            "container_id": container.id,
+        })
+
+    @staticmethod
+    def reserve(container):
+        """Atomically takes the slot for given container.
+
+        :returns: ``False`` if the slot is taken by another container,
+                  otherwise ``True``.
+        """
+        placement = Placement.from_container(container)
+        if not placement:
+            return True
+        return db.persist_unique(placement, "placements")
+
+    @staticmethod
+    def release(container):
+        """Frees the slot taken by given container (if any).
+        """
+        if Placement.get_key(container):
+            db.delete_from_table("placements",
+                                 {"container_id": container.id})
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import time
+import uuid
+
+from schematics.types import FloatType
+from schematics.types import StringType
+from schematics.types.compound import ListType
+from schematics.types.compound import PolyModelType
+
+from ._schema import SCALE_JOB_SCHEMA
+from .base import BaseModel
+from .base import STATE_FAILED
+from .base import STATE_IN_PROGRESS
+from .base import STATE_QUEUED
+from .base import STATE_SUCCESS
+
+
+class ScaleJob(BaseModel):
+    """A batch of container setups (or teardowns) submitted by
+    ``ScaleContainerResource``, with result and timings of each
+    container.
+    """
+    class Item(BaseModel):
+        container_id = StringType()
+        container_name = StringType()
+        node_id = StringType()
+        state = StringType(default=STATE_QUEUED)
+        error = StringType()
+        queued_at = FloatType()
+        started_at = FloatType()
+        finished_at = FloatType()
+
+        @property
+        def resource_fields(self):
+            elapsed = None
+            if self.started_at and self.finished_at:
+                elapsed = round(self.finished_at - self.started_at, 3)
+            return {
+                "container_id": self.container_id,
+                "container_name": self.container_name,
+                "node_id": self.node_id,
+                "state": self.state,
+                "error": self.error,
+                "queued_at": self.queued_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed": elapsed,
+            }
+
+    id = StringType(default=lambda: str(uuid.uuid4()))
+    action = StringType()
+    container_type = StringType()
+    state = StringType(default=STATE_QUEUED)
+    created_at = FloatType()
+    finished_at = FloatType()
+    items = ListType(PolyModelType(Item, strict=False), default=[])
+    _pyobject = StringType()
+
+    @property
+    def _schema(self):
+        return SCALE_JOB_SCHEMA
+
+    @property
+    def resource_fields(self):
+        counts = dict.fromkeys(
+            [STATE_QUEUED, STATE_IN_PROGRESS, STATE_SUCCESS, STATE_FAILED], 0,
+        )
+        for item in self.items:
+            counts[item.state] += 1
+
+        return {
+            "id": self.id,
+            "action": self.action,
+            "container_type": self.container_type,
+            "state": self.state,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "counts": counts,
+            "items": [item.as_dict() for item in self.items],
+        }
+
+    @staticmethod
+    def from_containers(action, container_type, containers):
+        """Creates (unsaved) job having a queued item for each container.
+        """
+        now = time.time()
+        return ScaleJob({
+            "action": action,
+            "container_type": container_type,
+            "created_at": now,
+            "items": [{
+                "container_id": container.id,
+                "container_name": container.name,
+                "node_id": container.node_id,
+                "queued_at": now,
+            } for container in containers],
+        })
+
+    def update_item(self, index, **kwargs):
+        """Updates an item and the job state derived from all items.
+        """
+        item = self.items[index]
+        for key, value in kwargs.iteritems():
+            setattr(item, key, value)
+
+        states = set(item.state for item in self.items)
+        if states & {STATE_QUEUED, STATE_IN_PROGRESS}:
+            if states != {STATE_QUEUED}:
+                self.state = STATE_IN_PROGRESS
+        else:
+            self.state = STATE_FAILED if STATE_FAILED in states else STATE_SUCCESS
+            self.finished_at = time.time()
@@ -5,9 +5,14 @@
 
 import os
 import time
+
+import concurrent.futures
 from crochet import run_in_reactor
+from docker.errors import DockerException
+from requests.exceptions import RequestException
 
 from ..database import db
+from ..dockerclient import Docker
 from ..machine import Machine
 from ..log import create_file_logger
 
@@ -20,6 +25,42 @@ RECOVERY_SCRIPT = "https://github.com/GluuFederation/cluster-tools/raw/master/re
 RECOVERY_CONF = "https://github.com/GluuFederation/cluster-tools/raw/master/recovery/recovery.conf"
 RNG_TOOLS_CONF = "https://raw.githubusercontent.com/GluuFederation/cluster-tools/master/rng_tools"
 
+# images pre-pulled into each node, so deploying containers skips the pull
+GLUU_IMAGES = ["opendj", "oxauth", "oxtrust", "oxidp", "nginx", "oxasimba"]
+
+
+def prepull_images(app, node, progress=None):
+    """Pulls all gluu images concurrently into the node.
+
+    :param app: Flask app.
+    :param node: Node object.
+    :param progress: A callback receiving pull progress messages.
+    :raises: ``RuntimeError`` if any image can't be pulled.
+    """
+    docker = Docker(Machine().config(node.name), {})
+    images = [
+        "{}/{}:{}".format(docker.registry_base_url, name,
+                          app.config["GLUU_IMAGE_TAG"])
+        for name in GLUU_IMAGES
+    ]
+
+    def pull(image):
+        try:
+            if docker.image_exists(image):
+                return True
+            return docker.pull_image(image, progress=progress)
+        except (DockerException, RequestException) as exc:
+            if progress:
+                progress("unable to pull {}: {}".format(image, exc))
+            return False
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(images)) as executor:
+        pulled = list(executor.map(pull, images))
+
+    failed = [image for image, ok in zip(images, pulled) if not ok]
+    if failed:
+        raise RuntimeError("unable to pull {}".format(", ".join(failed)))
+
 
 class DeployNode(object):
     def __init__(self, node_model_obj, app):
@@ -46,11 +87,7 @@ class DeployNode(object):
     def _pull_images(self):
         try:
             self.logger.info("pulling gluu images in {} node".format(self.node.name))
-            cmd_list = [
-                'sudo docker pull gluufederation/oxauth:{}'.format(self.app.config["GLUU_IMAGE_TAG"]),
-                'sudo docker pull gluufederation/nginx:{}'.format(self.app.config["GLUU_IMAGE_TAG"]),
-            ]
-            self.machine.ssh(self.node.name, ' && '.join(cmd_list))
+            prepull_images(self.app, self.node, self.logger.info)
             self.node.state_attrs["state_pull_images"] = True
             db.update(self.node.id, self.node, 'nodes')
         except RuntimeError as e:
@@ -26,3 +26,7 @@ from .container import ContainerListResource  # noqa
 from .container import ContainerResource  # noqa
 from .container import NewContainerResource  # noqa
 from .container import ScaleContainerResource # noqa
+from .container import ScaleJobResource  # noqa
+
+from .stats import StatsResource  # noqa
+from .event import EventResource  # noqa
@@ -68,7 +68,7 @@ class ClusterListResource(Resource):
 
     def post(self):
         # limit to 1 cluster for now
-        if len(db.all("clusters")) >= 1:
+        if db.count_from_table("clusters", {}) >= 1:
             return {"status": 403, "message": "cannot add more cluster"}, 403
 
         truthy = set(('t', 'T', 'true', 'True', 'TRUE', '1', 1, True))
@@ -6,7 +6,6 @@
 import os
 from itertools import cycle
 
-import concurrent.futures
 from flask import abort
 from flask import current_app
 from flask import request
@@ -26,6 +25,7 @@ from ..helper import OxtrustContainerHelper
 # from ..helper import OxidpContainerHelper
 from ..helper import NginxContainerHelper
 from ..helper import OxasimbaContainerHelper
+from ..helper import get_scale_scheduler
 from ..model import LdapContainer
 from ..model import OxauthContainer
 from ..model import OxtrustContainer
@@ -33,8 +33,11 @@ from ..model import OxtrustContainer
 from ..model import NginxContainer
 from ..model import OxasimbaContainer
 from ..model import ContainerLog
-from ..machine import Machine
+from ..model import Placement
+from ..model import ScaleJob
+from ..machine import machine_status
 from ..utils import as_boolean
+from .pagination import list_response
 
 
 #: List of supported container
@@ -61,7 +64,7 @@ def get_container(db, container_id):
 
 
 def target_node_reachable(node_name):
-    return Machine().status(node_name)
+    return machine_status.is_running(node_name)
 
 
 def master_node_reachable():
@@ -72,7 +75,7 @@ def master_node_reachable():
     except IndexError:
         return False
     else:
-        return Machine().status(node.name)
+        return machine_status.is_running(node.name)
 
 
 def discovery_node_reachable():
@@ -83,7 +86,7 @@ def discovery_node_reachable():
     except IndexError:
         return False
     else:
-        return Machine().status(node.name)
+        return machine_status.is_running(node.name)
 
 
 def get_containerlog(db, containerlog_name):
@@ -157,7 +160,9 @@ class ContainerResource(Resource):
 
         # remove container (``container.id`` may empty, hence we're using
         # unique ``container.name`` instead)
-        db.delete_from_table("containers", {"name": container.name})
+        with db.transaction():
+            db.delete_from_table("containers", {"name": container.name})
+            Placement.release(container)
 
         container_log = ContainerLog.create_or_get(container)
         container_log.state = STATE_TEARDOWN_IN_PROGRESS
@@ -180,19 +185,28 @@ class ContainerResource(Resource):
         return {}, 204, headers
 
 
-class ContainerListResource(Resource):
-    def get(self, container_type=""):
-        if not container_type:
-            containers = db.all("containers")
-            return [container.as_dict() for container in containers]
+#: Error messages of rejected placements (see ``model.Placement``)
+PLACEMENT_ERRORS = {
+    "oxtrust": "cannot deploy additional oxtrust container to cluster",
+    "nginx": "cannot deploy additional nginx container to specified node",
+    "ldap": "cannot deploy additional ldap container to specified node",
+}
 
-        if container_type not in CONTAINER_CHOICES:
-            abort(404)
 
-        containers = db.search_from_table(
-            "containers", {"type": container_type},
+class ContainerListResource(Resource):
+    filters = {"state": "state", "node_id": "node_id", "type": "type"}
+
+    def get(self, container_type=""):
+        condition = {}
+        if container_type:
+            if container_type not in CONTAINER_CHOICES:
+                abort(404)
+            condition["type"] = container_type
+
+        return list_response(
+            "containers", lambda container: container.as_dict(),
+            filters=self.filters, condition=condition,
         )
-        return [container.as_dict() for container in containers]
 
 
 class NewContainerResource(Resource):
@@ -263,14 +277,6 @@ class NewContainerResource(Resource):
                 "message": "access denied due to discovery node being unreachable",
             }, 403
 
-        # only allow 1 oxtrust per cluster
-        if container_type == "oxtrust" and cluster.count_containers(type_="oxtrust"):
-            return {
-                "status": 403,
-                "message": "cannot deploy additional oxtrust container "
-                           "to cluster",
-            }, 403
-
         # only allow oxtrust in master node
         if container_type == "oxtrust" and node.type != "master":
             return {
@@ -279,22 +285,6 @@ class NewContainerResource(Resource):
                            "to non-master node",
             }, 403
 
-        # only allow 1 nginx per node
-        if container_type == "nginx" and node.count_containers(type_="nginx"):
-            return {
-                "status": 403,
-                "message": "cannot deploy additional nginx container "
-                           "to specified node",
-            }, 403
-
-        # only allow 1 ldap per node
-        if container_type == "ldap" and node.count_containers(type_="ldap"):
-            return {
-                "status": 403,
-                "message": "cannot deploy additional ldap container "
-                           "to specified node",
-            }, 403
-
         # pre-populate the container object
         container_class = self.container_classes[container_type]
         container = container_class({
@@ -304,12 +294,30 @@ class NewContainerResource(Resource):
             "container_attrs": data["container_attrs"],
         })
         container.name = "{}_{}".format(container.image, container.id)
-        db.persist(container, "containers")
+
+        # only allow 1 oxtrust per cluster and 1 nginx/ldap per node;
+        # the slot is taken atomically, so concurrent requests can't
+        # both pass the check
+        if not Placement.reserve(container):
+            return {
+                "status": 403,
+                "message": PLACEMENT_ERRORS[container_type],
+            }, 403
 
         # log related setup
-        container_log = ContainerLog.create_or_get(container)
+        container_log = ContainerLog.from_container(container)
         container_log.state = STATE_SETUP_IN_PROGRESS
-        db.update(container_log.id, container_log, "container_logs")
+
+        try:
+            with db.transaction():
+                db.persist(container, "containers")
+                db.persist(container_log, "container_logs")
+        except Exception:
+            # MongoDB may have saved the container without its log
+            db.delete(container.id, "containers")
+            db.delete(container_log.id, "container_logs")
+            Placement.release(container)
+            raise
         logpath = os.path.join(app.config["CONTAINER_LOG_DIR"],
                                container_log.setup_log)
 
@@ -332,15 +340,16 @@ class NewContainerResource(Resource):
 def format_container_log_response(container_log):
     app = current_app._get_current_object()
 
-    setup_log = os.path.join(app.config["CONTAINER_LOG_DIR"],
-                             container_log.setup_log)
-    teardown_log = os.path.join(app.config["CONTAINER_LOG_DIR"],
-                                container_log.teardown_log)
+    def log_exists(log_name):
+        # logs saved without file name have nothing to serve
+        return bool(log_name) and os.path.exists(
+            os.path.join(app.config["CONTAINER_LOG_DIR"], log_name)
+        )
 
     resp = container_log.as_dict()
 
     resp["setup_log_url"] = ""
-    if os.path.exists(setup_log):
+    if log_exists(container_log.setup_log):
         resp["setup_log_url"] = url_for(
             "containerlog_setup",
             container_name=container_log.container_name,
@@ -348,7 +357,7 @@ def format_container_log_response(container_log):
         )
 
     resp["teardown_log_url"] = ""
-    if os.path.exists(teardown_log):
+    if log_exists(container_log.teardown_log):
         resp["teardown_log_url"] = url_for(
             "containerlog_teardown",
             container_name=container_log.container_name,
@@ -432,11 +441,11 @@ class ContainerLogTeardownResource(Resource):
 
 class ContainerLogListResource(Resource):
     def get(self):
-        container_logs = db.all("container_logs")
-        return [
-            format_container_log_response(container_log)
-            for container_log in container_logs
-        ]
+        # log URLs depend on log files, which don't change table version
+        return list_response(
+            "container_logs", format_container_log_response,
+            filters={"state": "state"}, conditional=False,
+        )
 
 
 class ScaleContainerResource(Resource):
@@ -456,25 +465,34 @@ class ScaleContainerResource(Resource):
     }
 
     def get_running_nodes(self):
-        m = Machine()
-        running_nodes = m.list('running')
+        running_nodes = machine_status.running()
 
         try:
-            dcv_node = db.search_from_table("nodes", {"type": "discovery"})[0]
-            running_nodes.remove(dcv_node.name)
-        except IndexError:
+            dcv_name, = db.search_from_table(
+                "nodes", {"type": "discovery"}, fields=["name"],
+            )[0]
+            running_nodes.remove(dcv_name)
+        except (IndexError, ValueError):
             pass
         return running_nodes
 
     def make_node_id_pool(self, nodes):
+        """Makes a circular pool of running node IDs.
+
+        :param nodes: A list of ``(id, name)`` tuples of nodes.
+        """
         running_nodes = self.get_running_nodes()
-        running_nodes_ids = [node.id for node in nodes if node.name in running_nodes]
+        running_nodes_ids = [node_id for node_id, node_name in nodes
+                             if node_name in running_nodes]
         #make a circular id list of running nodes
         return cycle(running_nodes_ids)
 
     def setup_obj_generator(self, app, container_type, number, cluster_id, node_id_pool):
+        container_class = self.container_classes[container_type]
+        containers = []
+        container_logs = []
+
         for i in xrange(number):
-            container_class = self.container_classes[container_type]
             container = container_class({
                 "cluster_id": cluster_id,
                 "node_id": node_id_pool.next(),
@@ -482,25 +500,45 @@ class ScaleContainerResource(Resource):
                 "container_attrs": {},
             })
             container.name = "{}_{}".format(container.image, container.id)
-            db.persist(container, "containers")
+            containers.append(container)
 
-            # log related setup
-            container_log = ContainerLog.create_or_get(container)
+            # log related setup; containers are brand new, hence
+            # there's no existing log to look up
+            container_log = ContainerLog.from_container(container)
             container_log.state = STATE_SETUP_IN_PROGRESS
-            db.update(container_log.id, container_log, "container_logs")
+            container_logs.append(container_log)
+
+        db.persist_many(containers, "containers")
+        db.persist_many(container_logs, "container_logs")
+
+        helper_class = self.helper_classes[container_type]
+        for container, container_log in zip(containers, container_logs):
             logpath = os.path.join(app.config["CONTAINER_LOG_DIR"],
                                    container_log.setup_log)
 
             # make the setup obj
-            helper_class = self.helper_classes[container_type]
             helper = helper_class(container, app, logpath)
             yield helper
 
     @run_in_reactor
-    def scaleosorus(self, setup_obj_generator):
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-            for setup_obj in setup_obj_generator:
-                executor.submit(setup_obj.mp_setup)
+    def scaleosorus(self, app, job, helpers):
+        get_scale_scheduler(app).submit(job, helpers)
+
+    def submit_job(self, app, action, container_type, helpers):
+        """Saves a scale job for given helpers and queues it.
+        """
+        job = ScaleJob.from_containers(
+            action, container_type, [helper.container for helper in helpers],
+        )
+        db.persist(job, "scale_jobs")
+
+        if action == "teardown":
+            self.delscaleosorus(app, job, helpers)
+        else:
+            self.scaleosorus(app, job, helpers)
+
+        headers = {"Location": url_for("scale_job", job_id=job.id)}
+        return job, headers
 
     def post(self, container_type, number):
         app = current_app._get_current_object()
@@ -523,8 +561,10 @@ class ScaleContainerResource(Resource):
             }, 403
 
         # get id list of running nodes
-        mnodes = db.search_from_table('nodes', {"type": "master"})
-        wnodes = db.search_from_table('nodes', {"type": "worker"})
+        mnodes = db.search_from_table('nodes', {"type": "master"},
+                                      fields=["id", "name"])
+        wnodes = db.search_from_table('nodes', {"type": "worker"},
+                                      fields=["id", "name"])
         nodes = mnodes + wnodes
 
         if not nodes:
@@ -533,30 +573,68 @@ class ScaleContainerResource(Resource):
                 "message": "container deployment requires nodes",
             }, 403
 
+        scheduler = get_scale_scheduler(app)
+        if not scheduler.try_reserve(number):
+            return {
+                "status": 429,
+                "message": "too many pending container jobs; "
+                           "try again later",
+            }, 429
+
         node_id_pool = self.make_node_id_pool(nodes)
 
         #make a list of container setup object
-        sg = self.setup_obj_generator(app, container_type, number, cluster.id, node_id_pool)
-
-        self.scaleosorus(sg)
+        helpers = list(self.setup_obj_generator(
+            app, container_type, number, cluster.id, node_id_pool,
+        ))
+        if not helpers:
+            scheduler.release(number)
+            return {
+                "status": 403,
+                "message": "container deployment requires running nodes",
+            }, 403
 
+        job, headers = self.submit_job(app, "setup", container_type, helpers)
         return {
             "status": 202,
             "message": 'deploying {} {}'.format(number, container_type),
-        }, 202
+            "job_id": job.id,
+        }, 202, headers
 
     @run_in_reactor
-    def delscaleosorus(self, delete_obj_generator):
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-            for delete_obj in delete_obj_generator:
-                executor.submit(delete_obj.mp_teardown)
+    def delscaleosorus(self, app, job, helpers):
+        get_scale_scheduler(app).submit(job, helpers)
 
     def delete_obj_generator(self, app, containers):
+        db.delete_many([container.id for container in containers],
+                       "containers")
+
+        container_logs = {
+            container_log.container_name: container_log
+            for container_log in db.get_many(
+                [container.name for container in containers],
+                "container_logs",
+                field="container_name",
+            )
+        }
+        new_logs = []
+        existing_logs = []
+
         for container in containers:
-            db.delete_from_table("containers", {"name": container.name})
-            container_log = ContainerLog.create_or_get(container)
+            container_log = container_logs.get(container.name)
+            if container_log:
+                existing_logs.append(container_log)
+            else:
+                container_log = ContainerLog.from_container(container)
+                container_logs[container.name] = container_log
+                new_logs.append(container_log)
             container_log.state = STATE_TEARDOWN_IN_PROGRESS
-            db.update(container_log.id, container_log, "container_logs")
+
+        db.persist_many(new_logs, "container_logs")
+        db.update_many(existing_logs, "container_logs")
+
+        for container in containers:
+            container_log = container_logs[container.name]
             logpath = os.path.join(app.config["CONTAINER_LOG_DIR"],
                                    container_log.teardown_log)
             helper_class = self.helper_classes[container.type]
@@ -589,8 +667,10 @@ class ScaleContainerResource(Resource):
         containers = db.search_from_table('containers', {'type': container_type, 'state': STATE_SUCCESS})
 
         # select and arrange containers
-        mnodes = db.search_from_table('nodes', {"type": "master"})
-        wnodes = db.search_from_table('nodes', {"type": "worker"})
+        mnodes = db.search_from_table('nodes', {"type": "master"},
+                                      fields=["id", "name"])
+        wnodes = db.search_from_table('nodes', {"type": "worker"},
+                                      fields=["id", "name"])
         nodes = mnodes + wnodes
         node_id_pool = self.make_node_id_pool(nodes)
 
@@ -604,12 +684,28 @@ class ScaleContainerResource(Resource):
             if len(containers_reorder) == number:
                 break
 
-        # get a genatator of delete_object
-        dg = self.delete_obj_generator(app, containers_reorder)
-        # start backgroung delete operation
-        self.delscaleosorus(dg)
-
+        scheduler = get_scale_scheduler(app)
+        if not scheduler.try_reserve(number):
+            return {
+                "status": 429,
+                "message": "too many pending container jobs; "
+                           "try again later",
+            }, 429
+
+        # start background delete operation
+        helpers = list(self.delete_obj_generator(app, containers_reorder))
+        job, headers = self.submit_job(app, "teardown", container_type,
+                                       helpers)
         return {
             "status": 202,
             "message": 'deleting {} {}'.format(number, container_type),
-        }, 202
+            "job_id": job.id,
+        }, 202, headers
+
+
+class ScaleJobResource(Resource):
+    def get(self, job_id):
+        job = db.get(job_id, "scale_jobs")
+        if not job:
+            return {"status": 404, "message": "Scale job not found"}, 404
+        return job.as_dict()
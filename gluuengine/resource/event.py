@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import json
+import time
+
+from flask import Response
+from flask import current_app
+from flask import request
+from flask import stream_with_context
+from flask_restful import Resource
+
+from ..database import db
+
+#: Fields sent in change events of each watchable table
+WATCHED_FIELDS = {
+    "containers": ("name", "type", "state", "node_id", "cluster_id",),
+    "nodes": ("name", "type", "provider_id",),
+}
+
+
+def iter_sse(changes, heartbeat):
+    """Formats changes as Server-Sent Events; a comment is sent after
+    ``heartbeat`` seconds without changes to keep connection alive.
+    """
+    last_sent = time.time()
+    yield "retry: 3000\n\n"
+
+    for change in changes:
+        if change is not None:
+            last_sent = time.time()
+            yield "event: change\ndata: {}\n\n".format(json.dumps(change))
+        elif time.time() - last_sent >= heartbeat:
+            last_sent = time.time()
+            yield ": keepalive\n\n"
+
+
+class EventResource(Resource):
+    def get(self):
+        app = current_app._get_current_object()
+
+        tables = [table for table in
+                  request.args.get("tables", "containers,nodes").split(",")
+                  if table]
+        unknown = set(tables) - set(WATCHED_FIELDS)
+        if not tables or unknown:
+            return {
+                "status": 400,
+                "message": "Invalid params",
+                "params": {
+                    "tables": "must be comma-separated list of {}".format(
+                        ", ".join(sorted(WATCHED_FIELDS)),
+                    ),
+                },
+            }, 400
+
+        # the stream is closed after a while (clients reconnect
+        # automatically), so it doesn't hold a worker thread forever
+        changes = db.watch(
+            {table: WATCHED_FIELDS[table] for table in tables},
+            interval=app.config["EVENTS_POLL_INTERVAL"],
+            timeout=app.config["EVENTS_STREAM_TIMEOUT"],
+        )
+        return Response(
+            stream_with_context(
+                iter_sse(changes, app.config["EVENTS_HEARTBEAT"]),
+            ),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache",
+                     "X-Accel-Buffering": "no"},
+        )
@@ -16,8 +16,10 @@ from ..node import DeployDiscoveryNode
 from ..node import DeployMasterNode
 from ..node import DeployWorkerNode
 from ..machine import Machine
+from ..machine import machine_status
 from ..database import db
 from ..utils import as_boolean
+from .pagination import list_response
 
 # TODO: put it in config
 NODE_TYPES = ('master', 'worker', 'discovery',)
@@ -146,8 +148,8 @@ class CreateNodeResource(Resource):
 
 class NodeListResource(Resource):
     def get(self):
-        nodes = db.all("nodes")
-        return [node.as_dict() for node in nodes]
+        return list_response("nodes", lambda node: node.as_dict(),
+                             filters={"type": "type"})
 
 
 class NodeResource(Resource):
@@ -190,7 +192,7 @@ class NodeResource(Resource):
                 "message": "master node still running"
             }, 403
 
-        running = self.machine.is_running(node.name)
+        running = machine_status.is_running(node.name)
         if running:
             try:
                 self.machine.rm(node.name)
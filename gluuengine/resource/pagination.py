@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import hashlib
+
+from flask import Response
+from flask import current_app
+from flask import request
+from flask import stream_with_context
+from flask import url_for
+
+from ..database import db
+from ..utils import iter_json_list
+
+
+def stream_json_list(items, headers=None, etag=None):
+    """Creates a response which streams ``items`` as a JSON array.
+    """
+    resp = Response(stream_with_context(iter_json_list(items)),
+                    mimetype="application/json", headers=headers)
+    if etag:
+        resp.set_etag(etag)
+    return resp
+
+
+def list_response(table_name, formatter, filters=None, condition=None,
+                  conditional=True):
+    """Creates a (streamed) JSON list response of objects in a table.
+
+    Objects can be filtered by query string parameters declared in
+    ``filters`` and paginated using ``limit`` and ``after`` (ID of last
+    object in previous page) parameters; the URL of next page is sent
+    in ``Link`` header. Without them, all matching objects are returned.
+
+    Responses carry an ETag derived from table version and request URL;
+    if it matches ``If-None-Match`` header, 304 is returned without
+    reading any row. Lists whose ``formatter`` depends on anything
+    besides the table must pass ``conditional=False``.
+
+    :param table_name: Name of the table.
+    :param formatter: A callable to convert object to a dict.
+    :param filters: Mapping of query string parameter to field name.
+    :param condition: Base search condition, e.g. taken from URL;
+                      filters can't override its fields.
+    :param conditional: Whether to send ETag and answer conditional
+                        requests.
+    """
+    etag = None
+    if conditional:
+        etag = hashlib.md5("{}:{}".format(
+            db.table_version(table_name), request.full_path,
+        )).hexdigest()
+    if etag and etag in request.if_none_match:
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    # base condition wins over query string filters on the same field
+    search = {}
+    for param, field in (filters or {}).items():
+        value = request.args.get(param)
+        if value:
+            search[field] = value
+    search.update(condition or {})
+
+    limit = request.args.get("limit")
+    after = request.args.get("after") or None
+
+    if limit is None and after is None:
+        objs = db.iter_search_from_table(table_name, search)
+        return stream_json_list((formatter(obj) for obj in objs),
+                                etag=etag)
+
+    max_limit = current_app.config["API_MAX_PAGE_SIZE"]
+    try:
+        limit = int(limit or current_app.config["API_PAGE_SIZE"])
+        if not 0 < limit <= max_limit:
+            raise ValueError
+    except ValueError:
+        return {
+            "status": 400,
+            "message": "Invalid params",
+            "params": {
+                "limit": "must be a number between 1 "
+                         "and {}".format(max_limit),
+            },
+        }, 400
+
+    # fetch an extra object to find out whether there's a next page
+    objs = db.search_from_table(table_name, search,
+                                limit=limit + 1, after=after)
+
+    headers = {}
+    if len(objs) > limit:
+        objs = objs[:limit]
+        args = request.args.to_dict()
+        args.update(request.view_args or {})
+        args.update({"limit": limit, "after": objs[-1].id})
+        headers["Link"] = '<{}>; rel="next"'.format(
+            url_for(request.endpoint, _external=True, **args)
+        )
+    return stream_json_list((formatter(obj) for obj in objs), headers,
+                            etag=etag)
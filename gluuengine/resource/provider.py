@@ -15,6 +15,7 @@ from ..reqparser import AwsProviderReq
 from ..model import GenericProvider
 from ..model import DigitalOceanProvider
 from ..model import AwsProvider
+from .pagination import list_response
 
 PROVIDER_TYPES = (
     'generic',
@@ -78,17 +79,17 @@ class CreateProviderResource(Resource):
 
 class ProviderListResource(Resource):
     def get(self, provider_type=""):
-        if not provider_type:
-            # list all providers by type
-            providers = db.all("providers")
-            return [provider.as_dict() for provider in providers]
-
-        if provider_type not in PROVIDER_TYPES:
-            abort(404)
-
-        # list specific provider types
-        providers = db.search_from_table("providers", {'driver': provider_type})
-        return [provider.as_dict() for provider in providers]
+        condition = {}
+        if provider_type:
+            if provider_type not in PROVIDER_TYPES:
+                abort(404)
+            # list specific provider types
+            condition["driver"] = provider_type
+
+        return list_response(
+            "providers", lambda provider: provider.as_dict(),
+            filters={"type": "driver"}, condition=condition,
+        )
 
 
 class ProviderResource(Resource):
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+from flask import current_app
+from flask_restful import Resource
+
+from ..database import db
+from ..dockerclient import client_pool
+from ..helper import get_scale_scheduler
+from ..machine import machine_status
+
+
+class StatsResource(Resource):
+    def get(self):
+        return {
+            "database": {
+                "identity_map": db.cache_stats,
+                "pool": db.pool_stats,
+            },
+            "docker": client_pool.stats(),
+            "machines": machine_status.snapshot(),
+            "scale": get_scale_scheduler(current_app._get_current_object()).stats(),
+        }
@@ -27,6 +27,59 @@ class Config(object):
         os.path.join(DATA_DIR, "db", "shared.json"),
     )
 
+    # cache model instances fetched within a request/app context
+    DATABASE_IDENTITY_MAP = True
+
+    # build models from database rows without full schematics conversion
+    DATABASE_TRUSTED_ROWS = True
+
+    # load metadata of every table when app starts (SQL backend only)
+    DATABASE_PREWARM_TABLES = False
+
+    # connection pool of SQL backend (per worker process); note that each
+    # thread holds its own connection, hence ``DATABASE_POOL_SIZE`` should
+    # be at least equal to number of gunicorn threads
+    DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", 5))
+    DATABASE_POOL_MAX_OVERFLOW = int(
+        os.environ.get("DATABASE_POOL_MAX_OVERFLOW", 10)
+    )
+    DATABASE_POOL_TIMEOUT = int(os.environ.get("DATABASE_POOL_TIMEOUT", 30))
+    DATABASE_POOL_RECYCLE = int(os.environ.get("DATABASE_POOL_RECYCLE", 3600))
+    DATABASE_POOL_PRE_PING = os.environ.get(
+        "DATABASE_POOL_PRE_PING", "",
+    ).lower() in ("1", "true", "yes",)
+
+    # page size of list APIs when ``after`` is given without ``limit``,
+    # and the maximum ``limit`` allowed
+    API_PAGE_SIZE = 100
+    API_MAX_PAGE_SIZE = 1000
+
+    # change events API; each open stream holds a worker thread
+    EVENTS_POLL_INTERVAL = 1
+    EVENTS_HEARTBEAT = 15
+    EVENTS_STREAM_TIMEOUT = 300
+
+    # seconds between background refreshes of cached machine status;
+    # requests probe a machine by themselves if its status is older
+    # than ``MACHINE_STATUS_MAX_AGE``
+    MACHINE_STATUS_INTERVAL = 30
+    MACHINE_STATUS_MAX_AGE = 60
+
+    # max. number of container setup/teardown jobs running at once
+    # (per worker process) in total, per node and per container type;
+    # scale requests are rejected once ``SCALE_MAX_QUEUE`` jobs are
+    # waiting or running
+    SCALE_MAX_WORKERS = 50
+    SCALE_MAX_PER_NODE = 3
+    SCALE_MAX_PER_TYPE = 10
+    SCALE_MAX_QUEUE = 200
+
+    # running jobs talk to Docker API without holding a thread; only
+    # in-container configuration (SSH, docker exec) takes one of
+    # ``SETUP_POOL_SIZE`` threads
+    SETUP_POOL_SIZE = 10
+    DOCKER_MAX_REQUESTS_PER_NODE = 10
+
     TEMPLATES_DIR = os.path.join(APP_DIR, "templates")
     LOG_DIR = os.environ.get("LOG_DIR", "/var/log/gluuengine")
     CONTAINER_LOG_DIR = os.path.join(LOG_DIR, "containers")
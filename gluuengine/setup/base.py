@@ -9,6 +9,7 @@ import shutil
 import tempfile
 import time
 import uuid
+from contextlib import contextmanager
 
 from jinja2 import Environment
 from jinja2 import PackageLoader
@@ -37,6 +38,10 @@ class BaseSetup(object):
         self.template_dir = self.app.config["TEMPLATES_DIR"]
         self.machine = Machine()
 
+        # files and contents collected by ``staged_copies`` block
+        self._staged_files = None
+        self._staged_contents = None
+
         try:
             master_node = db.search_from_table(
                 "nodes", {"type": "master"},
@@ -68,6 +73,47 @@ class BaseSetup(object):
         except OSError:  # pragma: no cover
             pass
 
+    @contextmanager
+    def staged_copies(self):
+        """Collects files pushed by :meth:`push_file` and
+        :meth:`push_content` (including rendered templates) and copies
+        them into container in a single archive upload when the block
+        exits.
+        """
+        self._staged_files = {}
+        self._staged_contents = {}
+        try:
+            yield
+        finally:
+            files, self._staged_files = self._staged_files, None
+            contents, self._staged_contents = self._staged_contents, None
+        self.docker.copy_many_to_container(self.container.cid, files, contents)
+
+    def push_file(self, local, dest):
+        """Copies local file into container, or stages the file
+        if called inside ``staged_copies`` block.
+
+        :param local: Path to local file.
+        :param dest: Destination path in container.
+        """
+        if self._staged_files is None:
+            self.docker.copy_to_container(self.container.cid, local, dest)
+        else:
+            self._staged_files[local] = dest
+
+    def push_content(self, content, dest):
+        """Writes content into a file in container without touching
+        local disk, or stages it if called inside ``staged_copies`` block.
+
+        :param content: String of file content.
+        :param dest: Destination path in container.
+        """
+        if self._staged_contents is None:
+            self.docker.copy_many_to_container(self.container.cid,
+                                               contents={dest: content})
+        else:
+            self._staged_contents[dest] = content
+
     def render_template(self, src, dest, ctx=None):
         """Renders non-jinja template.
 
@@ -77,16 +123,12 @@ class BaseSetup(object):
         """
         ctx = ctx or {}
         file_basename = os.path.basename(src)
-        local = os.path.join(self.build_dir, file_basename)
 
         with codecs.open(src, "r", encoding="utf-8") as fp:
             rendered_content = fp.read() % ctx
 
-        with codecs.open(local, "w", encoding="utf-8") as fp:
-            fp.write(rendered_content)
-
         self.logger.debug("rendering {}".format(file_basename))
-        self.docker.copy_to_container(self.container.cid, local, dest)
+        self.push_content(rendered_content, dest)
 
     def gen_cert(self, suffix, password, user, group, hostname):
         """Generates certificates.
@@ -110,7 +152,6 @@ class BaseSetup(object):
             "-passout", "pass:'{}'".format(password), "2048",
         ])
         keypass_cmd = '''sh -c "{}"'''.format(keypass_cmd)
-        self.docker.exec_cmd(self.container.cid, keypass_cmd)
 
         # command to create key file
         key_cmd = " ".join([
@@ -120,7 +161,6 @@ class BaseSetup(object):
             "-out", key,
         ])
         key_cmd = '''sh -c "{}"'''.format(key_cmd)
-        self.docker.exec_cmd(self.container.cid, key_cmd)
 
         # command to create csr file
         csr_cmd = " ".join([
@@ -137,7 +177,6 @@ class BaseSetup(object):
             )
         ])
         csr_cmd = '''sh -c "{}"'''.format(csr_cmd)
-        self.docker.exec_cmd(self.container.cid, csr_cmd)
 
         # command to create crt file
         crt_cmd = " ".join([
@@ -148,25 +187,18 @@ class BaseSetup(object):
             "-out", crt,
         ])
         crt_cmd = '''sh -c "{}"'''.format(crt_cmd)
-        self.docker.exec_cmd(self.container.cid, crt_cmd)
 
-        self.logger.debug("changing access to {} certificates".format(suffix))
-        self.docker.exec_cmd(
-            self.container.cid,
+        # all steps are executed in a single docker exec
+        self.docker.exec_script(self.container.cid, [
+            keypass_cmd,
+            key_cmd,
+            csr_cmd,
+            crt_cmd,
             "chown {}:{} {}".format(user, group, key_with_password),
-        )
-        self.docker.exec_cmd(
-            self.container.cid,
             "chmod 700 {}".format(key_with_password),
-        )
-        self.docker.exec_cmd(
-            self.container.cid,
             "chown {}:{} {}".format(user, group, key),
-        )
-        self.docker.exec_cmd(
-            self.container.cid,
             "chmod 700 {}".format(key),
-        )
+        ])
 
     def change_cert_access(self, user, group):
         """Modifies ownership of certificates located under predefined path.
@@ -175,14 +207,10 @@ class BaseSetup(object):
         :param group: Group who owns the certificates.
         """
         self.logger.debug("changing access to {}".format(self.container.cert_folder))
-        self.docker.exec_cmd(
-            self.container.cid,
+        self.docker.exec_script(self.container.cid, [
             "chown -R {}:{} {}".format(user, group, self.container.cert_folder),
-        )
-        self.docker.exec_cmd(
-            self.container.cid,
             "chmod -R 500 {}".format(self.container.cert_folder),
-        )
+        ])
 
     def get_template_path(self, path):
         """Gets absolute path to non-jinja template.
@@ -222,13 +250,9 @@ class BaseSetup(object):
         """
         rendered_content = self.render_jinja_template(src, ctx)
         file_basename = os.path.basename(src)
-        local = os.path.join(self.build_dir, file_basename)
-
-        with codecs.open(local, "w", encoding="utf-8") as fp:
-            fp.write(rendered_content)
 
         self.logger.debug("rendering {}".format(file_basename))
-        self.docker.copy_to_container(self.container.cid, local, dest)
+        self.push_content(rendered_content, dest)
 
     def reload_supervisor(self):
         """Reloads supervisor.
@@ -306,12 +330,8 @@ class OxSetup(BaseSetup):
 
         self.logger.debug("writing salt file")
 
-        local_dest = os.path.join(self.build_dir, "salt")
-        with codecs.open(local_dest, "w", encoding="utf-8") as fp:
-            fp.write("encodeSalt = {}".format(salt))
-
         remote_dest = os.path.join(self.container.tomcat_conf_dir, "salt")
-        self.docker.copy_to_container(self.container.cid, local_dest, remote_dest)
+        self.push_content("encodeSalt = {}".format(salt), remote_dest)
 
     def gen_keystore(self, suffix, keystore_fn, keystore_pw, in_key,
                      in_cert, user, group, hostname):
@@ -338,7 +358,6 @@ class OxSetup(BaseSetup):
             '-name', hostname,
             '-passout', 'pass:%s' % keystore_pw,
         ])
-        self.docker.exec_cmd(self.container.cid, export_cmd)
 
         # Import p12 to keystore
         import_cmd = " ".join([
@@ -352,17 +371,15 @@ class OxSetup(BaseSetup):
             '-keyalg', 'RSA',
             '-noprompt',
         ])
-        self.docker.exec_cmd(self.container.cid, import_cmd)
 
-        self.logger.debug("changing access to keystore file")
-        self.docker.exec_cmd(
-            self.container.cid, "chown {}:{} {}".format(user, group, pkcs_fn)
-        )
-        self.docker.exec_cmd(self.container.cid, "chmod 700 {}".format(pkcs_fn))
-        self.docker.exec_cmd(
-            self.container.cid, "chown {}:{} {}".format(user, group, keystore_fn)
-        )
-        self.docker.exec_cmd(self.container.cid, "chmod 700 {}".format(keystore_fn))
+        self.docker.exec_script(self.container.cid, [
+            export_cmd,
+            import_cmd,
+            "chown {}:{} {}".format(user, group, pkcs_fn),
+            "chmod 700 {}".format(pkcs_fn),
+            "chown {}:{} {}".format(user, group, keystore_fn),
+            "chmod 700 {}".format(keystore_fn),
+        ])
 
     def render_ldap_props_template(self):
         """Copies rendered jinja template for LDAP connection.
@@ -383,14 +400,11 @@ class OxSetup(BaseSetup):
     def configure_vhost(self):
         """Configures Apache2 virtual host.
         """
-        a2enmod_cmd = "a2enmod ssl headers proxy proxy_http proxy_ajp"
-        self.docker.exec_cmd(self.container.cid, a2enmod_cmd)
-
-        a2dissite_cmd = "a2dissite 000-default"
-        self.docker.exec_cmd(self.container.cid, a2dissite_cmd)
-
-        a2ensite_cmd = "a2ensite gluu_httpd"
-        self.docker.exec_cmd(self.container.cid, a2ensite_cmd)
+        self.docker.exec_script(self.container.cid, [
+            "a2enmod ssl headers proxy proxy_http proxy_ajp",
+            "a2dissite 000-default",
+            "a2ensite gluu_httpd",
+        ])
 
     def import_nginx_cert(self):
         """Imports SSL certificate from nginx container.
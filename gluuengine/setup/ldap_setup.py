@@ -3,7 +3,6 @@
 #
 # All rights reserved.
 
-import codecs
 import json
 import os.path
 import time
@@ -46,15 +45,9 @@ class LdapSetup(BaseSetup):
         """
         self.logger.debug("writing temporary LDAP password")
 
-        local_dest = os.path.join(self.build_dir, ".pw")
-        with codecs.open(local_dest, "w", encoding="utf-8") as fp:
-            fp.write(self.cluster.decrypted_admin_pw)
-
-        self.docker.exec_cmd(
-            self.container.cid,
-            "mkdir -p {}".format(os.path.dirname(self.container.ldap_pass_fn)),
-        )
-        self.docker.copy_to_container(self.container.cid, local_dest, self.container.ldap_pass_fn)
+        # missing parent directory is created by the upload
+        self.push_content(self.cluster.decrypted_admin_pw,
+                          self.container.ldap_pass_fn)
 
     def delete_ldap_pw(self):
         """Removes temporary LDAP password.
@@ -320,9 +313,10 @@ class LdapSetup(BaseSetup):
     def setup(self):
         """Runs the actual setup.
         """
-        self.write_ldap_pw()
-        self.add_ldap_schema()
-        self.import_custom_schema()
+        with self.staged_copies():
+            self.write_ldap_pw()
+            self.add_ldap_schema()
+            self.import_custom_schema()
         self.setup_opendj()
         self.add_auto_startup_entry()
         self.reload_supervisor()
@@ -395,7 +389,7 @@ class LdapSetup(BaseSetup):
             basename = os.path.basename(file_)
             dest = "{}/{}".format(self.container.schema_folder, basename)
             self.logger.debug("copying {}".format(basename))
-            self.docker.copy_to_container(self.container.cid, file_, dest)
+            self.push_file(file_, dest)
 
     def disable_replication(self):
         """Disable replication setup for current container.
@@ -16,17 +16,19 @@ class OxasimbaSetup(OxSetup):  # pragma: no cover
     def setup(self):
         hostname = self.container.hostname
 
-        # render config templates
-        self.copy_selector_template()
-        self.render_ldap_props_template()
-        self.render_server_xml_template()
-        self.render_httpd_conf()
+        # render config templates and upload them at once
+        with self.staged_copies():
+            self.copy_selector_template()
+            self.render_ldap_props_template()
+            self.render_server_xml_template()
+            self.render_httpd_conf()
         self.configure_vhost()
 
         # customize asimba and rebuild
         self.unpack_jar()
-        self.copy_props_template()
-        self.render_config_template()
+        with self.staged_copies():
+            self.copy_props_template()
+            self.render_config_template()
 
         self.gen_cert("asimba", self.cluster.decrypted_admin_pw,
                       "tomcat", "tomcat", hostname)
@@ -92,12 +94,12 @@ class OxasimbaSetup(OxSetup):  # pragma: no cover
     def copy_selector_template(self):
         src = self.get_template_path("oxasimba/asimba-selector.xml")
         dest = "{}/asimba-selector.xml".format(self.container.tomcat_conf_dir)
-        self.docker.copy_to_container(self.container.cid, src, dest)
+        self.push_file(src, dest)
 
     def copy_props_template(self):
         src = self.get_template_path("oxasimba/asimba.properties")
         dest = "/tmp/asimba/WEB-INF/asimba.properties"
-        self.docker.copy_to_container(self.container.cid, src, dest)
+        self.push_file(src, dest)
 
     def render_config_template(self):
         src = self.get_template_path("oxasimba/asimba.xml")
@@ -116,19 +118,16 @@ class OxasimbaSetup(OxSetup):  # pragma: no cover
         # rebuild jar
         jar_cmd = "/usr/bin/jar cmf /tmp/asimba/META-INF/MANIFEST.MF " \
                   "/tmp/asimba.war -C /tmp/asimba ."
-        self.docker.exec_cmd(self.container.cid, jar_cmd)
 
-        # remove oxasimba.war
-        rm_cmd = "rm /opt/tomcat/webapps/oxasimba.war"
-        self.docker.exec_cmd(self.container.cid, rm_cmd)
-
-        # install reconfigured asimba.jar
-        mv_cmd = "mv /tmp/asimba.war /opt/tomcat/webapps/asimba.war"
-        self.docker.exec_cmd(self.container.cid, mv_cmd)
-
-        # remove temporary asimba
-        rm_cmd = "rm -rf /tmp/asimba"
-        self.docker.exec_cmd(self.container.cid, rm_cmd)
+        self.docker.exec_script(self.container.cid, [
+            jar_cmd,
+            # remove oxasimba.war
+            "rm /opt/tomcat/webapps/oxasimba.war",
+            # install reconfigured asimba.jar
+            "mv /tmp/asimba.war /opt/tomcat/webapps/asimba.war",
+            # remove temporary asimba
+            "rm -rf /tmp/asimba",
+        ])
 
     def pull_idp_metadata(self):
         files = iglob("{}/metadata/*-idp-metadata.xml".format(
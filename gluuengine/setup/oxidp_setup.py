@@ -19,11 +19,12 @@ class OxidpSetup(OxSetup):
         """
         hostname = self.container.hostname
 
-        # render config templates
-        self.render_server_xml_template()
-        self.render_ldap_props_template()
-        self.write_salt_file()
-        self.render_httpd_conf()
+        # render config templates and upload them at once
+        with self.staged_copies():
+            self.render_server_xml_template()
+            self.render_ldap_props_template()
+            self.write_salt_file()
+            self.render_httpd_conf()
         self.configure_vhost()
 
         self.gen_cert("shibIDP", self.cluster.decrypted_admin_pw,
@@ -26,10 +26,11 @@ class OxtrustSetup(OxSetup):
         """
         hostname = self.cluster.ox_cluster_hostname.split(":")[0]
 
-        self.render_ldap_props_template()
-        self.render_server_xml_template()
-        self.write_salt_file()
-        self.render_httpd_conf()
+        with self.staged_copies():
+            self.render_ldap_props_template()
+            self.render_server_xml_template()
+            self.write_salt_file()
+            self.render_httpd_conf()
         self.configure_vhost()
         self.render_check_ssl_template()
 
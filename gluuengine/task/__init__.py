@@ -4,3 +4,4 @@
 # All rights reserved.
 
 from .licensewatcher import LicenseWatcherTask  # noqa
+from .machinestatus import MachineStatusTask  # noqa
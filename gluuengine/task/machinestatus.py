@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2016 Gluu
+#
+# All rights reserved.
+
+import logging
+
+from crochet import run_in_reactor
+from twisted.internet.task import LoopingCall
+from twisted.internet.threads import deferToThread
+
+from ..machine import machine_status
+
+
+class MachineStatusTask(object):
+    """Periodically refreshes cached status of machines, so API requests
+    don't need to probe the machines by themselves.
+    """
+
+    def __init__(self, app):
+        self.logger = logging.getLogger(
+            __name__ + "." + self.__class__.__name__,
+        )
+        self.app = app
+
+    @run_in_reactor
+    def perform_job(self):
+        """An entrypoint of this task class.
+        """
+        # callback to handle error
+        def on_error(failure):
+            self.logger.error(failure.getTraceback())
+
+        interval = self.app.config["MACHINE_STATUS_INTERVAL"]
+
+        # probing machines is blocking, hence run it outside the reactor
+        lc = LoopingCall(deferToThread, self.refresh_status)
+        deferred = lc.start(interval, now=True)
+        deferred.addErrback(on_error)
+
+    def refresh_status(self):
+        # a failed round must not stop the loop
+        try:
+            machine_status.refresh()
+        except Exception as exc:
+            self.logger.warn("unable to refresh machine status: {}".format(exc))
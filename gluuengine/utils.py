@@ -8,12 +8,14 @@ import hashlib
 import json
 import os
 import random
+import shutil
 import string
 import sys
 import tarfile
-import tempfile
+import time
 import traceback
 import uuid
+from io import BytesIO
 from subprocess import Popen
 from subprocess import PIPE
 
@@ -194,7 +196,7 @@ def make_tarfile(src):
     abspath = os.path.abspath(src)
     recursive = os.path.isdir(abspath)
 
-    fd = tempfile.NamedTemporaryFile()
+    fd = BytesIO()
     tf = tarfile.open(mode="w", fileobj=fd)
     tf.add(abspath, arcname=os.path.basename(src), recursive=recursive)
     tf.close()
@@ -202,11 +204,88 @@ def make_tarfile(src):
     return fd
 
 
+def make_multi_tarfile(files=None, contents=None):
+    """Makes an in-memory tar archive holding files at their final paths.
+
+    Members are owned by root and keep permission bits of local files
+    (in-memory contents get ``0644``), so the archive can be extracted
+    at ``/`` as is.
+
+    :param files: A ``dict`` of ``{local_path: dest_path}``.
+    :param contents: A ``dict`` of ``{dest_path: content}``; unicode
+                     content is encoded as UTF-8.
+    :returns: A file-like object of the archive.
+    """
+    def set_owner(tarinfo):
+        tarinfo.uid = tarinfo.gid = 0
+        tarinfo.uname = tarinfo.gname = "root"
+        return tarinfo
+
+    fd = BytesIO()
+    tf = tarfile.open(mode="w", fileobj=fd)
+    for src, dest in sorted((files or {}).iteritems(), key=lambda item: item[1]):
+        abspath = os.path.abspath(src)
+        tf.add(abspath, arcname=dest.lstrip("/"),
+               recursive=os.path.isdir(abspath), filter=set_owner)
+
+    for dest, content in sorted((contents or {}).iteritems()):
+        if isinstance(content, unicode):
+            content = content.encode("utf-8")
+        tarinfo = set_owner(tarfile.TarInfo(dest.lstrip("/")))
+        tarinfo.size = len(content)
+        tarinfo.mode = 0o644
+        tarinfo.mtime = time.time()
+        tf.addfile(tarinfo, BytesIO(content))
+    tf.close()
+    fd.seek(0)
+    return fd
+
+
 def extract_tarfile(tardata, path):
     with tarfile.open(mode='r', fileobj=tardata) as t:
         t.extractall(path)
 
 
+def extract_tarfile_member(fileobj, name, dest):
+    """Extracts a member (with its children, if it is a directory)
+    from a tar stream without buffering the whole archive.
+
+    :param fileobj: A file-like object of the archive; only ``read``
+                    is required.
+    :param name: Name of the member.
+    :param dest: Path where the member is extracted to.
+    :returns: ``True`` if the member is found, otherwise ``False``.
+              Symbolic and hard links are skipped.
+    """
+    found = False
+
+    with tarfile.open(mode="r|", fileobj=fileobj) as tf:
+        for member in tf:
+            if member.name != name and not member.name.startswith(name + "/"):
+                continue
+
+            # reject paths escaping ``dest``
+            if ".." in member.name.split("/"):
+                continue
+
+            path = dest + member.name[len(name):]
+
+            # only directories and regular files are extracted; links
+            # (and devices) may point outside ``dest``
+            if member.isdir():
+                found = True
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+            elif member.isfile():
+                found = True
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                with open(path, "wb") as fd:
+                    shutil.copyfileobj(tf.extractfile(member), fd)
+                os.chmod(path, member.mode)
+    return found
+
+
 def retrieve_current_date():
     """Retrieves current date from license server.
     """
@@ -251,3 +330,15 @@ def populate_license(license_key):
         # hence we're importing the data
         license_key.metadata.import_data(decoded_license["metadata"])
         return license_key, err
+
+
+def iter_json_list(items):
+    """Encodes items as a JSON array, one chunk per item, so a large list
+    can be streamed without being fully built in memory.
+    """
+    yield "["
+    for idx, item in enumerate(items):
+        if idx:
+            yield ","
+        yield json.dumps(item)
+    yield "]"
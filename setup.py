@@ -49,6 +49,7 @@ setup(
         "pymysql",
         "schematics",
         "dataset",
+        "pyOpenSSL",
     ],
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
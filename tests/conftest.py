@@ -369,6 +369,11 @@ def patched_exec_cmd(monkeypatch):
         "gluuengine.dockerclient.Docker.exec_cmd",
         lambda cls, container, cmd: DockerExecResult(cmd, 0, ""),
     )
+    monkeypatch.setattr(
+        "gluuengine.dockerclient.Docker.exec_script",
+        lambda cls, container, cmds: [DockerExecResult(cmd, 0, "")
+                                      for cmd in cmds],
+    )
 
 
 @pytest.fixture()
@@ -0,0 +1,112 @@
+import pytest
+
+
+class FakeContainer(object):
+    def __init__(self, node_id, type_="oxauth", state="IN_PROGRESS"):
+        self.id = "{}-{}".format(node_id, id(self))
+        self.name = "gluu{}_{}".format(type_, self.id)
+        self.node_id = node_id
+        self.type = type_
+        self.state = state
+
+
+class FakeHelper(object):
+    def __init__(self, container, error=None):
+        self.container = container
+        self.error = error
+
+    def async_setup(self):
+        from twisted.internet.defer import fail
+        from twisted.internet.defer import succeed
+
+        if self.error:
+            return fail(RuntimeError(self.error))
+        self.container.state = "SUCCESS"
+        return succeed(None)
+
+
+@pytest.fixture()
+def started(monkeypatch):
+    # started tasks; each one is finished by firing its deferred
+    from twisted.internet.defer import Deferred
+    from gluuengine.helper import ScaleScheduler
+
+    tasks = []
+
+    def run(self, task):
+        d = Deferred()
+        tasks.append((task, d))
+        return d
+
+    monkeypatch.setattr(ScaleScheduler, "_run", run)
+    return tasks
+
+
+def make_job(helpers, action="setup"):
+    from gluuengine.model import ScaleJob
+    return ScaleJob.from_containers(
+        action, "oxauth", [helper.container for helper in helpers],
+    )
+
+
+def test_scheduler_per_node_limit(app, started):
+    from gluuengine.helper import ScaleScheduler
+
+    scheduler = ScaleScheduler(app, max_workers=10, max_per_node=2)
+    helpers = [FakeHelper(FakeContainer("a")) for _ in range(5)]
+    helpers.append(FakeHelper(FakeContainer("b")))
+    scheduler.submit(make_job(helpers), helpers)
+
+    # busy node ``a`` doesn't hold back node ``b``
+    nodes = [task.helper.container.node_id for task, _ in started]
+    assert nodes == ["a", "a", "b"]
+    assert scheduler.stats()["pending"] == 3
+
+    started[0][1].callback(None)
+    assert len(started) == 4
+    assert started[-1][0].helper.container.node_id == "a"
+
+
+def test_scheduler_global_and_type_limit(app, started):
+    from gluuengine.helper import ScaleScheduler
+
+    scheduler = ScaleScheduler(app, max_workers=3, max_per_node=10,
+                               max_per_type=2)
+    helpers = [FakeHelper(FakeContainer(str(idx))) for idx in range(3)]
+    helpers.append(FakeHelper(FakeContainer("3", type_="oxidp")))
+    scheduler.submit(make_job(helpers), helpers)
+
+    assert [task.index for task, _ in started] == [0, 1, 3]
+    assert scheduler.stats()["running_per_type"] == {"oxauth": 2, "oxidp": 1}
+
+
+def test_scheduler_backpressure(app):
+    from gluuengine.helper import ScaleScheduler
+
+    scheduler = ScaleScheduler(app, max_queue=5)
+    assert scheduler.try_reserve(3)
+    assert not scheduler.try_reserve(3)
+
+    scheduler.release(1)
+    assert scheduler.try_reserve(3)
+    assert scheduler.stats()["backlog"] == 5
+
+
+def test_scheduler_run_records_results(app, db):
+    from gluuengine.helper import ScaleScheduler
+    from gluuengine.helper.scheduler import _ScaleTask
+
+    scheduler = ScaleScheduler(app)
+    helpers = [FakeHelper(FakeContainer("a")),
+               FakeHelper(FakeContainer("a"), error="no route to host")]
+    job = make_job(helpers)
+    db.persist(job, "scale_jobs")
+
+    for index, helper in enumerate(helpers):
+        scheduler._run(_ScaleTask(job, index, helper))
+
+    saved = db.get(job.id, "scale_jobs").as_dict()
+    assert saved["state"] == "FAILED"
+    assert saved["counts"]["SUCCESS"] == 1
+    assert saved["items"][1]["error"] == "no route to host"
+    assert saved["items"][0]["elapsed"] is not None
@@ -0,0 +1,14 @@
+def test_from_trusted(ldap_container, digitalocean_provider):
+    for obj in (ldap_container, digitalocean_provider):
+        data = obj.to_primitive()
+        expected = obj.__class__(data)
+        actual = obj.__class__.from_trusted(data)
+        assert actual.to_primitive() == expected.to_primitive()
+
+
+def test_from_trusted_default(master_node):
+    data = master_node.to_primitive()
+    data.pop("type")
+
+    node = master_node.__class__.from_trusted(data)
+    assert node.type == "master"
@@ -0,0 +1,27 @@
+def test_reserve_placement(app, db, nginx_container, oxauth_container):
+    from gluuengine.model import NginxContainer
+    from gluuengine.model import Placement
+
+    assert Placement.reserve(nginx_container)
+
+    # same type on the same node
+    other = NginxContainer({
+        "cluster_id": nginx_container.cluster_id,
+        "node_id": nginx_container.node_id,
+    })
+    assert not Placement.reserve(other)
+
+    # unlimited type
+    assert Placement.reserve(oxauth_container)
+
+    Placement.release(nginx_container)
+    assert Placement.reserve(other)
+    Placement.release(other)
+
+
+def test_placement_key(cluster, master_node, oxtrust_container):
+    from gluuengine.model import Placement
+
+    assert Placement.get_key(oxtrust_container) == "cluster:{}:oxtrust".format(
+        oxtrust_container.cluster_id,
+    )
@@ -0,0 +1,138 @@
+import json
+
+
+def test_container_list_get(app, db, ldap_container):
+    db.persist(ldap_container, "containers")
+
+    resp = app.test_client().get("/containers")
+    actual_data = json.loads(resp.data)
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/json"
+    assert ldap_container.id in [item["id"] for item in actual_data]
+
+
+def test_container_list_get_by_type(app, db, ldap_container):
+    db.persist(ldap_container, "containers")
+
+    resp = app.test_client().get("/filter-containers/oxauth")
+    actual_data = json.loads(resp.data)
+
+    assert resp.status_code == 200
+    assert ldap_container.id not in [item["id"] for item in actual_data]
+
+
+def test_container_list_get_by_type_ignores_type_filter(app, db, ldap_container):
+    db.persist(ldap_container, "containers")
+
+    resp = app.test_client().get("/filter-containers/oxauth?type=ldap")
+    actual_data = json.loads(resp.data)
+    db.delete(ldap_container.id, "containers")
+
+    assert resp.status_code == 200
+    assert ldap_container.id not in [item["id"] for item in actual_data]
+
+
+def test_container_log_list_get(app, db):
+    resp = app.test_client().get("/container_logs")
+    assert resp.status_code == 200
+    assert isinstance(json.loads(resp.data), list)
+
+
+def test_container_log_list_not_conditional(app, db):
+    resp = app.test_client().get("/container_logs",
+                                 headers={"If-None-Match": "*"})
+    assert resp.status_code == 200
+    assert "ETag" not in resp.headers
+
+
+def test_container_log_list_get_without_log_files(app, db):
+    from gluuengine.model import ContainerLog
+
+    container_log = ContainerLog({"container_name": "no-log-files"})
+    db.persist(container_log, "container_logs")
+
+    resp = app.test_client().get("/container_logs")
+    items = json.loads(resp.data)
+    db.delete(container_log.id, "container_logs")
+
+    assert resp.status_code == 200
+    item, = [item for item in items if item["id"] == container_log.id]
+    assert item["setup_log_url"] == ""
+    assert item["teardown_log_url"] == ""
+
+
+def test_container_list_paginate(app, db, cluster, master_node):
+    from gluuengine.model import NginxContainer
+
+    containers = [
+        NginxContainer({"cluster_id": cluster.id, "node_id": master_node.id,
+                        "state": "PAGINATE"})
+        for _ in range(3)
+    ]
+    db.persist_many(containers, "containers")
+    expected = sorted(container.id for container in containers)
+
+    client = app.test_client()
+    resp = client.get("/containers?state=PAGINATE&limit=2")
+    assert resp.status_code == 200
+    assert [item["id"] for item in json.loads(resp.data)] == expected[:2]
+    assert "after={}".format(expected[1]) in resp.headers["Link"]
+    assert 'rel="next"' in resp.headers["Link"]
+
+    resp = client.get(
+        "/containers?state=PAGINATE&limit=2&after={}".format(expected[1]),
+    )
+    assert [item["id"] for item in json.loads(resp.data)] == expected[2:]
+    assert "Link" not in resp.headers
+
+
+def test_container_list_invalid_limit(app, db):
+    resp = app.test_client().get("/containers?limit=0")
+    assert resp.status_code == 400
+
+
+def test_container_list_etag(app, db, ldap_container):
+    client = app.test_client()
+    resp = client.get("/containers")
+    etag = resp.headers["ETag"]
+
+    resp = client.get("/containers", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+    db.persist(ldap_container, "containers")
+    resp = client.get("/containers", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_scale_job_get(app, db):
+    from gluuengine.model import ScaleJob
+
+    job = ScaleJob.from_containers("setup", "oxauth", [])
+    db.persist(job, "scale_jobs")
+
+    resp = app.test_client().get("/scale-jobs/{}".format(job.id))
+    actual_data = json.loads(resp.data)
+    assert resp.status_code == 200
+    assert actual_data["id"] == job.id
+    assert actual_data["counts"]["QUEUED"] == 0
+
+
+def test_scale_job_get_notfound(app, db):
+    resp = app.test_client().get("/scale-jobs/random-id")
+    assert resp.status_code == 404
+
+
+def test_scale_container_queue_full(monkeypatch, app, db, cluster,
+                                    master_node):
+    from gluuengine.helper import get_scale_scheduler
+
+    db.persist(cluster, "clusters")
+    db.persist(master_node, "nodes")
+    monkeypatch.setattr(get_scale_scheduler(app), "max_queue", 0)
+    count = db.count_from_table("containers", {"type": "oxauth"})
+
+    resp = app.test_client().post("/scale-containers/oxauth/2")
+    assert resp.status_code == 429
+    assert db.count_from_table("containers", {"type": "oxauth"}) == count
@@ -0,0 +1,13 @@
+def test_events_get(app, db, monkeypatch):
+    monkeypatch.setitem(app.config, "EVENTS_POLL_INTERVAL", 0.01)
+    monkeypatch.setitem(app.config, "EVENTS_STREAM_TIMEOUT", 0.05)
+
+    resp = app.test_client().get("/events?tables=containers")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    assert resp.data.startswith("retry:")
+
+
+def test_events_get_invalid_table(app, db):
+    resp = app.test_client().get("/events?tables=clusters")
+    assert resp.status_code == 400
@@ -438,3 +438,28 @@ def test_delete_node_log(app, db, node_log):
 def test_delete_node_log_not_found(app):
     resp = app.test_client().delete("/node_logs/random")
     assert resp.status_code == 404
+
+
+def test_node_delete_uses_machine_status(monkeypatch, app, db, worker_node):
+    # nodes are looked up by name, which other tests may have saved
+    worker_node.name = "worker-{}".format(worker_node.id)
+    db.persist(worker_node, "nodes")
+    removed = []
+
+    monkeypatch.setattr(
+        "gluuengine.machine.machine_status.is_running",
+        lambda machine_name: True,
+    )
+    monkeypatch.setattr(
+        "gluuengine.machine.Machine.is_running",
+        lambda cls, machine_name: pytest.fail("docker-machine is called"),
+    )
+    monkeypatch.setattr(
+        "gluuengine.machine.Machine.rm",
+        lambda cls, machine_name: removed.append(machine_name),
+    )
+
+    resp = app.test_client().delete("/nodes/{}".format(worker_node.name))
+    assert resp.status_code == 204
+    assert removed == [worker_node.name]
+    assert db.get(worker_node.id, "nodes") is None
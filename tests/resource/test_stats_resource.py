@@ -0,0 +1,13 @@
+import json
+
+
+def test_stats_get(app, db):
+    resp = app.test_client().get("/stats")
+    actual_data = json.loads(resp.data)
+
+    assert resp.status_code == 200
+    assert "hits" in actual_data["database"]["identity_map"]
+    assert "pool" in actual_data["database"]
+    assert "requests" in actual_data["docker"]
+    assert "machines" in actual_data
+    assert "pending" in actual_data["scale"]
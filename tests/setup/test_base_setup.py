@@ -113,3 +113,39 @@ def test_configure_vhost(ox_setup, patched_exec_cmd):
 @pytest.mark.skip(reason="rewrite needed")
 def test_import_nginx_cert(ox_setup, patched_po_run, patched_exec_cmd):
     ox_setup.import_nginx_cert()
+
+
+def test_staged_copies(monkeypatch, base_setup):
+    uploads = []
+    monkeypatch.setattr(
+        "gluuengine.dockerclient.Docker.copy_many_to_container",
+        lambda cls, container, files=None, contents=None: uploads.append(
+            (files, contents),
+        ),
+    )
+    src = base_setup.get_template_path("oxtrust/check_ssl")
+
+    with base_setup.staged_copies():
+        base_setup.render_template(src, "/usr/bin/check_ssl",
+                                   {"ox_cluster_hostname": "localhost"})
+        base_setup.push_content("encodeSalt = secret", "/etc/salt")
+        assert not uploads
+
+    # rendered files are uploaded at once from memory
+    assert len(uploads) == 1
+    files, contents = uploads[0]
+    assert not files
+    assert sorted(contents) == ["/etc/salt", "/usr/bin/check_ssl"]
+    assert "localhost" in contents["/usr/bin/check_ssl"]
+
+
+def test_push_content(monkeypatch, base_setup):
+    uploads = []
+    monkeypatch.setattr(
+        "gluuengine.dockerclient.Docker.copy_many_to_container",
+        lambda cls, container, files=None, contents=None: uploads.append(
+            contents,
+        ),
+    )
+    base_setup.push_content("encodeSalt = secret", "/etc/salt")
+    assert uploads == [{"/etc/salt": "encodeSalt = secret"}]
@@ -0,0 +1,22 @@
+def test_refresh_status(monkeypatch, app):
+    from gluuengine.task import MachineStatusTask
+
+    refreshed = []
+    monkeypatch.setattr(
+        "gluuengine.machine.machine_status.refresh",
+        lambda: refreshed.append(True),
+    )
+    MachineStatusTask(app).refresh_status()
+    assert refreshed
+
+
+def test_refresh_status_error(monkeypatch, app):
+    from gluuengine.task import MachineStatusTask
+
+    def refresh():
+        raise RuntimeError("unable to list machines")
+
+    monkeypatch.setattr("gluuengine.machine.machine_status.refresh", refresh)
+
+    # errors are logged instead of stopping the loop
+    MachineStatusTask(app).refresh_status()
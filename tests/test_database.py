@@ -0,0 +1,330 @@
+import pytest
+
+
+def test_get_identity_map(app, db, master_node):
+    db.persist(master_node, "nodes")
+
+    with app.test_request_context():
+        db.reset_cache_stats()
+        node = db.get(master_node.id, "nodes")
+        assert db.get(master_node.id, "nodes") is node
+        assert db.cache_stats == {"hits": 1, "misses": 1}
+
+
+def test_get_identity_map_no_context(app, db, master_node):
+    db.persist(master_node, "nodes")
+    assert db.get(master_node.id, "nodes") is not db.get(master_node.id, "nodes")
+
+
+def test_search_shares_identity_map(app, db, worker_node):
+    db.persist(worker_node, "nodes")
+
+    with app.test_request_context():
+        node = db.get(worker_node.id, "nodes")
+        nodes = db.search_from_table("nodes", {"id": worker_node.id})
+        assert nodes[0] is node
+
+
+def test_write_invalidates_identity_map(app, db, ldap_container):
+    ldap_container.name = "ldap-invalidate"
+    db.persist(ldap_container, "containers")
+
+    with app.test_request_context():
+        container = db.get(ldap_container.id, "containers")
+        assert not db.search_from_table("containers", {"state": "FAILED", "name": "ldap-invalidate"})
+
+        ldap_container.state = "FAILED"
+        db.update(ldap_container.id, ldap_container, "containers")
+        assert db.get(ldap_container.id, "containers") is not container
+        assert db.search_from_table("containers", {"state": "FAILED", "name": "ldap-invalidate"})
+
+
+def test_persist_many(app, db, cluster, master_node):
+    from gluuengine.model import OxauthContainer
+
+    containers = [
+        OxauthContainer({"cluster_id": cluster.id, "node_id": master_node.id})
+        for _ in range(3)
+    ]
+    db.persist_many(containers, "containers")
+
+    ids = [container.id for container in containers]
+    assert len(db.get_many(ids, "containers")) == 3
+
+
+def test_update_many(app, db):
+    from gluuengine.model import ContainerLog
+
+    logs = [ContainerLog({"container_name": "log-{}".format(i)})
+            for i in range(3)]
+    db.persist_many(logs, "container_logs")
+
+    for log in logs:
+        log.state = "SETUP_FINISHED"
+    db.update_many(logs, "container_logs")
+
+    names = [log.container_name for log in logs]
+    for log in db.get_many(names, "container_logs", field="container_name"):
+        assert log.state == "SETUP_FINISHED"
+    db.delete_many([log.id for log in logs], "container_logs")
+
+
+def test_delete_many(app, db, cluster, master_node):
+    from gluuengine.model import NginxContainer
+
+    containers = [
+        NginxContainer({"cluster_id": cluster.id, "node_id": master_node.id})
+        for _ in range(2)
+    ]
+    db.persist_many(containers, "containers")
+
+    ids = [container.id for container in containers]
+    db.delete_many(ids, "containers")
+    assert db.get_many(ids, "containers") == []
+
+
+def test_search_from_table_fields(app, db, master_node):
+    db.persist(master_node, "nodes")
+
+    rows = db.search_from_table("nodes", {"id": master_node.id},
+                                fields=["id", "name"])
+    assert rows == [(master_node.id, master_node.name)]
+
+
+def test_all_fields(app, db, generic_provider):
+    db.persist(generic_provider, "providers")
+
+    rows = db.all("providers", fields=["name"])
+    assert (generic_provider.name,) in rows
+
+
+def test_create_indexes(app, db):
+    from gluuengine.model import CONTAINER_SCHEMA
+
+    created = db.create_indexes(CONTAINER_SCHEMA)
+    assert "ix_containers_node_id_type_state" in created
+
+    # indexes are created once
+    assert db.create_indexes(CONTAINER_SCHEMA) == []
+
+
+def test_dataset_table_cache():
+    from flask import Flask
+    from gluuengine.database import DatasetBackend
+
+    app = Flask(__name__)
+    app.config["DATASET_DATABASE_URI"] = "sqlite://"
+    backend = DatasetBackend(app)
+
+    backend.prewarm_tables(["nodes"])
+    table = backend._get_table("nodes")
+    assert backend._get_table("nodes") is table
+
+    backend.clear_table_cache()
+    assert backend._get_table("nodes") is not table
+
+
+def test_get_engine_kwargs():
+    from gluuengine.database import InstrumentedQueuePool
+    from gluuengine.database import get_engine_kwargs
+
+    config = {
+        "DATASET_ENGINE_KWARGS": None,
+        "DATASET_DATABASE_URI": "mysql://localhost/gluuengine",
+        "DATABASE_POOL_SIZE": 8,
+        "DATABASE_POOL_PRE_PING": True,
+    }
+    kwargs = get_engine_kwargs(config)
+    assert kwargs["poolclass"] is InstrumentedQueuePool
+    assert kwargs["pool_size"] == 8
+    assert kwargs["pool_pre_ping"] is True
+
+    # SQLite and explicit kwargs are left untouched
+    config["DATASET_DATABASE_URI"] = "sqlite://"
+    assert get_engine_kwargs(config) == {}
+    config["DATASET_ENGINE_KWARGS"] = {"echo": True}
+    assert get_engine_kwargs(config) == {"echo": True}
+
+
+def test_dataset_pool_stats():
+    from flask import Flask
+    from gluuengine.database import DatasetBackend
+
+    app = Flask(__name__)
+    app.config["DATASET_DATABASE_URI"] = "sqlite://"
+    backend = DatasetBackend(app)
+
+    table = backend._get_table("nodes")
+    assert backend.pool_stats()["class"] == "StaticPool"
+
+    # a new connection drops cached table handles
+    backend._connection_pid = None
+    assert backend.connection
+    assert backend._get_table("nodes") is not table
+
+
+def test_unit_of_work(master_node, worker_node):
+    from flask import Flask
+    from gluuengine.database import Database
+
+    app = Flask(__name__)
+    app.config["DATABASE_URI"] = "sqlite://"
+    database = Database(app)
+
+    with database.unit_of_work():
+        database.persist(master_node, "nodes")
+    assert database.get(master_node.id, "nodes").id == master_node.id
+
+    with pytest.raises(ValueError):
+        with database.unit_of_work():
+            database.persist(worker_node, "nodes")
+            raise ValueError("rollback")
+    assert database.get(worker_node.id, "nodes") is None
+
+
+def test_transaction(app, db, cluster, master_node):
+    with db.transaction():
+        db.persist(cluster, "clusters")
+        db.persist(master_node, "nodes")
+        master_node.name = "master-renamed"
+        db.update(master_node.id, master_node, "nodes")
+    assert db.get(cluster.id, "clusters").id == cluster.id
+    assert db.get(master_node.id, "nodes").name == "master-renamed"
+
+
+def test_transaction_discarded_on_error(app, db, worker_node):
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.persist(worker_node, "nodes")
+            raise ValueError("rollback")
+    assert db.get(worker_node.id, "nodes") is None
+
+
+def test_transaction_bumps_versions_first(monkeypatch, app, db, worker_node):
+    with app.app_context():
+        collection_class = type(db.backend.db["nodes"])
+    bulk_write = collection_class.bulk_write
+
+    def failing_bulk_write(self, requests, *args, **kwargs):
+        if self.name == "nodes":
+            raise RuntimeError("write failed")
+        return bulk_write(self, requests, *args, **kwargs)
+
+    version = db.table_version("nodes")
+    monkeypatch.setattr(collection_class, "bulk_write", failing_bulk_write)
+
+    # batch isn't atomic on MongoDB, but table version is bumped anyway
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.persist(worker_node, "nodes")
+    assert db.table_version("nodes") == version + 1
+
+
+def test_iter_search_from_table(app, db, ldap_container, oxauth_container):
+    db.persist(ldap_container, "containers")
+    db.persist(oxauth_container, "containers")
+
+    containers = db.iter_search_from_table("containers", {"type": "ldap"})
+    assert not isinstance(containers, list)
+
+    ids = [container.id for container in containers]
+    assert ldap_container.id in ids
+    assert oxauth_container.id not in ids
+    assert len(list(db.iter_all("containers"))) == len(db.all("containers"))
+
+
+def test_dataset_iter_all(master_node):
+    from flask import Flask
+    from gluuengine.database import Database
+
+    app = Flask(__name__)
+    app.config["DATABASE_URI"] = "sqlite://"
+    database = Database(app)
+
+    database.persist(master_node, "nodes")
+    assert [node.id for node in database.iter_all("nodes")] == [master_node.id]
+
+
+def test_dataset_search_paginate():
+    from flask import Flask
+    from gluuengine.database import Database
+    from gluuengine.model import WorkerNode
+
+    app = Flask(__name__)
+    app.config["DATABASE_URI"] = "sqlite://"
+    database = Database(app)
+
+    nodes = [WorkerNode({"name": "worker-{}".format(i)}) for i in range(3)]
+    database.persist_many(nodes, "nodes")
+    ids = sorted(node.id for node in nodes)
+
+    page = database.search_from_table("nodes", {"type": "worker"}, limit=2)
+    assert [node.id for node in page] == ids[:2]
+
+    page = database.search_from_table("nodes", {}, limit=2, after=ids[1])
+    assert [node.id for node in page] == ids[2:]
+
+
+def test_table_version(app, db, generic_provider):
+    version = db.table_version("providers")
+
+    db.persist(generic_provider, "providers")
+    assert db.table_version("providers") == version + 1
+
+    with db.transaction():
+        db.update(generic_provider.id, generic_provider, "providers")
+        db.delete(generic_provider.id, "providers")
+    assert db.table_version("providers") == version + 3
+
+
+def test_dataset_table_version(master_node):
+    from flask import Flask
+    from gluuengine.database import Database
+
+    app = Flask(__name__)
+    app.config["DATABASE_URI"] = "sqlite://"
+    database = Database(app)
+
+    assert database.table_version("nodes") == 0
+    database.persist(master_node, "nodes")
+    database.delete(master_node.id, "nodes")
+    assert database.table_version("nodes") == 2
+
+
+def test_dataset_persist_unique(master_node):
+    from flask import Flask
+    from gluuengine.database import Database
+
+    app = Flask(__name__)
+    app.config["DATABASE_URI"] = "sqlite://"
+    database = Database(app)
+
+    assert database.persist_unique(master_node, "nodes")
+    assert not database.persist_unique(master_node, "nodes")
+
+
+def test_watch(app, db, oxauth_container):
+    changes = db.watch({"containers": ["state"]}, interval=0)
+    assert next(changes) is None
+
+    db.persist(oxauth_container, "containers")
+    assert next(changes) == {
+        "table": "containers", "type": "insert",
+        "id": oxauth_container.id, "data": {"state": oxauth_container.state},
+    }
+
+    db.delete(oxauth_container.id, "containers")
+    assert next(changes)["type"] == "delete"
+    changes.close()
+
+
+def test_dataset_watch_timeout():
+    from flask import Flask
+    from gluuengine.database import Database
+
+    app = Flask(__name__)
+    app.config["DATABASE_URI"] = "sqlite://"
+    database = Database(app)
+
+    changes = database.watch({"nodes": ["name"]}, interval=0.01, timeout=0.05)
+    assert all(change is None for change in changes)
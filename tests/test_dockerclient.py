@@ -4,18 +4,68 @@ import pytest
 
 
 @pytest.mark.parametrize("retval, result", [
-    (["sha256:aa5d5f5a81c90b8683085c027"], True),
+    ([{"Id": "sha256:aa5d5f5a81c90b8683085c027",
+       "RepoTags": ["busybox:latest"]}], True),
     ([], False),
 ])
 def test_image_exists(monkeypatch, dockerclient, retval, result):
+    from gluuengine.dockerclient import image_inventory
+
+    image_inventory.invalidate()
+
     # stubbed ``docker.Client.images`` method's return value
     monkeypatch.setattr(
         "docker.Client.images",
-        lambda cls, name, quiet: retval,
+        lambda cls: retval,
     )
     assert dockerclient.image_exists("busybox") is result
 
 
+def test_image_exists_cached(monkeypatch, dockerclient):
+    from gluuengine.dockerclient import image_inventory
+
+    image_inventory.invalidate()
+    calls = []
+
+    def images(cls):
+        calls.append(True)
+        return [{"RepoTags": ["gluufederation/oxauth:latest"]}]
+
+    monkeypatch.setattr("docker.Client.images", images)
+    assert dockerclient.image_exists("gluufederation/oxauth:latest")
+    assert not dockerclient.image_exists("gluufederation/nginx:latest")
+    assert len(calls) == 1
+
+    # pulled image is added into inventory
+    monkeypatch.setattr(
+        "docker.Client.pull",
+        lambda cls, repository, stream: iter(['{"status": "Status: Downloaded"}']),
+    )
+    dockerclient.pull_image("gluufederation/nginx:latest")
+    assert dockerclient.image_exists("gluufederation/nginx:latest")
+    assert len(calls) == 1
+
+
+def test_pull_image_progress(monkeypatch, dockerclient):
+    stream_output = [
+        '{"status":"Downloading","progressDetail":{"current":1000000,'
+        '"total":2000000},"id":"a1"}\r\n'
+        '{"status":"Downloading","progressDetail":{"current":500000,'
+        '"total":1000000},"id":"b2"}',
+        '{"status":"Download complete","progressDetail":{},"id":"a1"}',
+        '{"status":"Status: Downloaded newer image"}',
+    ]
+    monkeypatch.setattr(
+        "docker.Client.pull",
+        lambda cls, repository, stream: iter(stream_output),
+    )
+    messages = []
+    assert dockerclient.pull_image("gluuopendj", progress=messages.append,
+                                   interval=0)
+    assert "1/2 layers, 2.5/3.0 MB" in messages[-1]
+    assert messages[-1].startswith("pulled gluuopendj in")
+
+
 def test_run_container(monkeypatch, dockerclient):
     monkeypatch.setattr(
         "docker.Client.create_container",
@@ -73,7 +123,7 @@ def test_setup_container(monkeypatch, dockerclient):
     )
     monkeypatch.setattr(
         "gluuengine.dockerclient.Docker.pull_image",
-        lambda cls, image: True,
+        lambda cls, image, progress=None: True,
     )
     monkeypatch.setattr(
         "gluuengine.dockerclient.Docker.run_container",
@@ -82,6 +132,37 @@ def test_setup_container(monkeypatch, dockerclient):
     assert dockerclient.setup_container("gluuopendj_123", "gluuopendj") == "123"
 
 
+def test_setup_container_image_removed(monkeypatch, dockerclient):
+    import docker.errors
+    from gluuengine.dockerclient import image_inventory
+
+    class Response(object):
+        content = "No such image: gluufederation/oxauth:latest"
+
+    pulls = []
+    runs = []
+
+    def run_container(cls, **kwargs):
+        runs.append(kwargs["image"])
+        if len(runs) == 1:
+            raise docker.errors.NotFound("404 Client Error", Response())
+        return "123"
+
+    # inventory still lists the removed image
+    image_inventory.set(None, ["gluufederation/oxauth:latest"])
+    monkeypatch.setattr(
+        "gluuengine.dockerclient.Docker.pull_image",
+        lambda cls, image, progress=None: pulls.append(image) or True,
+    )
+    monkeypatch.setattr("gluuengine.dockerclient.Docker.run_container",
+                        run_container)
+
+    assert dockerclient.setup_container("oxauth_123", "oxauth") == "123"
+    assert pulls == ["gluufederation/oxauth"]
+    assert len(runs) == 2
+    assert image_inventory.get(None) is None
+
+
 def test_remove_container(monkeypatch, dockerclient):
     monkeypatch.setattr(
         "docker.Client.remove_container",
@@ -90,14 +171,86 @@ def test_remove_container(monkeypatch, dockerclient):
     assert dockerclient.remove_container("gluuopendj_123") == "gluuopendj_123"
 
 
-@pytest.mark.skip(reason="implement me")
-def test_copy_to_container(dockerclient):
-    pass
+def test_copy_to_container(monkeypatch, dockerclient, tmpdir):
+    import tarfile
 
+    uploads = []
+    monkeypatch.setattr(
+        "docker.Client.put_archive",
+        lambda cls, container, path, data: uploads.append((path, data)),
+    )
+    src = tmpdir.join("salt")
+    src.write("encodeSalt = secret")
 
-@pytest.mark.skip(reason="implement me")
-def test_copy_from_container(dockerclient):
-    pass
+    dockerclient.copy_to_container("123", str(src), "/etc/gluu/conf/salt")
+
+    path, data = uploads[0]
+    tf = tarfile.open(fileobj=data)
+    assert path == "/"
+    assert tf.getnames() == ["etc/gluu/conf/salt"]
+
+
+def test_copy_many_to_container(monkeypatch, dockerclient, tmpdir):
+    import tarfile
+
+    uploads = []
+    monkeypatch.setattr(
+        "docker.Client.put_archive",
+        lambda cls, container, path, data: uploads.append((path, data)),
+    )
+    files = {}
+    for name in ("a.conf", "b.conf"):
+        src = tmpdir.mkdir(name.split(".")[0]).join(name)
+        src.write(name)
+        files[str(src)] = "/etc/{}".format(name)
+
+    dockerclient.copy_many_to_container("123", files)
+    dockerclient.copy_many_to_container("123", {})
+
+    # single upload for all files
+    assert len(uploads) == 1
+    tf = tarfile.open(fileobj=uploads[0][1])
+    assert tf.getnames() == ["etc/a.conf", "etc/b.conf"]
+    assert tf.extractfile("etc/b.conf").read() == "b.conf"
+
+
+@pytest.fixture()
+def container_archive(monkeypatch, tmpdir):
+    # ``get_archive`` stub serving a tar of local ``<tmpdir>/idp``
+    import tarfile
+    from io import BytesIO
+
+    idp = tmpdir.mkdir("idp")
+    idp.join("idp.crt").write("crt")
+    idp.mkdir("conf").join("attribute-resolver.xml").write("xml")
+
+    def get_archive(cls, container, path):
+        fd = BytesIO()
+        with tarfile.open(mode="w", fileobj=fd) as tf:
+            tf.add(str(idp), arcname="idp")
+        fd.seek(0)
+        return fd, {}
+
+    monkeypatch.setattr("docker.Client.get_archive", get_archive)
+
+
+def test_copy_from_container(dockerclient, container_archive, tmpdir):
+    dest = tmpdir.mkdir("dest")
+
+    # directory is copied into existing ``dest``
+    dockerclient.copy_from_container("123", "/opt/idp", str(dest))
+    assert dest.join("idp", "idp.crt").read() == "crt"
+    assert dest.join("idp", "conf", "attribute-resolver.xml").read() == "xml"
+
+    # ``dest`` is created if missing
+    dockerclient.copy_from_container("123", "/opt/idp", str(dest.join("copy")))
+    assert dest.join("copy", "idp.crt").read() == "crt"
+
+
+def test_copy_from_container_missing(dockerclient, container_archive, tmpdir):
+    with pytest.raises(IOError):
+        dockerclient.copy_from_container("123", "/opt/shibboleth",
+                                         str(tmpdir.join("dest")))
 
 
 def test_swarm_conf_str(dockerclient):
@@ -108,3 +261,270 @@ def test_swarm_conf_str(dockerclient):
 @pytest.mark.skip(reason="implement me")
 def test_exec_cmd(dockerclient):
     pass
+
+
+def test_client_pool_reuses_client(dockerclient):
+    from gluuengine.dockerclient import client_pool
+
+    with dockerclient._get_client() as client:
+        with dockerclient._get_client() as other:
+            assert client is other
+    assert client_pool.stats()["pooled_clients"] >= 1
+
+
+def test_client_pool_separates_daemons(dockerclient):
+    from gluuengine.dockerclient import Docker
+
+    other = Docker({}, {"base_url": "unix://var/run/docker.sock",
+                        "tls": False})
+    with dockerclient._get_client() as client:
+        with other._get_client() as other_client:
+            assert client is not other_client
+
+
+def test_client_pool_clear():
+    from gluuengine.dockerclient._docker import ClientPool
+
+    pool = ClientPool()
+    client = pool.get("unix://var/run/docker.sock", False)
+    assert pool.get("unix://var/run/docker.sock", False) is client
+    assert pool.stats()["clients"] == 1
+
+    pool.clear()
+    assert pool.stats()["pooled_clients"] == 0
+    assert pool.get("unix://var/run/docker.sock", False) is not client
+
+
+def test_docker_metrics():
+    from gluuengine.dockerclient._docker import DockerMetrics
+
+    metrics = DockerMetrics()
+    metrics.record_request(0.5, True)
+    metrics.record_request(0.1, False)
+
+    stats = metrics.as_dict()
+    assert stats["requests"] == 2
+    assert stats["cold_requests"] == 1
+    assert stats["cold_request_time"] == 0.5
+
+
+@pytest.fixture()
+def local_exec(monkeypatch):
+    # runs exec'd command in local shell instead of a container
+    import subprocess
+
+    execs = {}
+
+    def exec_create(cls, container, cmd):
+        execs["cmd"] = cmd
+        return {"Id": "123"}
+
+    def exec_start(cls, exec_id):
+        proc = subprocess.Popen(execs["cmd"], stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        execs["output"], _ = proc.communicate()
+        execs["exit_code"] = proc.returncode
+        return execs["output"]
+
+    monkeypatch.setattr("docker.Client.exec_create", exec_create)
+    monkeypatch.setattr("docker.Client.exec_start", exec_start)
+    monkeypatch.setattr(
+        "docker.Client.exec_inspect",
+        lambda cls, exec_id: {"ExitCode": execs["exit_code"]},
+    )
+    return execs
+
+
+def test_exec_script(dockerclient, local_exec):
+    results = dockerclient.exec_script("123", [
+        "echo first",
+        '''sh -c "echo 'pass:$secret' && printf no-newline"''',
+        "true",
+    ])
+
+    # one exec for the whole batch
+    assert local_exec["cmd"][:2] == ["sh", "-c"]
+    assert [result.retval for result in results] == [
+        "first", "pass:$secret\nno-newline", "",
+    ]
+    assert all(result.exit_code == 0 for result in results)
+
+
+def test_exec_script_error(dockerclient, local_exec):
+    from gluuengine.errors import DockerExecError
+
+    with pytest.raises(DockerExecError) as exc:
+        dockerclient.exec_script("123", [
+            "echo first",
+            "sh -c 'echo failed && exit 3'",
+            "echo skipped",
+        ])
+    assert exc.value.exit_code == 3
+    assert exc.value.cmd_err == "failed"
+    assert exc.value.cmd == "sh -c 'echo failed && exit 3'"
+    assert exc.value.index == 1
+    assert [result.retval for result in exc.value.results] == ["first"]
+    assert "step 1" in str(exc.value)
+    assert "skipped" not in local_exec["output"]
+
+
+class FakeResponse(object):
+    def __init__(self, code, body):
+        self.code = code
+        self.body = body
+
+    def deliverBody(self, protocol):
+        from twisted.python.failure import Failure
+        from twisted.web.client import ResponseDone
+
+        for line in self.body.splitlines(True):
+            protocol.dataReceived(line)
+        protocol.connectionLost(Failure(ResponseDone()))
+
+
+@pytest.fixture()
+def fake_agent(monkeypatch):
+    # agent answering requests from ``responses`` keyed by
+    # ``(method, path)``; ``None`` response is left pending
+    from twisted.internet.defer import Deferred
+    from twisted.internet.defer import succeed
+    from gluuengine.dockerclient import AsyncDocker
+    from gluuengine.dockerclient import image_inventory
+
+    class FakeAgent(object):
+        def __init__(self):
+            self.requests = []
+            self.responses = {}
+
+        def request(self, method, uri, headers=None, bodyProducer=None):
+            path = uri.split("/v1.22", 1)[1].split("?")[0]
+            self.requests.append((method, path))
+            resp = self.responses.get((method, path))
+            if isinstance(resp, list):
+                resp = resp.pop(0)
+            if resp is None:
+                return Deferred()
+            return succeed(FakeResponse(*resp))
+
+    agent = FakeAgent()
+    monkeypatch.setattr(
+        "gluuengine.dockerclient._async.readBody",
+        lambda resp: succeed(resp.body),
+    )
+    monkeypatch.setattr(
+        AsyncDocker, "_make_daemon",
+        lambda self, base_url, tls: (agent, base_url),
+    )
+    monkeypatch.setattr(AsyncDocker, "_daemons", {})
+    monkeypatch.setattr(AsyncDocker, "_limiters", {})
+    image_inventory.invalidate()
+    return agent
+
+
+@pytest.fixture()
+def async_dockerclient(swarm_config):
+    from gluuengine.dockerclient import AsyncDocker
+
+    config = {"base_url": "https://10.10.10.11:2376"}
+    return AsyncDocker(config, swarm_config, reactor=object())
+
+
+def test_async_exec_cmd(fake_agent, async_dockerclient):
+    import json
+    import struct
+
+    output = (struct.pack(">BxxxL", 1, 6) + "hello\n" +
+              struct.pack(">BxxxL", 2, 6) + "world\n")
+    fake_agent.responses = {
+        ("POST", "/containers/123/exec"): (201, json.dumps({"Id": "abc"})),
+        ("POST", "/exec/abc/start"): (200, output),
+        ("GET", "/exec/abc/json"): (200, json.dumps({"ExitCode": 0})),
+    }
+    results = []
+    async_dockerclient.exec_cmd("123", "echo hello").addCallback(
+        results.append)
+    assert results[0].retval == "hello\nworld"
+    assert results[0].exit_code == 0
+
+
+def test_async_request_error(fake_agent, async_dockerclient):
+    from gluuengine.errors import DockerAPIError
+
+    fake_agent.responses = {
+        ("GET", "/containers/123/json"): (404, "no such container\n"),
+    }
+    failures = []
+    async_dockerclient.inspect_container("123").addErrback(failures.append)
+    assert failures[0].check(DockerAPIError)
+    assert failures[0].value.status_code == 404
+    assert failures[0].value.explanation == "no such container"
+
+
+def test_async_per_node_limit(fake_agent, swarm_config):
+    from gluuengine.dockerclient import AsyncDocker
+
+    node_a = {"base_url": "https://10.10.10.11:2376"}
+    node_b = {"base_url": "https://10.10.10.12:2376"}
+    reactor = object()
+
+    # clients of the same node share the limit, even via swarm master
+    for _ in range(2):
+        client = AsyncDocker(node_a, swarm_config, reactor=reactor,
+                             max_concurrency=2)
+        for idx in range(3):
+            client.stop_container(str(idx))
+    assert len(fake_agent.requests) == 2
+
+    # busy node doesn't hold back requests to other node
+    AsyncDocker(node_b, swarm_config, reactor=reactor,
+                max_concurrency=2).stop_container("b")
+    assert len(fake_agent.requests) == 3
+
+
+def test_async_pull_image(fake_agent, async_dockerclient):
+    fake_agent.responses = {
+        ("GET", "/images/json"): (200, "[]"),
+        ("POST", "/images/create"): (
+            200,
+            '{"status":"Downloading","progressDetail":{"current":1000000,'
+            '"total":2000000},"id":"a1"}\r\n'
+            '{"status":"Status: Downloaded newer image"}\r\n',
+        ),
+    }
+    messages = []
+    results = []
+    async_dockerclient.image_exists(
+        "gluufederation/nginx:latest").addCallback(results.append)
+    async_dockerclient.pull_image(
+        "gluufederation/nginx:latest", progress=messages.append,
+    ).addCallback(results.append)
+    assert results == [False, True]
+    assert "0/1 layers, 1.0/2.0 MB" in messages[-1]
+
+    # pulled image is added into inventory
+    async_dockerclient.image_exists(
+        "gluufederation/nginx:latest").addCallback(results.append)
+    assert results[-1] is True
+    assert fake_agent.requests.count(("GET", "/images/json")) == 1
+
+
+def test_async_setup_container_repull(fake_agent, async_dockerclient):
+    import json
+    from gluuengine.dockerclient import image_inventory
+
+    # inventory lists an image removed behind the engine
+    image_inventory.set("https://10.10.10.11:2376",
+                        set(["gluufederation/oxauth:latest"]))
+    fake_agent.responses = {
+        ("POST", "/containers/create"): [
+            (404, "No such image: gluufederation/oxauth:latest"),
+            (201, json.dumps({"Id": "abc123"})),
+        ],
+        ("POST", "/images/create"): (200, '{"status":"Downloaded"}'),
+        ("POST", "/containers/abc123/start"): (204, ""),
+    }
+    results = []
+    async_dockerclient.setup_container(
+        "oxauth", "oxauth:latest").addCallback(results.append)
+    assert results == ["abc123"]
+    assert ("POST", "/images/create") in fake_agent.requests
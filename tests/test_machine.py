@@ -0,0 +1,217 @@
+import pytest
+
+
+@pytest.fixture()
+def config_output(tmpdir):
+    certs = {}
+    for name in ("ca", "cert", "key"):
+        path = tmpdir.join("{}.pem".format(name))
+        path.write("")
+        certs[name] = str(path)
+
+    return "\n".join([
+        '--tlsverify',
+        '--tlscacert="{}"'.format(certs["ca"]),
+        '--tlscert="{}"'.format(certs["cert"]),
+        '--tlskey="{}"'.format(certs["key"]),
+        '-H=tcp://10.10.10.10:2376',
+    ])
+
+
+def test_config_cached(monkeypatch, config_output):
+    from gluuengine.machine import Machine
+    from gluuengine.machine.machine import config_cache
+
+    calls = []
+
+    def fake_run(cmd, raise_error=True):
+        calls.append(cmd)
+        return config_output, "", 0
+
+    monkeypatch.setattr("gluuengine.machine.machine.po_run", fake_run)
+    config_cache.invalidate()
+
+    cfg = Machine().config("node-1")
+    assert cfg["base_url"] == "https://10.10.10.10:2376"
+    assert cfg["tls"].verify is True
+
+    # subsequent calls from other instances hit the cache
+    Machine().config("node-1")
+    Machine().config("node-1", docker_friendly=False)
+    assert len(calls) == 1
+
+    # swarm config is cached separately
+    Machine().swarm_config("node-1")
+    assert len(calls) == 2
+
+
+def test_config_cache_invalidated(monkeypatch, config_output):
+    from gluuengine.machine import Machine
+    from gluuengine.machine.machine import config_cache
+
+    calls = []
+
+    def fake_run(cmd, raise_error=True):
+        calls.append(cmd)
+        return config_output, "", 0
+
+    monkeypatch.setattr("gluuengine.machine.machine.po_run", fake_run)
+    config_cache.invalidate()
+
+    mc = Machine()
+    mc.config("node-1")
+    mc.regenerate_certs("node-1")
+    mc.config("node-1")
+    assert len([cmd for cmd in calls if " config " in cmd]) == 2
+
+
+def test_config_cache_expired(monkeypatch):
+    from gluuengine.machine.machine import ConfigCache
+
+    cache = ConfigCache(ttl=0)
+    cache.set(("docker-machine", "node-1", "config node-1"), "value")
+    monkeypatch.setattr("time.time", lambda: 2 ** 40)
+    assert cache.get(("docker-machine", "node-1", "config node-1")) is None
+
+
+@pytest.fixture()
+def machine_store(tmpdir):
+    import json
+    from gluuengine.machine import MachineStore
+
+    machines = tmpdir.mkdir("machines")
+    for name, ip in [("node-1", "127.0.0.1"), ("node-2", "")]:
+        machines.mkdir(name).join("config.json").write(json.dumps({
+            "Name": name,
+            "Driver": {"IPAddress": ip, "EnginePort": 2376},
+        }))
+    return MachineStore(str(tmpdir))
+
+
+def test_store_names(machine_store):
+    assert machine_store.names() == ["node-1", "node-2"]
+
+
+def test_store_ip_url(machine_store):
+    assert machine_store.ip("node-1") == "127.0.0.1"
+    assert machine_store.url("node-1") == "tcp://127.0.0.1:2376"
+    assert machine_store.url("node-2") == ""
+    assert machine_store.load("unknown") is None
+
+
+def test_machine_ip_reads_store(monkeypatch, machine_store):
+    from gluuengine.machine import Machine
+
+    def fake_run(cmd, raise_error=True):
+        raise AssertionError("docker-machine must not be called")
+
+    monkeypatch.setattr("gluuengine.machine.machine.po_run", fake_run)
+    mc = Machine()
+    mc.store = machine_store
+    assert mc.ip("node-1") == "127.0.0.1"
+
+
+def test_store_probe(monkeypatch, machine_store):
+    import socket
+
+    def refused(address, timeout):
+        raise socket.error("connection refused")
+
+    assert machine_store.probe("unknown") is None
+
+    monkeypatch.setattr("socket.create_connection", refused)
+    assert machine_store.probe("node-1") is False
+
+
+def test_status_cached(monkeypatch, machine_store):
+    from gluuengine.machine import MachineStatus
+
+    probes = []
+
+    def fake_probe(machine_name, timeout=2):
+        probes.append(machine_name)
+        return True
+
+    monkeypatch.setattr(machine_store, "probe", fake_probe)
+    status = MachineStatus(machine_store, max_age=60)
+
+    status.refresh()
+    assert probes == ["node-1", "node-2"]
+
+    assert status.is_running("node-1") is True
+    assert status.running() == ["node-1", "node-2"]
+    assert len(probes) == 2
+
+    status.invalidate("node-1")
+    assert status.is_running("node-1") is True
+    assert len(probes) == 3
+
+
+def test_status_falls_back_to_docker_machine(monkeypatch, machine_store):
+    from gluuengine.machine import MachineStatus
+
+    monkeypatch.setattr(
+        "gluuengine.machine.Machine.status",
+        lambda cls, machine_name: True,
+    )
+    status = MachineStatus(machine_store)
+    assert status.is_running("unknown") is True
+
+
+def test_status_refresh_concurrent(monkeypatch, machine_store):
+    import threading
+    from gluuengine.machine import MachineStatus
+
+    threads = set()
+
+    def fake_probe(machine_name, timeout=2):
+        threads.add(threading.current_thread().name)
+        return machine_name == "node-1"
+
+    monkeypatch.setattr(machine_store, "probe", fake_probe)
+    status = MachineStatus(machine_store)
+    status.refresh()
+
+    snapshot = status.snapshot()
+    assert snapshot["node-1"]["running"] is True
+    assert snapshot["node-2"]["running"] is False
+    assert snapshot["node-1"]["latency"] >= 0
+    assert threading.current_thread().name not in threads
+
+
+def test_status_stale(monkeypatch, machine_store):
+    from gluuengine.machine import MachineStatus
+
+    probes = []
+
+    def fake_probe(machine_name, timeout=2):
+        probes.append(machine_name)
+        return True
+
+    monkeypatch.setattr(machine_store, "probe", fake_probe)
+    status = MachineStatus(machine_store, max_age=0)
+    status.refresh()
+
+    monkeypatch.setattr("time.time", lambda: 2 ** 40)
+    status.is_running("node-1")
+    assert probes == ["node-1", "node-2", "node-1"]
+
+
+def test_stop_invalidates_caches(monkeypatch, config_output):
+    from gluuengine.machine import Machine
+    from gluuengine.machine import machine_status
+    from gluuengine.machine.machine import config_cache
+
+    monkeypatch.setattr(
+        "gluuengine.machine.machine.po_run",
+        lambda cmd, raise_error=True: (config_output, "", 0),
+    )
+    config_cache.invalidate()
+
+    mc = Machine()
+    mc.config("node-1")
+    monkeypatch.setitem(machine_status._states, "node-1", {"running": True})
+
+    mc.stop("node-1")
+    assert not [key for key in config_cache._entries if key[1] == "node-1"]
+    assert "node-1" not in machine_status._states
@@ -0,0 +1,47 @@
+import pytest
+
+
+def test_prepull_images(monkeypatch, app, master_node):
+    from gluuengine.node import prepull_images
+
+    pulled = []
+    monkeypatch.setattr(
+        "gluuengine.machine.Machine.config",
+        lambda cls, machine_name: {},
+    )
+    monkeypatch.setattr(
+        "gluuengine.dockerclient.Docker.image_exists",
+        lambda cls, image: image.startswith("gluufederation/opendj:"),
+    )
+    monkeypatch.setattr(
+        "gluuengine.dockerclient.Docker.pull_image",
+        lambda cls, image, progress=None: pulled.append(image) or True,
+    )
+
+    prepull_images(app, master_node)
+
+    tag = app.config["GLUU_IMAGE_TAG"]
+    assert "gluufederation/oxauth:{}".format(tag) in pulled
+    assert "gluufederation/opendj:{}".format(tag) not in pulled
+    assert len(pulled) == 5
+
+
+def test_prepull_images_failed(monkeypatch, app, master_node):
+    from gluuengine.node import prepull_images
+
+    monkeypatch.setattr(
+        "gluuengine.machine.Machine.config",
+        lambda cls, machine_name: {},
+    )
+    monkeypatch.setattr(
+        "gluuengine.dockerclient.Docker.image_exists",
+        lambda cls, image: False,
+    )
+    monkeypatch.setattr(
+        "gluuengine.dockerclient.Docker.pull_image",
+        lambda cls, image, progress=None: "nginx" not in image,
+    )
+
+    with pytest.raises(RuntimeError) as exc:
+        prepull_images(app, master_node)
+    assert "nginx" in str(exc.value)
@@ -52,3 +52,86 @@ def test_decrypt_text():
     key = "123456789012345678901234"
     enc_text = "im6yqa0BROeTNcwvx4XCaw=="
     assert decrypt_text(enc_text, key) == "password"
+
+
+def test_iter_json_list():
+    import json
+    from gluuengine.utils import iter_json_list
+
+    assert "".join(iter_json_list([])) == "[]"
+    assert json.loads("".join(iter_json_list({"a": i} for i in range(3)))) == [
+        {"a": 0}, {"a": 1}, {"a": 2},
+    ]
+
+
+def test_make_multi_tarfile(tmpdir):
+    import os
+    import tarfile
+    from gluuengine.utils import make_multi_tarfile
+
+    script = tmpdir.join("check_ssl")
+    script.write("#!/bin/sh")
+    os.chmod(str(script), 0o755)
+
+    tf = tarfile.open(fileobj=make_multi_tarfile({
+        str(script): "/usr/bin/check_ssl",
+    }))
+    member = tf.getmember("usr/bin/check_ssl")
+    assert member.mode == 0o755
+    assert member.uid == 0
+    assert member.uname == "root"
+
+
+def test_make_multi_tarfile_contents():
+    import tarfile
+    from gluuengine.utils import make_multi_tarfile
+
+    tf = tarfile.open(fileobj=make_multi_tarfile(contents={
+        "/etc/gluu/salt": u"encodeSalt = \u00e9",
+    }))
+    member = tf.getmember("etc/gluu/salt")
+    assert member.mode == 0o644
+    assert tf.extractfile(member).read().decode("utf-8") == u"encodeSalt = \u00e9"
+
+
+def test_extract_tarfile_member(tmpdir):
+    import tarfile
+    from io import BytesIO
+    from gluuengine.utils import extract_tarfile_member
+
+    fd = BytesIO()
+    with tarfile.open(mode="w", fileobj=fd) as tf:
+        for name, content in [("nginx.crt", "crt"), ("nginx.crt.bak", "bak"),
+                              ("../escape", "evil")]:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tf.addfile(info, BytesIO(content))
+    fd.seek(0)
+
+    dest = str(tmpdir.join("nginx.crt"))
+    assert extract_tarfile_member(fd, "nginx.crt", dest) is True
+    assert open(dest).read() == "crt"
+    assert tmpdir.listdir() == [tmpdir.join("nginx.crt")]
+
+
+def test_extract_tarfile_member_skips_links(tmpdir):
+    import tarfile
+    from io import BytesIO
+    from gluuengine.utils import extract_tarfile_member
+
+    fd = BytesIO()
+    with tarfile.open(mode="w", fileobj=fd) as tf:
+        info = tarfile.TarInfo("idp")
+        info.type = tarfile.DIRTYPE
+        tf.addfile(info)
+
+        for link_type in (tarfile.SYMTYPE, tarfile.LNKTYPE):
+            info = tarfile.TarInfo("idp/link-{}".format(link_type))
+            info.type = link_type
+            info.linkname = "/etc/passwd"
+            tf.addfile(info)
+    fd.seek(0)
+
+    dest = tmpdir.join("idp")
+    assert extract_tarfile_member(fd, "idp", str(dest)) is True
+    assert dest.listdir() == []